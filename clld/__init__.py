@@ -38,3 +38,21 @@ RESOURCES = [
         with_index=False,
         with_rdfdump=False),
 ]
+
+_RESOURCE_FOR_CLASS = {}
+
+
+def resource_for(obj):
+    """Look up the first registered resource whose interface is provided by an object.
+
+    Since resource interfaces are declared for model classes, lookups are cached per class.
+
+    :return: :py:class:`clld.Resource` instance or ``None``.
+    """
+    rsc = _RESOURCE_FOR_CLASS.get(obj.__class__)
+    if rsc is None:
+        for _rsc in RESOURCES:
+            if _rsc.interface.providedBy(obj):
+                rsc = _RESOURCE_FOR_CLASS[obj.__class__] = _rsc
+                break
+    return rsc
@@ -7,21 +7,25 @@ except ImportError:  # pragma: no cover
 from six import string_types, text_type, PY2
 from pytz import UTC
 from sqlalchemy import (
-    Column, Integer, Float, String, Boolean, DateTime, func, event)
+    Column, Integer, Float, String, Boolean, DateTime, Index, func, event)
 from sqlalchemy.exc import DisconnectionError
 from sqlalchemy.pool import Pool
 from sqlalchemy.ext.declarative import declarative_base, declared_attr
 from sqlalchemy.orm import scoped_session, sessionmaker, deferred, undefer
 from sqlalchemy.types import TypeDecorator, VARCHAR
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
 from sqlalchemy.orm.query import Query
 from sqlalchemy.inspection import inspect
 
 from zope.sqlalchemy import ZopeTransactionExtension
+from zope.interface import providedBy
 from clldutils.misc import NO_DEFAULT, UnicodeMixin
 from clldutils import jsonlib
 
 from clld.db.versioned import versioned_session
+from clld.lib import rdf
 
 
 @event.listens_for(Pool, "checkout")
@@ -92,13 +96,35 @@ VersionedDBSession = scoped_session(versioned_session(
 
 class JSONEncodedDict(TypeDecorator):
 
-    """Represents an immutable structure as a json-encoded string.
+    """Represents a dictionary as JSON.
+
+    On PostgreSQL new databases store the data as ``JSONB``, thus individual keys can be
+    queried and indexed; other databases store json-encoded strings, which can be queried
+    with the ``json_extract`` function on SQLite (see :py:func:`clld.db.util.json_value`).
+
+    Since values are always bound as json-encoded strings, databases created with older
+    versions of clld - storing ``jsondata`` as ``VARCHAR`` on PostgreSQL, too - keep
+    working until their columns are converted with
+    :py:meth:`clld.db.migration.Connection.jsondata_to_jsonb`.
 
     Loads/serializes an empty dict for any empty value.
     """
 
     impl = VARCHAR
 
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(VARCHAR())
+
+    def bind_processor(self, dialect):
+        # We bypass the bind processor of JSONB, which would encode our string again:
+        # psycopg2 passes strings as untyped literals, which PostgreSQL assigns to
+        # columns of type JSONB as well as VARCHAR.
+        def process(value):
+            return self.process_bind_param(value, dialect)
+        return process
+
     def process_bind_param(self, value, dialect):
         if not value:
             value = {}
@@ -107,6 +133,10 @@ class JSONEncodedDict(TypeDecorator):
     def process_result_value(self, value, dialect):
         if not value:
             return {}
+        if isinstance(value, dict):
+            return value
+        # VARCHAR columns - and JSONB columns read without native JSON support - return
+        # strings.
         return json.loads(value)
 
 
@@ -120,6 +150,74 @@ def _solr_timestamp(dt):
     return dt.isoformat().split('+')[0] + 'Z'
 
 
+#: Column keys which are not serialized as part of the data of an object.
+SERIALIZATION_EXCLUDE = frozenset(
+    ['active', 'version', 'created', 'updated', 'polymorphic_type'])
+
+#: Keys of a solr document which are not filled from columns with dynamic field names.
+SOLR_FIXED = frozenset(
+    ['id', 'url', 'dataset', 'rscname', 'name', 'active', 'updated', 'created',
+     'polymorphic_type'])
+
+#: Suffixes of dynamic solr fields by type of the value.
+SOLR_SUFFIX_MAP = [(text_type, '_t'), (bool, '_b'), (int, '_i'), (float, '_f')]
+
+_SOLR_SUFFIXES = {}
+_SERIALIZATION_PLANS = {}
+
+
+def _solr_suffix(value):
+    type_ = type(value)
+    try:
+        return _SOLR_SUFFIXES[type_]
+    except KeyError:
+        suffix = None
+        for t, s in SOLR_SUFFIX_MAP:
+            if issubclass(type_, t):
+                suffix = s
+                break
+        _SOLR_SUFFIXES[type_] = suffix
+        return suffix
+
+
+class SerializationPlan(object):
+
+    """The column keys used to serialize instances of a model class.
+
+    Inspecting the mapper hierarchy is comparatively expensive, thus plans are computed
+    only once per class, see :py:func:`serialization_plan`.
+    """
+
+    def __init__(self, cls):
+        mapper = inspect(cls)
+        keys = []
+        for om in mapper.iterate_to_root():
+            for col in om.local_table.c:
+                if col.key not in keys:
+                    keys.append(col.key)
+        #: Keys of all columns, from the most specialized table up to the base table.
+        self.keys = tuple(keys)
+        self.json_keys = tuple(k for k in keys if k not in SERIALIZATION_EXCLUDE)
+        self.csv_head = tuple(sorted(self.json_keys))
+        self.solr_keys = tuple(k for k in keys if k not in SOLR_FIXED)
+
+        cls = mapper.class_
+        if not is_base(cls):
+            for base in cls.__bases__:
+                if is_base(base):
+                    cls = base
+                    break
+        self.rscname = cls.__name__
+
+
+def serialization_plan(cls):
+    """Retrieve the cached :py:class:`SerializationPlan` for a model class."""
+    try:
+        return _SERIALIZATION_PLANS[cls]
+    except KeyError:
+        return _SERIALIZATION_PLANS.setdefault(cls, SerializationPlan(cls))
+
+
 class CsvMixin(object):
 
     """Mixin providing methods to control (de-)serialization of an object as csv row."""
@@ -130,12 +228,7 @@ class CsvMixin(object):
     @classmethod
     def csv_head(cls):
         """return List of column names."""
-        exclude = {'active', 'version', 'created', 'updated', 'polymorphic_type'}
-        cols = sorted(
-            col.key for om in inspect(cls).iterate_to_root()
-            for col in om.local_table.c
-            if col.key not in exclude and not exclude.add(col.key))
-        return cols
+        return list(serialization_plan(cls).csv_head)
 
     def value_to_csv(self, attr, ctx=None, req=None):
         """Convert one value to a representation suitable for csv writer.
@@ -163,10 +256,31 @@ class CsvMixin(object):
         """return list of values to be passed to csv.writer.writerow."""
         return [self.value_to_csv(attr, ctx, req) for attr in cols or self.csv_head()]
 
+    @classmethod
+    def csv_rows(cls, items, ctx=None, req=None, cols=None):
+        """Serialize a sequence of objects as csv rows.
+
+        :param cols: List of column names; if ``None``, the ``csv_head`` of each item's \
+        class is used, computed only once per class.
+        :return: ``list`` of rows.
+        """
+        heads = {}
+        res = []
+        for item in items:
+            head = cols
+            if not head:
+                head = heads.get(type(item))
+                if head is None:
+                    head = heads[type(item)] = item.csv_head()
+            res.append(item.to_csv(ctx=ctx, req=req, cols=head))
+        return res
+
     @classmethod
     def value_from_csv(cls, attr, value):
         if not value:
             return None
+        if attr == 'jsondata':
+            return json.loads(value)
         col = getattr(cls, attr)
         if hasattr(col, 'property') and hasattr(col.property, 'columns'):
             if isinstance(col.property.columns[0].type, Integer):
@@ -235,21 +349,16 @@ class Base(UnicodeMixin, CsvMixin, declarative_base()):
         return deferred(Column(Boolean, default=True))
 
     #: To allow storage of arbitrary key,value pairs with typed values, each model
-    #: provides a column to store JSON encoded dicts.
-    jsondata = Column(JSONEncodedDict)
+    #: provides a column to store JSON encoded dicts. Changes to the keys of the dict
+    #: are tracked, i.e. ``obj.jsondata['key'] = value`` will be persisted.
+    jsondata = Column(MutableDict.as_mutable(JSONEncodedDict))
 
     def __init__(self, jsondata=None, **kwargs):
         kwargs['jsondata'] = jsondata or {}
         super(Base, self).__init__(**kwargs)
 
     def update_jsondata(self, **kw):
-        """Convenience function.
-
-        Since we use the simple
-        `JSON encoded dict recipe <http://docs.sqlalchemy.org/en/rel_0_9/core/types.html\
-        #marshal-json-strings>`_
-        without mutation tracking, we provide a convenience method to update
-        """
+        """Convenience function to update multiple keys of jsondata at once."""
         d = self.jsondata.copy()
         d.update(kw)
         self.jsondata = d
@@ -310,12 +419,9 @@ class Base(UnicodeMixin, CsvMixin, declarative_base()):
         :param req: pyramid Request object.
         :return: ``dict`` suitable for serialization as JSON.
         """
-        exclude = {'active', 'version', 'created', 'updated', 'polymorphic_type'}
-        cols = [
-            col.key for om in inspect(self).mapper.iterate_to_root()
-            for col in om.local_table.c
-            if col.key not in exclude and not exclude.add(col.key)]
-        return {col: jsonlib.format(getattr(self, col)) for col in cols}
+        return {
+            col: jsonlib.format(getattr(self, col))
+            for col in serialization_plan(type(self)).json_keys}
 
     def __solr__(self, req):
         """Custom solr document representing the object.
@@ -331,19 +437,12 @@ class Base(UnicodeMixin, CsvMixin, declarative_base()):
             `dynamic fields <https://cwiki.apache.org/confluence/display/solr/\
             Dynamic+Fields>`_.
         """
-        cls = inspect(self).class_
-
-        if not is_base(cls):
-            for base in cls.__bases__:
-                if is_base(base):
-                    cls = base
-                    break
-
+        plan = serialization_plan(type(self))
         res = dict(
             id=getattr(self, 'id', str(self.pk)),
             url=req.resource_url(self) if req else None,
             dataset=req.dataset.id if req else None,
-            rscname=cls.__name__,
+            rscname=plan.rscname,
             name=getattr(self, 'name', '%s %s' % (self.__class__.__name__, self.pk)),
             active=self.active,
         )
@@ -351,17 +450,43 @@ class Base(UnicodeMixin, CsvMixin, declarative_base()):
             value = _solr_timestamp(getattr(self, attr))
             if value:
                 res[attr] = value
-        suffix_map = [(text_type, '_t'), (bool, '_b'), (int, '_i'), (float, '_f')]
-        for om in inspect(self).mapper.iterate_to_root():
-            for col in om.local_table.c:
-                if col.key not in res and col.key != 'polymorphic_type':
-                    value = getattr(self, col.key)
-                    for type_, suffix in suffix_map:
-                        if isinstance(value, type_):
-                            res[col.key + suffix] = value
-                            break
+        for key in plan.solr_keys:
+            value = getattr(self, key)
+            suffix = _solr_suffix(value)
+            if suffix:
+                res[key + suffix] = value
         return res
 
+    def __triples__(self, req):
+        """The RDF description of the object as triples.
+
+        This is the graph of the RDF serializations of resources, created without
+        rendering the RDF/XML templates, see :py:class:`clld.web.adapters.rdf.Rdf`.
+        Models extend the triples of the generic resource template
+        ``resource_rdf.mako`` yielded here - which include the properties contributed by
+        an ``__rdf__`` method - with the properties of their specific template.
+
+        :param req: pyramid Request object.
+        :return: Iterable of triples of rdflib terms.
+        """
+        label = rdf.Literal(text_type(self), lang='en')
+        props = [
+            ('void:inDataset', req.route_url('dataset')),
+            ('rdfs:label', label),
+            ('skos:prefLabel', label)]
+        for interface in providedBy(self):
+            props.append(
+                ('skos:scopeNote', rdf.Literal(interface.__name__[1:].lower(), lang='x-clld')))
+            break
+        if getattr(self, 'id', None) is not None:
+            props.append(('skos:altLabel', rdf.Literal(self.id, lang='x-clld')))
+        props.append(('dcterms:title', label))
+        if getattr(self, 'description', None):
+            props.append(('dcterms:description', rdf.Literal(self.description, lang='en')))
+        if callable(getattr(self, '__rdf__', None)):
+            props.extend(self.__rdf__(req))
+        return rdf.properties_as_triples(req.resource_url(self), props)
+
     def __unicode__(self):
         """A human readable label for the object."""
         r = getattr(self, 'name', None)
@@ -376,6 +501,17 @@ class Base(UnicodeMixin, CsvMixin, declarative_base()):
             self.__class__.__name__, getattr(self, 'id', self.pk))
 
 
+@event.listens_for(Base, 'instrument_class', propagate=True)
+def add_active_index(mapper, cls):
+    """Add an index on (active, pk) to the tables of our models.
+
+    This index backs the filter on the active flag used when listing objects.
+    """
+    table = mapper.local_table
+    if 'active' in table.c and list(table.primary_key) == [table.c.get('pk')]:
+        Index('ix_%s_active_pk' % table.name, table.c.active, table.c.pk)
+
+
 class PolymorphicBaseMixin(object):
 
     """Mixin providing the wiring for joined table inheritance.
@@ -13,7 +13,10 @@ This module provides
     #generating-sql-scripts-a-k-a-offline-mode>`_.
 """
 
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, scoped_session
 from sqlalchemy.sql import select as base_select, func
+from clld.db.meta import Base
 from clld.db.models import common
 
 
@@ -122,6 +125,61 @@ class Connection(object):
     #
     # domain specific operations:
     #
+    def create_indexes(self, *models):
+        """Create the indexes declared in the schema which are missing in the database.
+
+        Allows adding indexes introduced with new versions of clld to existing databases.
+
+        :param models: Model classes to check; defaults to all tables of the schema.
+        :return: ``list`` of names of the indexes which were created.
+        """
+        bind = self._conn
+        if isinstance(bind, (Session, scoped_session)):
+            bind = bind.connection()
+        tables = [model.__table__ for model in models] or Base.metadata.sorted_tables
+        inspector = inspect(bind)
+        table_names = set(inspector.get_table_names())
+        res = []
+        for table in tables:
+            if table.name not in table_names:
+                continue  # pragma: no cover
+            existing = set(index['name'] for index in inspector.get_indexes(table.name))
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                if index.name not in existing:
+                    index.create(bind)
+                    res.append(index.name)
+        return res
+
+    def jsondata_to_jsonb(self, *models):
+        """Convert ``jsondata`` columns stored as VARCHAR to JSONB on PostgreSQL.
+
+        Databases created with older versions of clld store ``jsondata`` as strings;
+        converting the columns is required to query or index keys of ``jsondata``.
+        Columns which already are of type JSONB are skipped. On other databases this is a
+        no-op.
+
+        :param models: Model classes to convert; defaults to all tables with a \
+        ``jsondata`` column.
+        :return: ``list`` of names of the tables which were converted.
+        """
+        dialect = getattr(self._conn, 'dialect', None) or self._conn.bind.dialect
+        if dialect.name != 'postgresql':
+            return []
+        tables = [model.__table__.name for model in models] or [
+            t.name for t in Base.metadata.sorted_tables if 'jsondata' in t.c]
+        varchar = set(r[0] for r in self.execute(
+            "SELECT table_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND column_name = 'jsondata' "
+            "AND data_type != 'jsonb'"))
+        res = []
+        for table in tables:
+            if table in varchar:
+                self.execute(
+                    'ALTER TABLE "%s" ALTER COLUMN jsondata TYPE jsonb '
+                    "USING coalesce(nullif(jsondata, ''), '{}')::jsonb" % table)
+                res.append(table)
+        return res
+
     def set_glottocode(self, lid, gc, gcid=None):
         """assign a unique glottocode to a language.
 
@@ -70,7 +70,8 @@ class FilesMixin(IdNameDescriptionMixin):
 
     @declared_attr
     def object_pk(cls):
-        return Column(Integer, ForeignKey('%s.pk' % cls.owner_class().lower()))
+        return Column(
+            Integer, ForeignKey('%s.pk' % cls.owner_class().lower()), index=True)
 
     @property
     def relpath(self):
@@ -120,7 +121,8 @@ class DataMixin(object):
 
     @declared_attr
     def object_pk(cls):
-        return Column(Integer, ForeignKey('%s.pk' % cls.owner_class().lower()))
+        return Column(
+            Integer, ForeignKey('%s.pk' % cls.owner_class().lower()), index=True)
 
 
 class HasDataMixin(object):
@@ -1,4 +1,5 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
+from itertools import chain
 
 from sqlalchemy import Column, Integer, Boolean, Date, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
@@ -6,6 +7,7 @@ from sqlalchemy.orm import relationship
 from zope.interface import implementer
 
 from clld.db.meta import Base, PolymorphicBaseMixin
+from clld.lib import rdf
 from clld.db.versioned import Versioned
 from clld import interfaces
 
@@ -57,12 +59,22 @@ class Contribution(Base,
             contribs.append(' and '.join(c.name for c in self.secondary_contributors))
         return ' with '.join(contribs)
 
+    def __triples__(self, req):
+        props = [('rdf:type', 'http://www.w3.org/2004/02/skos/core#Dataset')]
+        if self.date:
+            props.append(('dcterms:date', rdf.Literal(self.date.isoformat())))
+        for assoc in self.contributor_assocs:
+            props.append(('dcterms:contributor', req.resource_url(assoc.contributor)))
+        return chain(
+            Base.__triples__(self, req),
+            rdf.properties_as_triples(req.resource_url(self), props))
+
 
 class ContributionReference(Base, Versioned, HasSourceMixin):
 
     """Association table."""
 
-    contribution_pk = Column(Integer, ForeignKey('contribution.pk'))
+    contribution_pk = Column(Integer, ForeignKey('contribution.pk'), index=True)
     contribution = relationship(Contribution, backref="references")
 
 
@@ -70,8 +82,8 @@ class ContributionContributor(Base, PolymorphicBaseMixin, Versioned):
 
     """Many-to-many association between contributors and contributions."""
 
-    contribution_pk = Column(Integer, ForeignKey('contribution.pk'))
-    contributor_pk = Column(Integer, ForeignKey('contributor.pk'))
+    contribution_pk = Column(Integer, ForeignKey('contribution.pk'), index=True)
+    contributor_pk = Column(Integer, ForeignKey('contributor.pk'), index=True)
 
     # contributors are ordered.
     ord = Column(Integer, default=1)
@@ -1,10 +1,12 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
+from itertools import chain
 
 from sqlalchemy import Column, String, Unicode, UniqueConstraint
 
 from zope.interface import implementer
 
 from clld.db.meta import Base, PolymorphicBaseMixin
+from clld.lib import rdf
 from clld.db.versioned import Versioned
 from clld import interfaces
 
@@ -43,3 +45,15 @@ class Contributor(Base,
         """ad hoc - possibly incorrect - way of formatting the name as "last, first"."""
         parts = (self.name or '').split()
         return '' if not parts else ', '.join([parts[-1], ' '.join(parts[:-1])])
+
+    def __triples__(self, req):
+        props = [('rdf:type', rdf.url_for_qname('foaf:Person'))]
+        if self.email:
+            props.append(('foaf:mbox', rdf.URIRef('mailto:' + self.email.split(',')[0])))
+        if self.url:
+            props.append(('foaf:homepage', rdf.URIRef(self.url.split(',')[0])))
+        if self.address:
+            props.append(('dcterms:spatial', rdf.Literal(self.address)))
+        return chain(
+            Base.__triples__(self, req),
+            rdf.properties_as_triples(req.resource_url(self), props))
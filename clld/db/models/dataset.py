@@ -89,8 +89,8 @@ class Editor(Base, PolymorphicBaseMixin, Versioned):
 
     """Many-to-many association between contributors and dataset."""
 
-    dataset_pk = Column(Integer, ForeignKey('dataset.pk'))
-    contributor_pk = Column(Integer, ForeignKey('contributor.pk'))
+    dataset_pk = Column(Integer, ForeignKey('dataset.pk'), index=True)
+    contributor_pk = Column(Integer, ForeignKey('contributor.pk'), index=True)
 
     # contributors are ordered.
     ord = Column(Integer, default=1)
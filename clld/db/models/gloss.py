@@ -17,5 +17,5 @@ class GlossAbbreviation(Base, Versioned, IdNameDescriptionMixin):
 
     __table_args__ = (UniqueConstraint('id', 'language_pk'),)
 
-    language_pk = Column(Integer, ForeignKey('language.pk'))
+    language_pk = Column(Integer, ForeignKey('language.pk'), index=True)
     language = relationship(Language, backref="gloss_abbreviations")
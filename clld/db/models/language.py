@@ -1,4 +1,5 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
+from itertools import chain
 
 from sqlalchemy import (
     Column,
@@ -16,6 +17,7 @@ from sqlalchemy.ext.associationproxy import association_proxy
 from zope.interface import implementer
 
 from clld.db.meta import Base, PolymorphicBaseMixin
+from clld.lib import rdf
 from clld.db.versioned import Versioned
 from clld import interfaces
 from clld.util import DeclEnum
@@ -103,6 +105,37 @@ class Language(Base,
         res['altname_txt'] = [i.name for i in self.identifiers if i.type == 'name']
         return _add_solr_language_info(res, self)
 
+    def __triples__(self, req):
+        props = []
+        if self.latitude is not None and self.longitude is not None:
+            props.extend([
+                ('geo:long', rdf.Literal(self.longitude, datatype=rdf.XSD.float)),
+                ('geo:lat', rdf.Literal(self.latitude, datatype=rdf.XSD.float))])
+        props.append(('rdf:type', 'http://purl.org/dc/terms/LinguisticSystem'))
+        for identifier in self.identifiers:
+            if identifier.type == 'name' and identifier.name != self.name:
+                props.append(('skos:altLabel', rdf.Literal(
+                    '%s' % identifier,
+                    lang=identifier.lang
+                    if identifier.lang and len(identifier.lang) <= 3 else None)))
+        for source in self.sources:
+            props.append(('dcterms:description', req.resource_url(source)))
+        if self.iso_code:
+            props.extend([
+                ('lexvo:iso639P3PCode',
+                 rdf.Literal(self.iso_code, datatype=rdf.XSD.string)),
+                ('owl:sameAs',
+                 'http://dbpedia.org/resource/ISO_639:%s' % self.iso_code)])
+        if req.dataset.id != 'glottolog' and self.glottocode:
+            props.append((
+                'owl:sameAs',
+                'http://glottolog.org/resource/languoid/id/%s' % self.glottocode))
+        for vs in self.valuesets:
+            props.append(('dcterms:isReferencedBy', req.resource_url(vs)))
+        return chain(
+            Base.__triples__(self, req),
+            rdf.properties_as_triples(req.resource_url(self), props))
+
 
 class LanguageSource(Base, Versioned):
 
@@ -111,7 +144,7 @@ class LanguageSource(Base, Versioned):
     __table_args__ = (UniqueConstraint('language_pk', 'source_pk'),)
 
     language_pk = Column(Integer, ForeignKey('language.pk'))
-    source_pk = Column(Integer, ForeignKey('source.pk'))
+    source_pk = Column(Integer, ForeignKey('source.pk'), index=True)
 
 
 class IdentifierType(DeclEnum):
@@ -138,7 +171,7 @@ class Identifier(Base, Versioned, IdNameDescriptionMixin):
     __table_args__ = (UniqueConstraint('name', 'type', 'description', 'lang'),)
 
     id = Column(String)
-    type = Column(String)
+    type = Column(String, index=True)
     lang = Column(String(3), default='en')
 
     def url(self):
@@ -156,8 +189,8 @@ class LanguageIdentifier(Base, Versioned):
     linkage, e.g. 'is dialect of'.
     """
 
-    language_pk = Column(Integer, ForeignKey('language.pk'))
-    identifier_pk = Column(Integer, ForeignKey('identifier.pk'))
+    language_pk = Column(Integer, ForeignKey('language.pk'), index=True)
+    identifier_pk = Column(Integer, ForeignKey('identifier.pk'), index=True)
     description = Column(Unicode)
 
     identifier = relationship(Identifier)
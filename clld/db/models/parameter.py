@@ -10,6 +10,7 @@ from zope.interface import implementer
 from clldutils.misc import cached_property
 
 from clld.db.meta import Base, PolymorphicBaseMixin, DBSession
+from clld.lib import rdf
 from clld.db.versioned import Versioned
 from clld import interfaces
 from clld.web.icon import ORDERED_ICONS
@@ -44,7 +45,7 @@ class DomainElement(Base,
         UniqueConstraint('name', 'parameter_pk'),
         UniqueConstraint('number', 'parameter_pk'))
 
-    parameter_pk = Column(Integer, ForeignKey('parameter.pk'))
+    parameter_pk = Column(Integer, ForeignKey('parameter.pk'), index=True)
 
     number = Column(Integer, doc='numerical value of the domain element')
     """the number is used to sort domain elements within the domain of one parameter"""
@@ -79,6 +80,33 @@ class Parameter(Base,
     domain = relationship(
         'DomainElement', backref='parameter', order_by=DomainElement.number)
 
+    def __triples__(self, req):
+        url = req.resource_url(self)
+        for t in Base.__triples__(self, req):
+            yield t
+        props = [('rdf:type', rdf.SKOS.Concept)]
+        props.extend(('dcterms:hasPart', req.resource_url(vs)) for vs in self.valuesets)
+        props.extend(('skos:narrower', de.url(req)) for de in self.domain)
+        for t in rdf.properties_as_triples(url, props):
+            yield t
+
+        for de in self.domain:
+            label = rdf.Literal('%s' % de, lang='en')
+            props = [
+                ('rdf:type', rdf.DCTERMS.Standard),
+                ('rdf:type', rdf.SKOS.Concept),
+                ('rdfs:label', label),
+                ('skos:prefLabel', label),
+                ('dcterms:title', label)]
+            if de.description:
+                props.append(('dcterms:description', rdf.Literal(de.description, lang='en')))
+            props.append(('skos:broader', url))
+            if de.number is not None:
+                props.append(
+                    ('dcterms:description', rdf.Literal(de.number, datatype=rdf.XSD.int)))
+            for t in rdf.properties_as_triples(de.url(req), props):
+                yield t
+
 
 class CombinationDomainElement(object):
     def __init__(self, combination, domainelements, icon=None):
@@ -1,4 +1,5 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
+from itertools import chain
 
 from sqlalchemy import Column, Integer, Unicode, ForeignKey
 from sqlalchemy.orm import relationship, backref
@@ -7,6 +8,7 @@ from sqlalchemy.ext.declarative import declared_attr
 from zope.interface import implementer
 
 from clld.db.meta import Base, PolymorphicBaseMixin
+from clld.lib import rdf
 from clld.db.versioned import Versioned
 from clld import interfaces
 
@@ -61,7 +63,7 @@ class Sentence(Base,
     markup_gloss = Column(Unicode)
     markup_comment = Column(Unicode)
 
-    language_pk = Column(Integer, ForeignKey('language.pk'))
+    language_pk = Column(Integer, ForeignKey('language.pk'), index=True)
 
     @declared_attr
     def language(cls):
@@ -71,6 +73,23 @@ class Sentence(Base,
     def __solr__(self, req):
         return _add_solr_language_info(Base.__solr__(self, req), self)
 
+    def __triples__(self, req):
+        props = [
+            ('dcterms:language', req.resource_url(self.language)),
+            ('dcterms:description',
+             rdf.Literal(self.analyzed or '', lang='x-clld-IGT-analyzed')),
+            ('dcterms:description', rdf.Literal(self.gloss or '', lang='x-clld-IGT-gloss')),
+            ('dcterms:description',
+             rdf.Literal(self.original_script or '', lang='x-clld-IGT-original-script')),
+            ('dcterms:type', rdf.Literal(self.type or '')),
+            ('dcterms:source', rdf.Literal(self.source or '')),
+            ('skos:note', rdf.Literal(self.comment or ''))]
+        for ref in self.references:
+            props.append(('dcterms:references', req.resource_url(ref.source)))
+        return chain(
+            Base.__triples__(self, req),
+            rdf.properties_as_triples(req.resource_url(self), props))
+
     @property
     def audio(self):
         for f in self._files:
@@ -82,5 +101,5 @@ class SentenceReference(Base, Versioned, HasSourceMixin):
 
     """Association table."""
 
-    sentence_pk = Column(Integer, ForeignKey('sentence.pk'))
+    sentence_pk = Column(Integer, ForeignKey('sentence.pk'), index=True)
     sentence = relationship(Sentence, backref="references")
@@ -1,4 +1,5 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
+from itertools import chain
 
 from sqlalchemy import Column, Integer, String, Unicode, ForeignKey
 from sqlalchemy.orm import relationship
@@ -12,6 +13,8 @@ from clld.db.versioned import Versioned
 from clld import interfaces
 from clld.lib import bibtex
 from clld.lib import coins
+from clld.lib import rdf
+from clld.lib.bibo import TYPE_MAP, ADD_FIELD_MAP, FIELD_MAP
 from clld.web.util.htmllib import HTML
 
 from . import (
@@ -109,6 +112,37 @@ class Source(Base,
                 req.dataset.name, self.bibtex()).span_attrs()
         )
 
+    def __triples__(self, req):
+        url = req.resource_url(self)
+        props = [(
+            'rdf:type',
+            rdf.NAMESPACES['bibo'][
+                (TYPE_MAP.get(self.type) or 'bibo:Document').split(':')[1]])]
+        props.extend(('dcterms:language', req.resource_url(l)) for l in self.languages)
+        if getattr(self, 'url', None):
+            props.append(('dcterms:hasFormat', rdf.Literal(self.url)))
+        props.append(
+            ('dcterms:bibliographicCitation', rdf.Literal(self.bibtex().text())))
+        if self.type in ADD_FIELD_MAP:
+            props.append(ADD_FIELD_MAP[self.type])
+        nodes = []
+        for field, spec in FIELD_MAP.items():
+            value = getattr(self, field, None)
+            if value:
+                value = rdf.Literal('%s' % value)
+                if isinstance(spec, tuple):
+                    node = rdf.BNode()
+                    props.append((spec[0], node))
+                    nodes.append(rdf.properties_as_triples(
+                        node,
+                        [('rdf:type', rdf.url_for_qname(spec[1][0])), (spec[1][1], value)]))
+                else:
+                    props.append((spec, value))
+        return chain(
+            Base.__triples__(self, req),
+            rdf.properties_as_triples(url, props),
+            *nodes)
+
 
 #
 # Several objects can be linked to sources, i.e. they can have references.
@@ -119,7 +153,7 @@ class HasSourceMixin(object):
 
     @declared_attr
     def source_pk(cls):
-        return Column(Integer, ForeignKey('source.pk'))
+        return Column(Integer, ForeignKey('source.pk'), index=True)
 
     @declared_attr
     def source(cls):
@@ -1,4 +1,5 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
+from itertools import chain
 
 from sqlalchemy import Column, Integer, ForeignKey
 from sqlalchemy.orm import relationship
@@ -6,6 +7,7 @@ from sqlalchemy.orm import relationship
 from zope.interface import implementer
 
 from clld.db.meta import Base, PolymorphicBaseMixin
+from clld.lib import rdf
 from clld.db.versioned import Versioned
 from clld import interfaces
 
@@ -35,8 +37,15 @@ class Unit(Base,
 
     """A linguistic unit of a language."""
 
-    language_pk = Column(Integer, ForeignKey('language.pk'))
+    language_pk = Column(Integer, ForeignKey('language.pk'), index=True)
     language = relationship(Language)
 
     def __solr__(self, req):
         return _add_solr_language_info(Base.__solr__(self, req), self)
+
+    def __triples__(self, req):
+        return chain(
+            Base.__triples__(self, req),
+            rdf.properties_as_triples(
+                req.resource_url(self),
+                [('dcterms:language', req.resource_url(self.language))]))
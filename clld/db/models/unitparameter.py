@@ -6,6 +6,7 @@ from sqlalchemy.orm import relationship
 from zope.interface import implementer
 
 from clld.db.meta import Base, PolymorphicBaseMixin
+from clld.lib import rdf
 from clld.db.versioned import Versioned
 from clld import interfaces
 
@@ -32,7 +33,7 @@ class UnitDomainElement(Base,
 
     """Domain element for the domain of a UnitParameter."""
 
-    unitparameter_pk = Column(Integer, ForeignKey('unitparameter.pk'))
+    unitparameter_pk = Column(Integer, ForeignKey('unitparameter.pk'), index=True)
     ord = Column(Integer)
 
     def url(self, request):
@@ -59,3 +60,27 @@ class UnitParameter(Base,
 
     domain = relationship(
         'UnitDomainElement', backref='parameter', order_by=UnitDomainElement.id)
+
+    def __triples__(self, req):
+        url = req.resource_url(self)
+        for t in Base.__triples__(self, req):
+            yield t
+        props = [('rdf:type', rdf.SKOS.Concept)]
+        props.extend(('dcterms:hasPart', req.resource_url(v)) for v in self.unitvalues)
+        props.extend(('skos:narrower', de.url(req)) for de in self.domain)
+        for t in rdf.properties_as_triples(url, props):
+            yield t
+
+        for de in self.domain:
+            label = rdf.Literal('%s' % de, lang='en')
+            props = [
+                ('rdf:type', rdf.DCTERMS.Standard),
+                ('rdf:type', rdf.SKOS.Concept),
+                ('rdfs:label', label),
+                ('skos:prefLabel', label),
+                ('dcterms:title', label)]
+            if de.description:
+                props.append(('dcterms:description', rdf.Literal(de.description, lang='en')))
+            props.append(('skos:broader', url))
+            for t in rdf.properties_as_triples(de.url(req), props):
+                yield t
@@ -1,4 +1,5 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
+from itertools import chain
 
 from sqlalchemy import Column, Float, Integer, ForeignKey
 from sqlalchemy.orm import relationship, validates, backref
@@ -7,6 +8,7 @@ from sqlalchemy.ext.declarative import declared_attr
 from zope.interface import implementer
 
 from clld.db.meta import Base, PolymorphicBaseMixin
+from clld.lib import rdf
 from clld.db.versioned import Versioned
 from clld import interfaces
 
@@ -35,12 +37,12 @@ class UnitValue(Base,
                 HasDataMixin,
                 HasFilesMixin):
 
-    unit_pk = Column(Integer, ForeignKey('unit.pk'))
-    unitparameter_pk = Column(Integer, ForeignKey('unitparameter.pk'))
-    contribution_pk = Column(Integer, ForeignKey('contribution.pk'))
+    unit_pk = Column(Integer, ForeignKey('unit.pk'), index=True)
+    unitparameter_pk = Column(Integer, ForeignKey('unitparameter.pk'), index=True)
+    contribution_pk = Column(Integer, ForeignKey('contribution.pk'), index=True)
 
     # Values may be taken from a domain.
-    unitdomainelement_pk = Column(Integer, ForeignKey('unitdomainelement.pk'))
+    unitdomainelement_pk = Column(Integer, ForeignKey('unitdomainelement.pk'), index=True)
 
     # Languages may have multiple values for the same parameter. Their relative
     # frequency can be stored here.
@@ -65,6 +67,20 @@ class UnitValue(Base,
             assert self.unitdomainelement.unitparameter_pk == unitparameter_pk
         return unitparameter_pk
 
+    def __triples__(self, req):
+        props = []
+        if self.unit_pk:
+            props.append(('dcterms:relation', req.resource_url(self.unit)))
+        if self.unitparameter_pk:
+            props.append(('dcterms:isPartOf', req.resource_url(self.unitparameter)))
+        if self.contribution_pk:
+            props.append(('void:inDataset', req.resource_url(self.contribution)))
+        if self.unitdomainelement_pk:
+            props.append(('dcterms:conformsTo', self.unitdomainelement.url(req)))
+        return chain(
+            Base.__triples__(self, req),
+            rdf.properties_as_triples(req.resource_url(self), props))
+
     def __unicode__(self):
         return self.unitdomainelement.name \
             if self.unitdomainelement else self.name or self.id
@@ -1,4 +1,5 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
+from itertools import chain
 
 from sqlalchemy import (
     Column,
@@ -13,6 +14,7 @@ from sqlalchemy.ext.declarative import declared_attr
 from zope.interface import implementer
 
 from clld.db.meta import Base, PolymorphicBaseMixin
+from clld.lib import rdf
 from clld.db.versioned import Versioned
 from clld import interfaces
 
@@ -46,9 +48,9 @@ class Value(Base,
 
     # we must override the pk col declaration from Base to have it available for ordering.
     pk = Column(Integer, primary_key=True)
-    valueset_pk = Column(Integer, ForeignKey('valueset.pk'))
+    valueset_pk = Column(Integer, ForeignKey('valueset.pk'), index=True)
     # Values may be taken from a domain.
-    domainelement_pk = Column(Integer, ForeignKey('domainelement.pk'))
+    domainelement_pk = Column(Integer, ForeignKey('domainelement.pk'), index=True)
 
     frequency = Column(
         Float,
@@ -74,6 +76,19 @@ class Value(Base,
         res['valueset'] = self.valueset.__json__(req)
         return res
 
+    def __triples__(self, req):
+        props = [('dcterms:isPartOf', req.resource_url(self.valueset))]
+        if self.domainelement_pk:
+            props.append(('dcterms:conformsTo', self.domainelement.url(req)))
+        if self.frequency is not None:
+            props.append(
+                ('dcterms:description', rdf.Literal(self.frequency, datatype=rdf.XSD.float)))
+        for ref in getattr(self, 'references', []):
+            props.append(('dcterms:references', req.resource_url(ref.source)))
+        return chain(
+            Base.__triples__(self, req),
+            rdf.properties_as_triples(req.resource_url(self), props))
+
     def __unicode__(self):
         return self.domainelement.name if self.domainelement else self.name or self.id
 
@@ -82,8 +97,8 @@ class ValueSentence(Base, PolymorphicBaseMixin, Versioned):
 
     """Association between values and sentences given as explanation of a value."""
 
-    value_pk = Column(Integer, ForeignKey('value.pk'))
-    sentence_pk = Column(Integer, ForeignKey('sentence.pk'))
+    value_pk = Column(Integer, ForeignKey('value.pk'), index=True)
+    sentence_pk = Column(Integer, ForeignKey('sentence.pk'), index=True)
     description = Column(Unicode())
 
     value = relationship(Value, backref='sentence_assocs')
@@ -1,4 +1,5 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
+from itertools import chain
 
 from sqlalchemy import Column, Integer, Unicode, ForeignKey
 from sqlalchemy.orm import relationship, backref
@@ -7,6 +8,7 @@ from sqlalchemy.ext.declarative import declared_attr
 from zope.interface import implementer
 
 from clld.db.meta import Base, PolymorphicBaseMixin
+from clld.lib import rdf
 from clld.db.versioned import Versioned
 from clld import interfaces
 
@@ -38,9 +40,9 @@ class ValueSet(Base,
 
     """The intersection of Language and Parameter."""
 
-    language_pk = Column(Integer, ForeignKey('language.pk'))
-    parameter_pk = Column(Integer, ForeignKey('parameter.pk'))
-    contribution_pk = Column(Integer, ForeignKey('contribution.pk'))
+    language_pk = Column(Integer, ForeignKey('language.pk'), index=True)
+    parameter_pk = Column(Integer, ForeignKey('parameter.pk'), index=True)
+    contribution_pk = Column(Integer, ForeignKey('contribution.pk'), index=True)
     source = Column(Unicode, doc='textual description of the source for the valueset')
 
     parameter = relationship('Parameter', backref='valuesets')
@@ -59,6 +61,23 @@ class ValueSet(Base,
     def name(self):
         return self.language.name + ' / ' + self.parameter.name
 
+    def __triples__(self, req):
+        props = []
+        if self.language_pk:
+            props.append(('dcterms:language', req.resource_url(self.language)))
+        if self.parameter_pk:
+            props.append(('dcterms:isPartOf', req.resource_url(self.parameter)))
+        if self.contribution_pk:
+            props.append(('void:inDataset', req.resource_url(self.contribution)))
+        if self.source:
+            props.append(('dcterms:source', rdf.Literal(self.source)))
+        props.extend(('dcterms:hasPart', req.resource_url(v)) for v in self.values)
+        for ref in self.references:
+            props.append(('dcterms:references', req.resource_url(ref.source)))
+        return chain(
+            Base.__triples__(self, req),
+            rdf.properties_as_triples(req.resource_url(self), props))
+
 
 class ValueSetReference(Base, Versioned, HasSourceMixin):
 
@@ -68,5 +87,5 @@ class ValueSetReference(Base, Versioned, HasSourceMixin):
     certain values for a parameter, too.
     """
 
-    valueset_pk = Column(Integer, ForeignKey('valueset.pk'))
+    valueset_pk = Column(Integer, ForeignKey('valueset.pk'), index=True)
     valueset = relationship(ValueSet, backref="references")
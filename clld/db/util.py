@@ -2,11 +2,19 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
 import time
 import re
+from hashlib import md5
+from collections import OrderedDict
 
-from sqlalchemy import Integer, event
-from sqlalchemy.orm import joinedload
+from sqlalchemy import Integer, String, Text, Table, event
 from sqlalchemy.schema import DDL
-from sqlalchemy.sql.expression import cast, func
+from sqlalchemy.sql.expression import (
+    cast, func, FunctionElement, select, union, exists, and_, literal_column,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import to_instance
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.compiler import compiles
 import transaction
 
 from clld.db.meta import DBSession, Base
@@ -89,52 +97,209 @@ def icontains(col, qs):
     return col.ilike(prefix + qs + suffix)
 
 
+class json_value(FunctionElement):
+
+    """SQL expression for the value of a top-level key of a JSON column.
+
+    Allows filtering, sorting and indexing on the keys of ``jsondata`` without loading
+    the objects, e.g.::
+
+        Index(
+            'valueset_number_of_values',
+            json_value(common.ValueSet.jsondata, '_number_of_values', Integer),
+        ).create(DBSession.bind)
+
+    On PostgreSQL this requires the column to be of type ``JSONB``, on SQLite the JSON1
+    extension.
+    """
+
+    __visit_name__ = name = 'json_value'
+
+    def __init__(self, col, key, type_=None):
+        self.key = key
+        FunctionElement.__init__(self, col)
+        self.type = to_instance(String if type_ is None else type_)
+
+
+@compiles(json_value)
+def _compile_json_value(element, compiler, **kw):
+    return 'json_extract(%s, %s)' % (
+        compiler.process(element.clauses, **kw),
+        compiler.render_literal_value('$."%s"' % element.key, String()))
+
+
+@compiles(json_value, 'postgresql')
+def _compile_json_value_postgresql(element, compiler, **kw):
+    res = '(%s ->> %s)' % (
+        compiler.process(element.clauses, **kw),
+        compiler.render_literal_value(element.key, String()))
+    if isinstance(element.type, String):
+        return res
+    return 'CAST(%s AS %s)' % (res, compiler.dialect.type_compiler.process(element.type))
+
+
+class int_floor(FunctionElement):
+
+    """SQL expression for the integral part of a non-negative number.
+
+    SQLite lacks a ``floor`` function, but truncates when casting to integer, while
+    PostgreSQL rounds.
+    """
+
+    __visit_name__ = name = 'int_floor'
+    type = Integer()
+
+
+@compiles(int_floor)
+def _compile_int_floor(element, compiler, **kw):
+    return 'CAST(%s AS INTEGER)' % compiler.process(element.clauses, **kw)
+
+
+@compiles(int_floor, 'postgresql')
+def _compile_int_floor_postgresql(element, compiler, **kw):
+    return 'CAST(floor(%s) AS INTEGER)' % compiler.process(element.clauses, **kw)
+
+
 def compute_language_sources(*references):
     """compute relations between languages and sources.
 
     by going through the relevant models derived from the HasSource mixin.
-    """
-    old_sl = {}
-    for pair in DBSession.query(common.LanguageSource):
-        old_sl[(pair.source_pk, pair.language_pk)] = True
 
+    The missing relations are added with one ``INSERT ... SELECT`` statement.
+
+    :param references: Pairs (model, attribute name) of additional reference models, \
+    where the attribute names a relationship to a model with a ``language_pk`` column.
+    """
+    DBSession.flush()
     references = list(references)
     references.extend([
         (common.ValueSetReference, 'valueset'),
         (common.SentenceReference, 'sentence')])
-    sl = {}
-    for model, attr in references:
-        for ref in DBSession.query(model):
-            sl[(ref.source_pk, getattr(ref, attr).language_pk)] = True
-
-    for s, l in sl:
-        if (s, l) not in old_sl:
-            DBSession.add(common.LanguageSource(language_pk=l, source_pk=s))
+    pairs = union(*[
+        DBSession.query(
+            model.source_pk.label('source_pk'),
+            getattr(model, attr).property.mapper.class_.language_pk.label('language_pk'))
+        .join(getattr(model, attr))
+        .filter(model.source_pk != None)
+        .statement for model, attr in references]).alias('pairs')
+    ls = common.LanguageSource.__table__
+    DBSession.execute(ls.insert().from_select(
+        ['source_pk', 'language_pk'],
+        select([pairs.c.source_pk, pairs.c.language_pk]).where(~exists().where(and_(
+            ls.c.source_pk == pairs.c.source_pk,
+            ls.c.language_pk == pairs.c.language_pk)))))
+    DBSession.expire_all()
+
+
+def has_json_functions():
+    """Whether the database provides the JSON functions of PostgreSQL or SQLite's JSON1.
+    """
+    dialect = DBSession.bind.dialect.name
+    if dialect == 'postgresql':
+        return True  # pragma: no cover
+    if dialect != 'sqlite':
+        return False  # pragma: no cover
+    try:
+        DBSession.execute("SELECT json_set('{}', '$.a', 1)")
+        return True
+    except OperationalError:  # pragma: no cover
+        # SQLite compiled without JSON1.
+        return False
 
 
 def compute_number_of_values():
-    """compute number of values per valueset and store it in valueset's jsondata."""
-    for valueset in DBSession.query(common.ValueSet).options(
-        joinedload(common.ValueSet.values)
-    ):
-        valueset.update_jsondata(_number_of_values=len(valueset.values))
+    """compute number of values per valueset and store it in valueset's jsondata.
+
+    With PostgreSQL or SQLite with JSON1, all valuesets are updated with one ``UPDATE``
+    statement; otherwise valuesets are updated one by one.
+    """
+    DBSession.flush()
+    if not has_json_functions():  # pragma: no cover
+        for valueset in DBSession.query(common.ValueSet).options(
+            joinedload(common.ValueSet.values)
+        ):
+            valueset.update_jsondata(_number_of_values=len(valueset.values))
+        return
+
+    vs, v = common.ValueSet.__table__, common.Value.__table__
+    dialect = DBSession.bind.dialect
+    if dialect.name == 'postgresql':  # pragma: no cover
+        counts = select([vs.c.pk, func.count(v.c.pk).label('n')])\
+            .select_from(vs.outerjoin(v, v.c.valueset_pk == vs.c.pk))\
+            .group_by(vs.c.pk)\
+            .alias('counts')
+        count, where = counts.c.n, vs.c.pk == counts.c.pk
+    else:
+        # SQLAlchemy does not render UPDATE ... FROM for other dialects, so we resort to
+        # a correlated subquery.
+        count = select([func.count(v.c.pk)]).where(v.c.valueset_pk == vs.c.pk).as_scalar()
+        where = None
+
+    if dialect.name == 'postgresql':  # pragma: no cover
+        # Casting to jsonb and back also works for jsondata columns of type VARCHAR.
+        jsondata = cast(
+            func.coalesce(func.nullif(cast(vs.c.jsondata, Text), ''), '{}'), JSONB)\
+            .op('||')(func.jsonb_build_object(
+                literal_column("'_number_of_values'"), count))
+    else:
+        jsondata = func.json_set(
+            func.coalesce(
+                func.nullif(vs.c.jsondata, literal_column("''")), literal_column("'{}'")),
+            literal_column("'$._number_of_values'"),
+            count)
+    DBSession.execute(vs.update(whereclause=where).values(jsondata=jsondata))
+    DBSession.expire_all()
+
+
+def estimated_count(model):
+    """Estimate the number of rows in the table of a model without counting them.
+
+    :return: The row estimate from the query planner statistics on PostgreSQL, else \
+    ``None``.
+    """
+    if DBSession.bind.dialect.name != 'postgresql':
+        return
+    return DBSession.scalar(  # pragma: no cover
+        "SELECT reltuples::bigint FROM pg_class WHERE relname = '%s'"
+        % model.__table__.name)
 
 
 def get_distinct_values(col, key=None):
     return sorted((c for c, in DBSession.query(col).distinct() if c), key=key)
 
 
-def page_query(q, n=1000, verbose=False, commit=False):
+def page_query(q, n=1000, verbose=False, commit=False, key=None):
     """Go through query results in batches.
 
+    By default batches are selected using LIMIT and OFFSET, which means that each batch
+    is more expensive than the one before. If `key` is given, it must be a mapped
+    attribute with unique, non-NULL values - e.g. the primary key of the queried model.
+    The query is then ordered by `key` and batches are selected using a range condition
+    ``key > <last value of the previous batch>`` instead ("keyset pagination"), thus each
+    batch costs about the same, no matter how far into the result we are.
+
+    :param q: SQLAlchemy query.
+    :param n: Batch size.
+    :param key: Mapped attribute to page on, e.g. `Language.pk`.
+
     .. seealso:: http://stackoverflow.com/a/1217947
     """
     s = time.time()
-    offset = 0
+    offset, last = 0, None
+    if key is not None:
+        q = q.order_by(None).order_by(key)
     while True:
-        r = False
-        for elem in q.limit(n).offset(offset):
-            r = True
+        r = 0
+        if key is None:
+            batch = q.limit(n).offset(offset)
+        else:
+            batch = (q if last is None else q.filter(key > last)).limit(n)
+        for elem in batch:
+            r += 1
+            if key is not None:
+                # We read the key before handing out the object, because a commit may
+                # expire it.
+                last = getattr(elem, key.key)
             yield elem
         if commit:  # pragma: no cover
             transaction.commit()
@@ -144,10 +309,53 @@ def page_query(q, n=1000, verbose=False, commit=False):
         if verbose:
             print(e - s, offset, 'done')  # pragma: no cover
         s = e
-        if not r:
+        if r < n:
             break
 
 
+def data_fingerprint(*models):
+    """Compute a fingerprint of the rows stored for some models.
+
+    The fingerprint changes whenever rows are added, removed, (de-)activated or updated -
+    as far as updates are recorded in the ``updated`` column.
+
+    :param models: Model classes or ``Table`` objects; rows of tables are identified by \
+    their primary key, the ``updated`` and ``active`` columns are used if they exist.
+    :return: ``dict`` with keys ``rows`` (the number of rows), ``updated`` (the latest\
+    ``updated`` timestamp as ISO string) and ``hash`` (an md5 hex digest of the stream of\
+    primary keys, ``updated`` timestamps and ``active`` flags).
+    """
+    rows, updated, digest = 0, None, md5()
+    for model in models:
+        if isinstance(model, Table):
+            name = model.name
+            keys = list(model.primary_key.columns) or list(model.c)
+            cols = [model.c[k] if k in model.c else None for k in ['updated', 'active']]
+        else:
+            name, keys, cols = model.__name__, [model.pk], [model.updated, model.active]
+        digest.update(name.encode('utf8'))
+        q = DBSession.query(*(keys + [col for col in cols if col is not None]))
+        key = keys[0] if len(keys) == 1 else None
+        if key is None:
+            q = q.order_by(*keys)
+        for row in page_query(q, n=10000, key=key):
+            rows += 1
+            row = list(row)
+            pk, values = row[:len(keys)], row[len(keys):]
+            row_updated, active = [
+                values.pop(0) if col is not None else None for col in cols]
+            if row_updated and (updated is None or row_updated > updated):
+                updated = row_updated
+            digest.update(('%s %s %s\n' % (
+                ' '.join('%s' % v for v in pk),
+                row_updated.isoformat() if row_updated else '',
+                '' if active is None else active)).encode('utf8'))
+    return OrderedDict([
+        ('rows', rows),
+        ('updated', updated.isoformat() if updated else None),
+        ('hash', digest.hexdigest())])
+
+
 def set_alembic_version(engine, db_version):
     """Sets up the alembic_version table in an sqlite database.
 
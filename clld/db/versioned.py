@@ -36,7 +36,7 @@ def _history_mapper(local_mapper):
         orig = col
         col = col.copy()
         orig.info['history_copy'] = col
-        col.unique = False
+        col.unique = col.index = False
         col.default = col.server_default = None
         return col
 
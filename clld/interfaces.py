@@ -237,6 +237,25 @@ class IBlog(Interface):
         """return URL of a corresponding post."""
 
 
+class IResponseCache(Interface):
+
+    """utility to cache the responses rendered by adapters."""
+
+    shared = Attribute('whether the cache is shared by all processes serving the app')
+
+    def response(self, adapter, ctx, req):
+        """return the - possibly cached - response rendered by adapter for ctx."""
+
+    def get(self, key):
+        """return the bytes stored under key or None."""
+
+    def set(self, key, value):
+        """store bytes value under key."""
+
+    def clear(self):
+        """remove all cached responses."""
+
+
 class IStaticResource(Interface):
 
     """A resource to be linked from the app template."""
@@ -0,0 +1,153 @@
+"""Provides functionality to encode point features as Mapbox vector tiles.
+
+Only what is needed to serve the markers of clld maps is implemented, i.e. tiles with
+layers of point features, encoded as protocol buffer messages without further
+dependencies.
+
+.. seealso:: https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+"""
+from __future__ import unicode_literals, division, absolute_import, print_function
+import math
+import struct
+from collections import OrderedDict
+
+from six import text_type, binary_type, integer_types
+
+#: Media type of vector tiles.
+MIMETYPE = 'application/vnd.mapbox-vector-tile'
+
+#: Number of coordinate units per tile side.
+EXTENT = 4096
+
+#: The maximal latitude of the web mercator projection.
+MAX_LATITUDE = 85.0511287798
+
+# wire types of protocol buffer fields:
+_VARINT, _FIXED64, _BYTES = 0, 1, 2
+
+# command integer for a MoveTo of one point:
+_MOVE_TO_ONE = (1 & 0x7) | (1 << 3)
+
+
+def _varint(n):
+    res = bytearray()
+    while True:
+        byte = n & 0x7f
+        n >>= 7
+        if n:
+            res.append(byte | 0x80)
+        else:
+            res.append(byte)
+            return binary_type(res)
+
+
+def _zigzag(n):
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def _key(number, wire_type):
+    return _varint((number << 3) | wire_type)
+
+
+def _bytes(number, data):
+    return _key(number, _BYTES) + _varint(len(data)) + data
+
+
+def _uint(number, n):
+    return _key(number, _VARINT) + _varint(n)
+
+
+def _packed(number, ints):
+    return _bytes(number, b''.join(_varint(i) for i in ints))
+
+
+def _value(value):
+    """Encode a property value as Value message."""
+    if isinstance(value, bool):
+        return _uint(7, int(value))
+    if isinstance(value, integer_types):
+        return _uint(6, _zigzag(value)) if value < 0 else _uint(5, value)
+    if isinstance(value, float):
+        return _key(3, _FIXED64) + struct.pack('<d', value)
+    return _bytes(1, text_type(value).encode('utf8'))
+
+
+def tile_bounds(z, x, y):
+    """Compute the bounding box of a tile.
+
+    :return: Quadruple (west, south, east, north) of coordinates in degrees.
+
+    >>> tile_bounds(0, 0, 0)[::2]
+    (-180.0, 180.0)
+    """
+    n = 2 ** z
+
+    def lat(y_):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y_ / n))))
+
+    return x / n * 360 - 180, lat(y + 1), (x + 1) / n * 360 - 180, lat(y)
+
+
+def project(lonlat, z, x, y, extent=EXTENT):
+    """Compute the tile coordinates of a point.
+
+    :param lonlat: Pair (longitude, latitude) in degrees.
+    :return: Pair of integer coordinates, relative to the upper left corner of the tile.
+
+    >>> project((0, 0), 1, 0, 0)
+    (4096, 4096)
+    """
+    n = 2 ** z
+    lat = math.radians(max(min(lonlat[1], MAX_LATITUDE), -MAX_LATITUDE))
+    tx = (lonlat[0] + 180) / 360 * n
+    ty = (1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * n
+    return int(round((tx - x) * extent)), int(round((ty - y) * extent))
+
+
+class Layer(object):
+
+    """A layer of point features.
+
+    :param name: Name of the layer, unique within a tile.
+    """
+
+    def __init__(self, name, extent=EXTENT):
+        self.name = name
+        self.extent = extent
+        self.features = []
+        # keys and encoded values are stored once per layer and referenced by index:
+        self.keys = OrderedDict()
+        self.values = OrderedDict()
+
+    def add_point(self, xy, properties=None):
+        """Add a point feature.
+
+        :param xy: Pair of tile coordinates of the point.
+        :param properties: ``dict`` of feature properties; ``None`` values are skipped.
+        """
+        tags = []
+        for key, value in sorted((properties or {}).items()):
+            if value is not None:
+                tags.append(self.keys.setdefault(key, len(self.keys)))
+                tags.append(self.values.setdefault(_value(value), len(self.values)))
+        self.features.append(
+            _packed(2, tags)
+            + _uint(3, 1)  # geometry type POINT
+            + _packed(4, [_MOVE_TO_ONE, _zigzag(xy[0]), _zigzag(xy[1])]))
+
+    def encode(self):
+        return b''.join(
+            [_uint(15, 2), _bytes(1, text_type(self.name).encode('utf8'))]
+            + [_bytes(2, feature) for feature in self.features]
+            + [_bytes(3, text_type(key).encode('utf8')) for key in self.keys]
+            + [_bytes(4, value) for value in self.values]
+            + [_uint(5, self.extent)])
+
+
+def encode(layers):
+    """Encode layers as vector tile.
+
+    :param layers: Iterable of :py:class:`Layer` instances.
+    :return: ``bytes`` of the serialized tile.
+    """
+    return b''.join(_bytes(3, layer.encode()) for layer in layers if layer.features)
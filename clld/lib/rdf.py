@@ -1,10 +1,12 @@
 """This module provides functionality for handling our data as rdf."""
 from __future__ import unicode_literals, division, absolute_import, print_function
+import re
 from collections import namedtuple
+from itertools import groupby
 
-from six import string_types, BytesIO
-from clldutils.misc import encoded
-from rdflib import Graph, URIRef, Literal
+from six import string_types, text_type, BytesIO
+from clldutils.misc import encoded, xmlchars
+from rdflib import Graph, URIRef, Literal, BNode
 from rdflib.namespace import (
     Namespace, DC, DCTERMS, DOAP, FOAF, OWL, RDF, RDFS, SKOS, VOID, XMLNS, XSD,
 )
@@ -115,3 +117,194 @@ def convert(string, from_, to_):
     g.serialize(out, format=to_)
     out.seek(0)
     return out.read()
+
+
+def term(obj):
+    """Convert an object to an RDF term.
+
+    Strings looking like HTTP URLs are converted to ``URIRef``, other objects - except
+    RDF terms - to ``Literal``, like the objects of the properties passed to
+    :py:func:`properties_as_xml_snippet`.
+
+    >>> term('http://example.org')
+    rdflib.term.URIRef('http://example.org')
+    """
+    if isinstance(obj, (URIRef, Literal, BNode)):
+        return obj
+    if isinstance(obj, string_types) and (
+            obj.startswith('http://') or obj.startswith('https://')):
+        return URIRef(obj)
+    return Literal(obj)
+
+
+_PREDICATES = {}
+
+
+def properties_as_triples(subject, props):
+    """Expand pairs (predicate, object) to triples.
+
+    :param subject: URL or RDF term of the subject of the triples.
+    :param props: Iterable of pairs (predicate, object) as returned by the ``__rdf__``\
+    method of resources; predicates may be given in prefix:localname notation.
+    """
+    if isinstance(subject, string_types) and not isinstance(subject, (URIRef, BNode)):
+        subject = URIRef(subject)
+    for p, o in props or []:
+        try:
+            predicate = _PREDICATES[p]
+        except KeyError:
+            predicate = _PREDICATES.setdefault(p, URIRef(expand_prefix(p)))
+        yield subject, predicate, term(o)
+
+
+#
+# Serialization of triples without an intermediate rdflib Graph:
+#
+_PN_LOCAL = re.compile(r'[A-Za-z_][A-Za-z0-9_\-]*$')
+_IRI_ESCAPE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+_LITERAL_ESCAPE = re.compile(r'[\x00-\x1f"\\]')
+_LITERAL_ESCAPES = {'\\': r'\\', '"': r'\"', '\n': r'\n', '\r': r'\r', '\t': r'\t'}
+_QNAMES = {}
+
+
+def qname(uri):
+    """Split a URI into namespace prefix and local name, if we know the namespace.
+
+    :return: Pair (prefix, localname) or ``None``.
+
+    >>> qname('http://purl.org/dc/terms/title')
+    ('dcterms', 'title')
+    """
+    try:
+        return _QNAMES[uri]
+    except KeyError:
+        res = None
+        for prefix, ns in NAMESPACES.items():
+            ns = text_type(ns)
+            if uri.startswith(ns) and _PN_LOCAL.match(uri[len(ns):]):
+                if res is None or len(ns) > len(text_type(NAMESPACES[res[0]])):
+                    res = (prefix, uri[len(ns):])
+        return _QNAMES.setdefault(uri, res)
+
+
+def _iri(uri):
+    return '<%s>' % _IRI_ESCAPE.sub(lambda m: '\\u%04X' % ord(m.group(0)), uri)
+
+
+def _string(s):
+    return '"%s"' % _LITERAL_ESCAPE.sub(
+        lambda m: _LITERAL_ESCAPES.get(m.group(0), '\\u%04X' % ord(m.group(0))), s)
+
+
+def nt_term(obj):
+    """Serialize an RDF term in N-Triples notation."""
+    if isinstance(obj, BNode):
+        return '_:%s' % obj
+    if isinstance(obj, Literal):
+        if obj.language:
+            return '%s@%s' % (_string(obj), obj.language)
+        if obj.datatype:
+            return '%s^^%s' % (_string(obj), _iri(obj.datatype))
+        return _string(obj)
+    return _iri(obj)
+
+
+def turtle_term(obj):
+    """Serialize an RDF term in Turtle notation, using our default prefixes."""
+    if isinstance(obj, Literal):
+        if obj.datatype and not obj.language:
+            return '%s^^%s' % (_string(obj), turtle_term(obj.datatype))
+    elif not isinstance(obj, BNode):
+        qn = qname(obj)
+        if qn:
+            return '%s:%s' % qn
+    return nt_term(obj)
+
+
+def _xml_text(s):
+    return xmlchars(s).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _xml_attr(s):
+    return _xml_text(s).replace('"', '&quot;')
+
+
+def _xml_property(predicate, obj):
+    qn = qname(predicate)
+    if qn:
+        tag, ns = '%s:%s' % qn, ''
+    else:
+        ns, _, local = predicate.rpartition('/')
+        if '#' in local:
+            ns, _, local = predicate.rpartition('#')
+            ns += '#'
+        else:
+            ns += '/'
+        if not _PN_LOCAL.match(local):
+            raise ValueError(predicate)
+        tag, ns = 'ns0:' + local, ' xmlns:ns0="%s"' % _xml_attr(ns)
+
+    if isinstance(obj, BNode):
+        return '<%s%s rdf:nodeID="%s"/>' % (tag, ns, obj)
+    if isinstance(obj, Literal):
+        if obj.language:
+            attr = ' xml:lang="%s"' % obj.language
+        elif obj.datatype:
+            attr = ' rdf:datatype="%s"' % _xml_attr(obj.datatype)
+        else:
+            attr = ''
+        return '<%s%s%s>%s</%s>' % (tag, ns, attr, _xml_text(obj), tag)
+    return '<%s%s rdf:resource="%s"/>' % (tag, ns, _xml_attr(obj))
+
+
+def _serialize_nt(triples):
+    for s, p, o in triples:
+        yield '%s %s %s .\n' % (nt_term(s), _iri(p), nt_term(o))
+
+
+def _serialize_turtle(triples):
+    for subject, _triples in groupby(triples, lambda t: t[0]):
+        yield '%s %s .\n\n' % (turtle_term(subject), ' ;\n    '.join(
+            '%s %s' % (turtle_term(p), turtle_term(o)) for _, p, o in _triples))
+
+
+def _serialize_xml(triples):
+    for subject, _triples in groupby(triples, lambda t: t[0]):
+        yield '  <rdf:Description %s="%s">\n%s\n  </rdf:Description>\n' % (
+            'rdf:nodeID' if isinstance(subject, BNode) else 'rdf:about',
+            _xml_attr(subject),
+            '\n'.join('    ' + _xml_property(p, o) for _, p, o in _triples))
+
+
+def serialize(triples, format_, header=True):
+    """Serialize triples in one of our RDF notations, without creating a Graph.
+
+    The serialization is created incrementally, thus triples may be streamed from
+    the database. Triples with the same subject are grouped if they are adjacent.
+
+    :param triples: Iterable of RDF triples.
+    :param format_: Name of the RDF notation, i.e. a key of :py:data:`FORMATS`; N3 is \
+    written as Turtle, which is a subset of N3.
+    :param header: Flag signaling whether to include namespace prefix declarations and \
+    - for RDF/XML - the enclosing ``rdf:RDF`` element.
+    :return: Generator of text chunks.
+    """
+    assert format_ in FORMATS
+    if format_ == 'nt':
+        for chunk in _serialize_nt(triples):
+            yield chunk
+    elif format_ in ['n3', 'turtle']:
+        if header:
+            for prefix, ns in sorted(NAMESPACES.items()):
+                yield '@prefix %s: %s .\n' % (prefix, _iri(text_type(ns)))
+            yield '\n'
+        for chunk in _serialize_turtle(triples):
+            yield chunk
+    else:
+        if header:
+            yield '<?xml version="1.0" encoding="UTF-8"?>\n<rdf:RDF %s>\n' % ' '.join(
+                'xmlns:%s="%s"' % item for item in sorted(NAMESPACES.items()))
+        for chunk in _serialize_xml(triples):
+            yield chunk
+        if header:
+            yield '</rdf:RDF>\n'
@@ -11,13 +11,15 @@ Functionality to be called from command line scripts is provided in this module.
 """
 from __future__ import unicode_literals, division, absolute_import, print_function
 import os
+import sys
 import argparse
 
 import transaction
 
-from clld.interfaces import IDownload
+from clld.interfaces import IResponseCache
 from clld.scripts.util import parsed_args, gbs_func
 from clld.scripts.freeze import freeze_func, unfreeze_func
+from clld.scripts.downloads import create_downloads_func
 from clld.scripts.internetarchive import ia_func
 from clld.scripts.llod import llod_func, register
 
@@ -46,10 +48,36 @@ def create_downloads(**kw):  # pragma: no cover
     """
     Create all registered downloads (locally).
     """
-    args = parsed_args(bootstrap=True, description=create_downloads.__doc__)
-    for name, download in args.env['registry'].getUtilitiesFor(IDownload):
-        args.log.info('creating download %s' % name)
-        download.create(args.env['request'])
+    add_args = [
+        (("--jobs",),
+         dict(type=int, default=1, help="number of worker processes (default: 1)")),
+        (("--force",),
+         dict(action="store_true", default=False,
+              help="re-create downloads even if their data has not changed")),
+    ]
+    args = parsed_args(*add_args, bootstrap=True, description=create_downloads.__doc__)
+    results = create_downloads_func(args, jobs=args.jobs, force=args.force)
+    failed = [r.name for r in results if r.error]
+    if failed:
+        args.log.error('failed downloads: %s' % ', '.join(failed))
+        sys.exit(1)
+
+
+def clear_cache(**kw):  # pragma: no cover
+    """
+    Remove all responses from the response cache of an app.
+    """
+    args = parsed_args(bootstrap=True, description=clear_cache.__doc__)
+    cache = args.env['registry'].queryUtility(IResponseCache)
+    if not cache:
+        args.log.info('no response cache configured')
+    elif not cache.shared:
+        args.log.warning(
+            'the response cache is held in the memory of each app process, '
+            'thus can only be cleared by restarting the app')
+    else:
+        cache.clear()
+        args.log.info('response cache cleared')
 
 
 def google_books(**kw):  # pragma: no cover
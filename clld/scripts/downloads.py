@@ -0,0 +1,235 @@
+"""
+Creation of the registered downloads of an app.
+
+Downloads can be created serially in the process of the calling script, or fanned out
+across a pool of worker processes. Each worker bootstraps the app from the config file
+and connects to the database with its own engine.
+
+Downloads may declare the names of downloads they depend on in
+:py:attr:`clld.web.adapters.download.Download.depends_on`; they are created only after
+these have been created successfully.
+
+Downloads are only re-created if the data they are created from has changed, i.e. if
+the fingerprint computed by :py:meth:`clld.web.adapters.download.Download.fingerprint`
+differs from the one recorded in a sidecar file when the download was created last - or
+if a download they depend on has been re-created.
+"""
+from __future__ import unicode_literals, division, absolute_import, print_function
+import os
+import time
+import traceback
+import multiprocessing
+from collections import OrderedDict, namedtuple
+
+from six import PY3
+from six.moves import queue
+from sqlalchemy import create_engine
+from pyramid.paster import bootstrap
+from clldutils.misc import format_size
+
+from clld.interfaces import IDownload
+from clld.db.meta import DBSession, Base
+from clld.db.models import common
+from clld.scripts.util import setup_session
+
+
+class DownloadResult(
+        namedtuple('DownloadResult', 'name seconds rows size error skipped')):
+
+    """Statistics about the creation of a download."""
+
+    def __new__(cls, name, seconds, rows, size, error, skipped=False):
+        return super(DownloadResult, cls).__new__(
+            cls, name, seconds, rows, size, error, skipped)
+
+    def __str__(self):
+        if self.skipped:
+            return '%s is up-to-date' % self.name
+        if self.error:
+            return '%s failed after %.1fs:\n%s' % (self.name, self.seconds, self.error)
+        return '%s created in %.1fs: %s rows, %s' % (
+            self.name,
+            self.seconds,
+            '?' if self.rows is None else self.rows,
+            '?' if self.size is None else format_size(self.size))
+
+
+def schedule(downloads):
+    """Order downloads such that each download comes after its dependencies.
+
+    :param downloads: ``dict`` mapping names to downloads.
+    :return: ``list`` of download names.
+    """
+    res, visiting = [], set()
+
+    def visit(name):
+        if name in res:
+            return
+        if name in visiting:
+            raise ValueError('circular dependency of download %s' % name)
+        visiting.add(name)
+        for dep in getattr(downloads[name], 'depends_on', ()):
+            if dep not in downloads:
+                raise ValueError('download %s depends on unknown %s' % (name, dep))
+            visit(dep)
+        visiting.remove(name)
+        res.append(name)
+
+    for name in downloads:
+        visit(name)
+    return res
+
+
+def create_download(name, download, req, force=False):
+    """Create a download, catching and reporting any errors.
+
+    :param force: Create the download even if its data has not changed.
+    :return: :py:class:`DownloadResult` instance.
+    """
+    start, rows, size, error = time.time(), None, None, None
+    try:
+        fingerprint = download.fingerprint(req)
+        if fingerprint and not force and download.is_current(req, fingerprint):
+            return DownloadResult(name, time.time() - start, None, None, None, True)
+        rows = download.create(req)
+        path = download.abspath(req)
+        if path.exists():
+            size = path.stat().st_size
+            if fingerprint:
+                download.save_fingerprint(req, fingerprint)
+    except Exception:
+        error = traceback.format_exc()
+    return DownloadResult(name, time.time() - start, rows, size, error)
+
+
+#: Seconds to wait for a download to be created before checking for dead workers.
+POLL_INTERVAL = 2
+
+_ENV = {}
+
+
+def _init_worker(config_uri, dburi, started=None):  # pragma: no cover
+    _ENV['started'] = started
+    # An exception raised here would terminate the worker - and the pool would keep
+    # replacing it - so we record the error and report it for each download instead.
+    try:
+        _ENV.update(bootstrap(config_uri))
+        setup_session(config_uri, engine=create_engine(dburi) if dburi else None)
+        # make sure we create URLs in the correct domain
+        dataset = DBSession.query(common.Dataset).first()
+        if dataset:
+            _ENV['request'].environ['HTTP_HOST'] = dataset.domain
+    except Exception:
+        _ENV['error'] = traceback.format_exc()
+
+
+def _create_download(name, force):  # pragma: no cover
+    if _ENV.get('started') is not None:
+        # Let the parent process know which worker is creating the download:
+        _ENV['started'].put((name, os.getpid()))
+    if 'error' in _ENV:
+        return DownloadResult(
+            name, 0, None, None, 'worker initialization failed:\n' + _ENV['error'])
+    try:
+        download = _ENV['registry'].getUtility(IDownload, name=name)
+    except Exception:
+        return DownloadResult(name, 0, None, None, traceback.format_exc())
+    return create_download(name, download, _ENV['request'], force)
+
+
+def create_downloads_func(args, jobs=1, force=False, log=None):
+    """Create all downloads registered with the app.
+
+    :param jobs: Number of worker processes; with ``jobs=1`` the downloads are created\
+    in the current process.
+    :param force: Re-create downloads even if their data has not changed.
+    :return: ``list`` of :py:class:`DownloadResult` instances.
+    """
+    log = log or args.log
+    downloads = OrderedDict(args.env['registry'].getUtilitiesFor(IDownload))
+    order = schedule(downloads)
+    results = OrderedDict()
+
+    def report(result):
+        results[result.name] = result
+        (log.error if result.error else log.info)(str(result))
+
+    def ready(name):
+        deps = getattr(downloads[name], 'depends_on', ())
+        if any(dep in results and results[dep].error for dep in deps):
+            report(DownloadResult(name, 0, None, None, 'failed dependency'))
+            return False
+        return all(dep in results for dep in deps)
+
+    def must_create(name):
+        return force or any(
+            not results[dep].skipped for dep in getattr(downloads[name], 'depends_on', ()))
+
+    if jobs <= 1:
+        for name in order:
+            if ready(name):
+                log.info('creating download %s' % name)
+                report(create_download(
+                    name, downloads[name], args.env['request'], must_create(name)))
+        return list(results.values())
+
+    # workers must not inherit connections of the parent process:
+    bind = DBSession.bind or Base.metadata.bind
+    DBSession.remove()
+    if bind is not None:
+        bind.dispose()
+    dburi = str(args.engine.url) if getattr(args, 'engine', None) else None
+    # Workers report the downloads they start creating, so that we can detect downloads
+    # which are lost, because the worker process died.
+    started, pids = multiprocessing.Queue(), {}
+    pool = multiprocessing.Pool(
+        jobs, initializer=_init_worker, initargs=(args.config_uri, dburi, started))
+    # Results are passed from the pool's result handler thread via a queue:
+    done = queue.Queue()
+    pending, running = list(order), set()
+
+    def lost():
+        """The pool replaces dead workers, but never reports the tasks they ran."""
+        while True:
+            try:
+                name, pid = started.get_nowait()
+            except queue.Empty:
+                break
+            pids[name] = pid
+        alive = set(p.pid for p in multiprocessing.active_children())
+        return [name for name in running if name in pids and pids[name] not in alive]
+
+    def submit():
+        for name in list(pending):
+            if name in results:
+                pending.remove(name)
+            elif ready(name):
+                log.info('creating download %s' % name)
+                kw = {}
+                if PY3:  # pragma: no cover
+                    kw['error_callback'] = lambda e, name=name: done.put(
+                        DownloadResult(name, 0, None, None, repr(e)))
+                pool.apply_async(
+                    _create_download, (name, must_create(name)), callback=done.put, **kw)
+                running.add(name)
+                pending.remove(name)
+
+    try:
+        submit()
+        while running:
+            try:
+                result = done.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                for name in lost():
+                    running.discard(name)
+                    report(DownloadResult(name, 0, None, None, 'worker process died'))
+            else:
+                if result.name not in running:  # pragma: no cover
+                    continue
+                running.discard(result.name)
+                report(result)
+            submit()
+    finally:
+        pool.close()
+        pool.join()
+    return list(results.values())
@@ -34,7 +34,8 @@ def ia_func(command, args, sources=None):  # pragma: no cover
             sources = sources()
 
     i = 0
-    for i, source in enumerate(page_query(sources, verbose=True, commit=True)):
+    for i, source in enumerate(
+            page_query(sources, verbose=True, commit=True, key=common.Source.pk)):
         filepath = args.data_file('ia', 'source%s.json' % source.id)
 
         if command in ['verify', 'update']:
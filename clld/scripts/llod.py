@@ -71,7 +71,7 @@ def llod_func(args):  # pragma: no cover
             except InvalidRequestError:
                 args.log.info('... skipping')
                 continue
-            for obj in page_query(q.order_by(rsc.model.pk), n=10000, verbose=True):
+            for obj in page_query(q, n=10000, verbose=True, key=rsc.model.pk):
                 graph = get_graph(obj, args.env['request'], rsc.name)
                 count_triples += len(graph)
                 count_rsc += 1
@@ -262,7 +262,8 @@ def gbs_func(command, args, sources=None):  # pragma: no cover
     if callable(sources):
         sources = sources()
 
-    for i, source in enumerate(page_query(sources, verbose=True, commit=True)):
+    for i, source in enumerate(
+            page_query(sources, verbose=True, commit=True, key=common.Source.pk)):
         filepath = args.data_file('gbs', 'source%s.json' % source.id)
 
         if command == 'update':
@@ -23,6 +23,30 @@ class Tests(WithCustomLanguageMixin, WithDbMixin, unittest.TestCase):
             self.assertEqual(lang.jsondata['i'], 2)
             break
 
+    def test_JSONEncodedDict_mutation(self):
+        from sqlalchemy.dialects import postgresql
+        from clld.db.meta import JSONEncodedDict
+
+        l = Language(id='abc', name='Name')
+        DBSession.add(l)
+        DBSession.flush()
+        l.jsondata['i'] = 2
+        DBSession.flush()
+        DBSession.expunge(l)
+        self.assertEqual(Language.get('abc').jsondata, {'i': 2})
+
+        type_, dialect = JSONEncodedDict(), postgresql.dialect()
+        self.assertEqual(type_.process_bind_param(None, dialect), '{}')
+        # Values are bound as strings on PostgreSQL as well, so they can be stored in
+        # columns of type VARCHAR and JSONB:
+        self.assertEqual(
+            json.loads(type_.dialect_impl(dialect).bind_processor(dialect)({'a': 1})),
+            {'a': 1})
+        self.assertEqual(type_.process_result_value('{"a": 1}', dialect), {'a': 1})
+        self.assertEqual(type_.process_result_value({'a': 1}, dialect), {'a': 1})
+        self.assertIsInstance(
+            type_.load_dialect_impl(dialect), postgresql.JSONB)
+
     def test_CustomModelMixin(self):
         from clld.tests.fixtures import CustomLanguage
 
@@ -33,6 +57,30 @@ class Tests(WithCustomLanguageMixin, WithDbMixin, unittest.TestCase):
             self.assertTrue('custom_t' in lang.__solr__(None))
             break
 
+    def test_serialization_plan(self):
+        from clld.tests.fixtures import CustomLanguage
+        from clld.db.meta import serialization_plan
+
+        plan = serialization_plan(CustomLanguage)
+        self.assertIs(plan, serialization_plan(CustomLanguage))
+        self.assertEqual(plan.rscname, 'Language')
+        self.assertIn('custom', plan.csv_head)
+        self.assertNotIn('polymorphic_type', plan.json_keys)
+        self.assertNotIn('name', plan.solr_keys)
+
+        langs = [
+            Language(id='def', name='Name', latitude=1.5),
+            CustomLanguage(id='abc', name='Name', custom='c', active=True)]
+        DBSession.add_all(langs)
+        DBSession.flush()
+        self.assertEqual(
+            Language.csv_rows(langs), [lang.to_csv(cols=lang.csv_head()) for lang in langs])
+        self.assertEqual(langs[1].__json__(None)['custom'], 'c')
+        docs = [lang.__solr__(None) for lang in langs]
+        self.assertEqual(docs[0]['latitude_f'], 1.5)
+        self.assertEqual(docs[1]['custom_t'], 'c')
+        self.assertIs(docs[1]['active'], True)
+
     def test_CustomModelMixin_polymorphic(self):
         from clld.tests.fixtures import CustomLanguage
 
@@ -36,6 +36,38 @@ class Tests(WithCustomLanguageMixin, WithDbMixin, unittest.TestCase):
 
         migration.delete(common.Identifier, pk=pk)
         self.assertRaises(InvalidRequestError, DBSession.refresh, identifier)
+        self.assertEqual(migration.jsondata_to_jsonb(), [])
+
+    def test_jsondata_to_jsonb(self):
+        from sqlalchemy.dialects import postgresql
+        from clld.db.migration import Connection
+
+        class PostgresqlConnection(list):
+            dialect = postgresql.dialect()
+
+            def execute(self, sql):
+                self.append(sql)
+                if 'information_schema' in sql:
+                    return [('language',), ('value',)]
+
+        conn = PostgresqlConnection()
+        migration = Connection(conn)
+        self.assertEqual(
+            migration.jsondata_to_jsonb(common.Language, common.Source), ['language'])
+        self.assertIn('ALTER TABLE "language" ALTER COLUMN jsondata TYPE jsonb', conn[-1])
+        self.assertEqual(len(conn), 2)
+        self.assertEqual(migration.jsondata_to_jsonb(), ['language', 'value'])
+
+    def test_create_indexes(self):
+        from clld.db.migration import Connection
+
+        self.assertIn(
+            'ix_value_active_pk', [i.name for i in common.Value.__table__.indexes])
+        migration = Connection(DBSession)
+        self.assertEqual(migration.create_indexes(), [])
+        migration.execute('DROP INDEX ix_valueset_language_pk')
+        self.assertEqual(
+            migration.create_indexes(common.ValueSet), ['ix_valueset_language_pk'])
 
     def test_set_glottocode(self):
         from clld.db.migration import Connection
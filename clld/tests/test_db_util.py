@@ -2,24 +2,77 @@
 from __future__ import unicode_literals
 import unittest
 
+from mock import Mock, patch
+
 from clld.tests.util import WithDbAndDataMixin
 
 
 class Tests(WithDbAndDataMixin, unittest.TestCase):
     def test_compute_language_sources(self):
         from clld.db.util import compute_language_sources
-        from clld.db.models.common import Source, Sentence, Language, SentenceReference
+        from clld.db.models.common import (
+            Source, Sentence, Language, SentenceReference, ValueSetReference,
+            LanguageSource,
+        )
         from clld.db.meta import DBSession
 
         s = Sentence(id='sentenced', language=Language(id='newlang'))
         sr = SentenceReference(sentence=s, source=Source.first())
         DBSession.add(sr)
         DBSession.flush()
-        compute_language_sources()
+        expected = set(
+            (ls.source_pk, ls.language_pk) for ls in DBSession.query(LanguageSource))
+        for ref in DBSession.query(ValueSetReference):
+            expected.add((ref.source_pk, ref.valueset.language_pk))
+        for ref in DBSession.query(SentenceReference):
+            expected.add((ref.source_pk, ref.sentence.language_pk))
+
+        for _ in range(2):
+            compute_language_sources()
+            pairs = [
+                (ls.source_pk, ls.language_pk) for ls in DBSession.query(LanguageSource)]
+            self.assertEqual(len(pairs), len(expected))
+            self.assertEqual(set(pairs), expected)
+        self.assertIn(s.language, sr.source.languages)
 
     def test_compute_number_of_values(self):
-        from clld.db.util import compute_number_of_values
+        from clld.db.util import compute_number_of_values, has_json_functions
+        from clld.db.models.common import ValueSet
+        from clld.db.meta import DBSession
+
+        vs = ValueSet.first()
+        vs.update_jsondata(a=1)
+        for json_functions in [True, False]:
+            with patch(
+                    'clld.db.util.has_json_functions', Mock(return_value=json_functions)):
+                compute_number_of_values()
+            self.assertEqual(vs.jsondata['a'], 1)
+            for valueset in DBSession.query(ValueSet):
+                self.assertEqual(
+                    valueset.jsondata['_number_of_values'], len(valueset.values))
+        self.assertTrue(has_json_functions())
+
+    def test_json_value(self):
+        from sqlalchemy import Integer, Index
+        from sqlalchemy.dialects import postgresql
+        from clld.db.util import compute_number_of_values, json_value
+        from clld.db.models.common import ValueSet
+        from clld.db.meta import DBSession
+
         compute_number_of_values()
+        DBSession.flush()
+        nvalues = json_value(ValueSet.jsondata, '_number_of_values', Integer)
+        index = Index('valueset_number_of_values', nvalues)
+        index.create(DBSession.connection())
+        ValueSet.__table__.indexes.discard(index)
+        self.assertEqual(
+            DBSession.query(ValueSet.pk).filter(nvalues > 0).count(),
+            len([vs for vs in DBSession.query(ValueSet) if vs.values]))
+        self.assertEqual(
+            DBSession.query(json_value(ValueSet.jsondata, 'x')).first(), (None,))
+        self.assertEqual(
+            str(nvalues.compile(dialect=postgresql.dialect())),
+            "CAST((valueset.jsondata ->> '_number_of_values') AS INTEGER)")
 
     def test_icontains(self):
         from clld.db.util import icontains
@@ -35,3 +88,44 @@ class Tests(WithDbAndDataMixin, unittest.TestCase):
         from clld.db.models.common import Language
 
         collkey(Language.name)
+
+    def test_page_query(self):
+        from clld.db.util import page_query
+        from clld.db.models.common import Language
+        from clld.db.meta import DBSession
+
+        for i in range(5):
+            DBSession.add(Language(id='pq%s' % i, name='pq%s' % i))
+        DBSession.flush()
+        q = DBSession.query(Language).order_by(Language.pk)
+        all_ = [l.pk for l in q]
+        self.assertEqual([l.pk for l in page_query(q, n=2)], all_)
+        self.assertEqual([l.pk for l in page_query(q, n=2, key=Language.pk)], all_)
+        self.assertEqual(
+            [l.id for l in page_query(
+                q.order_by(None).order_by(Language.id), n=3, key=Language.id)],
+            sorted(l.id for l in q))
+
+    def test_data_fingerprint(self):
+        from datetime import datetime
+        from clld.db.util import data_fingerprint
+        from clld.db.models.common import Language, Source
+        from clld.db.meta import DBSession
+
+        fp = data_fingerprint(Language, Source)
+        self.assertEqual(
+            fp['rows'], DBSession.query(Language).count() + DBSession.query(Source).count())
+        self.assertEqual(data_fingerprint(Language, Source), fp)
+        self.assertNotEqual(data_fingerprint(Language), fp)
+
+        DBSession.add(Language(id='fp', name='fp', updated=datetime(2100, 1, 1)))
+        DBSession.flush()
+        fp2 = data_fingerprint(Language, Source)
+        self.assertEqual(fp2['rows'], fp['rows'] + 1)
+        self.assertTrue(fp2['updated'].startswith('2100'))
+        self.assertNotEqual(fp2['hash'], fp['hash'])
+
+        # Tables are fingerprinted like their models:
+        fp = data_fingerprint(Language.__table__)
+        self.assertEqual(fp['rows'], DBSession.query(Language).count())
+        self.assertEqual(fp['updated'], fp2['updated'])
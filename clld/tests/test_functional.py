@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
+from tempfile import mkdtemp
+
+from clldutils.path import Path, rmtree
 
 from clld.tests.util import TestWithApp, WithDbAndDataMixin
 from clld import RESOURCES
@@ -66,3 +69,80 @@ class Tests(WithDbAndDataMixin, TestWithApp):
         self.app.get('/languages/replaced', status=301)
         self.app.get('/languages/gone', status=410)
         self.app.get('/sources/replaced', status=301)
+
+    def test_conditional_get(self):
+        res = self.app.get('/languages/language.rdf')
+        self.assertTrue(res.etag and res.last_modified)
+        self.app.get(
+            '/languages/language.rdf', headers={'If-None-Match': res.etag}, status=304)
+        self.app.get(
+            '/languages/language.rdf',
+            headers={'If-Modified-Since': res.headers['Last-Modified']},
+            status=304)
+        self.app.get(
+            '/languages/language.rdf', headers={'If-None-Match': '"x"'}, status=200)
+        self.assertNotEqual(self.app.get('/languages/language.json').etag, res.etag)
+
+        res = self.app.get('/languages.json')
+        self.app.get('/languages.json', headers={'If-None-Match': res.etag}, status=304)
+        self.assertNotEqual(
+            self.app.get('/languages.json?sSearch_0=x').etag, res.etag)
+
+    def test_response_cache(self):
+        from clld.interfaces import IResponseCache
+        from clld.web.cache import MemoryCache
+
+        registry = self.env['registry']
+        cache = MemoryCache()
+        registry.registerUtility(cache, IResponseCache)
+        try:
+            res = self.app.get('/languages/language.json')
+            self.assertEqual(self.app.get('/languages/language.json').body, res.body)
+            self.app.get('/languages/language.json?_=1')
+            self.assertEqual(cache.stats, {'hits': 2, 'misses': 1})
+            res = self.app.get('/languages.html')
+            self.assertIn('Link', self.app.get('/languages.html').headers)
+            self.app.get(
+                '/languages/language.json', headers={'If-None-Match': res.etag},
+                status=200)
+            self.assertEqual(cache.stats['hits'], 4)
+        finally:
+            registry.unregisterUtility(cache, IResponseCache)
+
+    def test_tiles(self):
+        from clld.lib.mvt import MIMETYPE
+        from clld.web.views.tiles import nearest_longitude
+
+        self.assertEqual(nearest_longitude(300, -90, 0), -60)
+        self.assertEqual(nearest_longitude(179, -190, -80), -181)
+
+        settings = self.env['registry'].settings
+        tmp = Path(mkdtemp())
+        settings['clld.tile_cache'] = tmp.as_posix()
+        try:
+            res = self.app.get('/languages/tiles/0/0/0.mvt')
+            self.assertEqual(res.content_type, MIMETYPE)
+            self.assertIn(b'language', res.body)
+            self.app.get(
+                '/languages/tiles/0/0/0.mvt',
+                headers={'If-None-Match': res.etag},
+                status=304)
+            self.assertEqual(self.app.get('/languages/tiles/0/0/0.mvt').body, res.body)
+            self.assertEqual(self.app.get('/languages/tiles/18/0/0.mvt').body, b'')
+            self.app.get('/languages/tiles/1/2/0.mvt', status=404)
+            self.app.get('/languages/tiles/19/0/0.mvt', status=404)
+
+            res = self.app.get('/parameters/parameter/tiles/0/0/0.mvt?layers=1')
+            self.assertIn(b'de', res.body)
+            self.assertNotEqual(
+                self.app.get('/parameters/parameter/tiles/0/0/0.mvt').body, res.body)
+            self.app.get('/contributors/contributor/tiles/0/0/0.mvt', status=404)
+
+            # Least recently used tiles are evicted from a full cache:
+            settings['clld.tile_cache_size'] = '1'
+            self.assertIn(b'language', self.app.get('/languages/tiles/1/0/0.mvt').body)
+            self.assertEqual([p for d in tmp.iterdir() for p in d.iterdir()], [])
+        finally:
+            del settings['clld.tile_cache']
+            settings.pop('clld.tile_cache_size', None)
+            rmtree(tmp)
@@ -0,0 +1,32 @@
+from __future__ import unicode_literals, division, absolute_import, print_function
+import unittest
+
+
+class Tests(unittest.TestCase):
+    def test_varint(self):
+        from clld.lib.mvt import _varint, _zigzag
+
+        self.assertEqual(_varint(1), b'\x01')
+        self.assertEqual(_varint(300), b'\xac\x02')
+        self.assertEqual([_zigzag(n) for n in [0, -1, 1, -2]], [0, 1, 2, 3])
+
+    def test_project(self):
+        from clld.lib.mvt import project, tile_bounds
+
+        west, south, east, north = tile_bounds(3, 5, 2)
+        self.assertEqual(project((west, north), 3, 5, 2), (0, 0))
+        self.assertEqual(project((east, south), 3, 5, 2), (4096, 4096))
+        self.assertEqual(project((0, 90), 0, 0, 0), (2048, 0))
+
+    def test_encode(self):
+        from clld.lib.mvt import Layer, encode
+
+        layer = Layer('l')
+        layer.add_point((1, 1), {'name': 'a', 'n': 1, 'x': None})
+        layer.add_point((2, 2), {'name': 'a', 'n': -1.5, 'b': True})
+        self.assertEqual(list(layer.keys), ['n', 'name', 'b'])
+        self.assertEqual(len(layer.values), 4)
+        tile = encode([layer, Layer('empty')])
+        self.assertTrue(tile.startswith(b'\x1a'))
+        self.assertIn(b'name', tile)
+        self.assertNotIn(b'empty', tile)
@@ -33,3 +33,26 @@ class Tests(unittest.TestCase):
         for from_ in FORMATS:
             for to_ in list(FORMATS.keys()) + [None]:
                 convert(g.serialize(format=from_), from_, to_)
+
+    def test_serialize(self):
+        from rdflib import Graph, URIRef, Literal, BNode
+        from rdflib.compare import isomorphic
+        from clld.lib.rdf import serialize, properties_as_triples, FORMATS
+
+        node = BNode()
+        triples = list(properties_as_triples('http://example.org/s', [
+            ('dcterms:title', Literal('a "title"\n<&>', lang='en')),
+            ('geo:lat', Literal(1.5, datatype=URIRef(
+                'http://www.w3.org/2001/XMLSchema#float'))),
+            ('foaf:homepage', 'http://example.org/a'),
+            ('dcterms:creator', node),
+            ('http://example.org/ns#p', 'x')]))
+        triples.extend(properties_as_triples(node, [('foaf:name', 'n')]))
+        expected = Graph()
+        for t in triples:
+            expected.add(t)
+        for format_ in FORMATS:
+            g = Graph()
+            g.parse(data=''.join(serialize(triples, format_)), format=format_)
+            self.assertTrue(isomorphic(expected, g))
+        assert '@prefix' not in ''.join(serialize(triples, 'n3', header=False))
@@ -0,0 +1,145 @@
+# coding: utf8
+from __future__ import unicode_literals
+import io
+import os
+import logging
+
+from clldutils.testing import WithTempDirMixin
+from clldutils.path import Path
+from mock import Mock
+from clld.interfaces import IDownload
+from clld.tests.util import TestWithEnv, WithDbAndDataMixin, TESTS_DIR, committed_db
+from clld.tests.util import main as test_main
+from clld.db.meta import DBSession
+from clld.db.models.common import Language
+from clld.web.adapters.download import CsvDump
+
+logging.disable(logging.WARN)
+
+
+class Dump(CsvDump):
+    def abspath(self, req):
+        return Path(req.registry.settings['test.download_dir']).joinpath(
+            self.name + '.zip')
+
+
+class Failing(Dump):
+    def write(self, req, fp, verbose=True):
+        raise ValueError()
+
+
+class Dying(Dump):
+    def write(self, req, fp, verbose=True):  # pragma: no cover
+        os._exit(1)
+
+
+def downloads():
+    return [
+        Dump(Language, 'clld', ext='tab', depends_on=['language.txt']),
+        Dump(Language, 'clld'),
+        Failing(Language, 'clld', ext='txt'),
+        Dying(Language, 'clld', ext='tsv')]
+
+
+def main(global_config, **settings):
+    """App factory registering the test downloads, used by the worker processes."""
+    app = test_main(global_config, **settings)
+    for dl in downloads():
+        app.registry.registerUtility(dl, IDownload, name=dl.name)
+    return app
+
+
+class Tests(WithDbAndDataMixin, WithTempDirMixin, TestWithEnv):
+    def test_schedule(self):
+        from clld.scripts.downloads import schedule
+
+        downloads = {
+            'a': Mock(depends_on=['b', 'c']), 'b': Mock(depends_on=['c']), 'c': Mock(depends_on=[])}
+        self.assertEqual(schedule(downloads), ['c', 'b', 'a'])
+        downloads['c'].depends_on = ['a']
+        self.assertRaises(ValueError, schedule, downloads)
+        downloads['c'].depends_on = ['x']
+        self.assertRaises(ValueError, schedule, downloads)
+
+    def test_create_downloads(self):
+        from clld.scripts.downloads import create_downloads_func
+
+        tmp = self.tmp_path()
+
+        class Dump(CsvDump):
+            def abspath(self, req):
+                return tmp.joinpath(self.name + '.zip')
+
+        class Failing(Dump):
+            def write(self, req, fp, verbose=True):
+                raise ValueError()
+
+        csv = Dump(Language, 'clld')
+        failing = Failing(Language, 'clld', ext='txt')
+        dependent = Dump(Language, 'clld', ext='tab', depends_on=['language.txt'])
+        registry = Mock(getUtilitiesFor=Mock(return_value=[
+            (d.name, d) for d in [dependent, csv, failing]]))
+
+        class Args(object):
+            env = dict(registry=registry, request=self.env['request'])
+            log = logging.getLogger(__name__)
+
+        results = {r.name: r for r in create_downloads_func(Args())}
+        self.assertEqual(len(results), 3)
+        self.assertIsNone(results['language.csv'].error)
+        self.assertGreater(results['language.csv'].rows, 0)
+        self.assertEqual(
+            results['language.csv'].size, csv.abspath(None).stat().st_size)
+        self.assertIn('ValueError', results['language.txt'].error)
+        self.assertEqual(results['language.tab'].error, 'failed dependency')
+        self.assertIn('rows', str(results['language.csv']))
+        self.assertTrue(csv.fingerprint_path(None).exists())
+
+        results = {r.name: r for r in create_downloads_func(Args())}
+        self.assertTrue(results['language.csv'].skipped)
+        self.assertIn('up-to-date', str(results['language.csv']))
+        results = {r.name: r for r in create_downloads_func(Args(), force=True)}
+        self.assertFalse(results['language.csv'].skipped)
+
+        Language.first().active = False
+        DBSession.flush()
+        results = {r.name: r for r in create_downloads_func(Args())}
+        self.assertFalse(results['language.csv'].skipped)
+
+    def test_create_downloads_parallel(self):
+        from clld.scripts.downloads import create_downloads_func
+
+        tmp = self.tmp_path()
+        config = tmp.joinpath('test.ini')
+        with io.open(TESTS_DIR.joinpath('test.ini').as_posix(), encoding='utf8') as fp:
+            ini = fp.read()
+        with io.open(config.as_posix(), 'w', encoding='utf8') as fp:
+            fp.write(ini.replace(
+                'clld.tests.util:main', 'clld.tests.test_scripts_downloads:main'))
+            fp.write('test.download_dir = %s\n' % tmp.as_posix())
+
+        class Args(object):
+            env = dict(registry=Mock(getUtilitiesFor=Mock(
+                return_value=[(d.name, d) for d in downloads()])))
+            log = logging.getLogger(__name__)
+            config_uri = config.as_posix()
+
+        # The worker processes only see committed data:
+        with committed_db(tmp.joinpath('db.sqlite')) as engine:
+            Args.engine = engine
+            nlanguages = DBSession.query(Language).filter(Language.active == True).count()
+            results = {r.name: r for r in create_downloads_func(Args(), jobs=2)}
+            self.assertEqual(len(results), 4)
+            self.assertIsNone(results['language.csv'].error)
+            self.assertEqual(results['language.csv'].rows, nlanguages)
+            self.assertTrue(tmp.joinpath('language.csv.zip').exists())
+            self.assertIn('ValueError', results['language.txt'].error)
+            self.assertEqual(results['language.tab'].error, 'failed dependency')
+            # Downloads of workers which die are reported as failed, rather than waited for:
+            self.assertEqual(results['language.tsv'].error, 'worker process died')
+
+            # Workers which cannot be initialized report the error for each download:
+            Args.config_uri = tmp.joinpath('missing.ini').as_posix()
+            results = {r.name: r for r in create_downloads_func(Args(), jobs=2)}
+            self.assertIn('initialization failed', results['language.csv'].error)
+            self.assertEqual(results['language.tab'].error, 'failed dependency')
@@ -1,5 +1,6 @@
 # coding: utf8
 from __future__ import unicode_literals
+from clld import interfaces
 from clld.interfaces import IIndex, IRepresentation
 from clld.db.models.common import Contribution, Language, Dataset
 from clld.tests.util import TestWithEnv, WithDbAndDataMixin
@@ -39,7 +40,82 @@ class Tests(WithDbAndDataMixin, TestWithEnv):
         self.assertEqual(
             None, get_adapter(IIndex, Language, self.env['request'], name='text/html'))
 
+    def test_get_adapter_cache(self):
+        from clld.web.adapters import get_adapter, get_adapters, clear_adapter_cache
+        from clld.web.adapters.base import Index
+        from clld.web.datatables import Languages
+
+        req = self.env['request']
+        dt = Languages(req, Language)
+        adapter = get_adapter(IIndex, dt, req, ext='csv')
+        self.assertIs(adapter.obj, dt)
+        self.assertIn(
+            'csv', [a.extension for _, a in get_adapters(IIndex, dt, req)])
+        cache = req.registry._clld_adapter_cache
+        n = len(cache.negotiations)
+        adapter, adapters = get_adapter(IIndex, dt, req, ext='csv', getall=True)
+        self.assertEqual(adapter.extension, 'csv')
+        self.assertEqual(len(cache.negotiations), n)
+
+        self.assertIsNone(get_adapter(IIndex, dt, req, ext='x'))
+        cls = type(str('X'), (Index,), {'extension': 'x'})
+        req.registry.registerAdapter(cls, (interfaces.ILanguage,), IIndex, name='x')
+        try:
+            clear_adapter_cache(req.registry)
+            self.assertIsNotNone(get_adapter(IIndex, dt, req, ext='x'))
+            self.assertIsNot(req.registry._clld_adapter_cache, cache)
+        finally:
+            req.registry.unregisterAdapter(cls, (interfaces.ILanguage,), IIndex, name='x')
+            clear_adapter_cache(req.registry)
+
+        # plain callables as adapter factories are matched by the adapter's extension:
+        def factory(obj):
+            return cls(obj)
+
+        req.registry.registerAdapter(factory, (interfaces.ILanguage,), IIndex, name='x')
+        try:
+            clear_adapter_cache(req.registry)
+            self.assertEqual(get_adapter(IIndex, dt, req, ext='x').extension, 'x')
+        finally:
+            req.registry.unregisterAdapter(
+                factory, (interfaces.ILanguage,), IIndex, name='x')
+            clear_adapter_cache(req.registry)
+
     def test_adapter_factory(self):
         from clld.web.adapters.base import adapter_factory
 
         assert IRepresentation.implementedBy(adapter_factory('template.mako'))
+
+    def test_Rdf_triples(self):
+        from rdflib import Graph, Literal
+        from rdflib.compare import isomorphic
+        from clld import RESOURCES
+        from clld.web.adapters import get_adapter
+
+        def graph(data, format_):
+            g = Graph()
+            g.parse(data=data, format=format_)
+            # normalize whitespace around literals introduced by the templates:
+            for s, p, o in list(g):
+                if isinstance(o, Literal) and o.strip() != o:
+                    g.remove((s, p, o))
+                    g.add((s, p, Literal(
+                        o.strip(), lang=o.language, datatype=o.datatype)))
+            return g
+
+        req = self.env['request']
+        for rsc in RESOURCES:
+            if not hasattr(rsc.model, '__table__'):
+                continue
+            for obj in req.db.query(rsc.model):
+                for ext, format_ in [('rdf', 'xml'), ('ttl', 'turtle'), ('nt', 'nt')]:
+                    adapter = get_adapter(IRepresentation, obj, req, ext=ext)
+                    if rsc.name == 'dataset':
+                        self.assertFalse(adapter.use_triples(obj))
+                        continue
+                    self.assertTrue(adapter.use_triples(obj))
+                    adapter.triples = False
+                    expected = graph(adapter.render(obj, req), format_)
+                    adapter.triples = True
+                    self.assertTrue(isomorphic(
+                        expected, graph(adapter.render(obj, req), format_)))
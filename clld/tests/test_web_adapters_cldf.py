@@ -1,12 +1,15 @@
 # coding: utf8
 from __future__ import unicode_literals, print_function, division, absolute_import
 
+from zipfile import ZipFile
+
 from pycldf.dataset import Dataset as CldfDataset
 from clldutils.testing import WithTempDirMixin
+import transaction
 
 from clld.db.meta import DBSession
-from clld.db.models.common import Dataset, Source
-from clld.tests.util import TestWithEnv, WithDbAndDataMixin
+from clld.db.models.common import Dataset, Source, Contribution
+from clld.tests.util import TestWithEnv, WithDbAndDataMixin, committed_db
 
 
 class CldfTests(WithDbAndDataMixin, WithTempDirMixin, TestWithEnv):
@@ -34,3 +37,38 @@ class CldfTests(WithDbAndDataMixin, WithTempDirMixin, TestWithEnv):
         self.assertEqual(len(ds.rows), 3)
         self.assertIn('Language_glottocode', ds[0])
         self.assertIn('10-20', ds['value2']['Source'])
+
+    def test_CldfDownload_parallel(self):
+        from clld.web.adapters.cldf import CldfDownload
+
+        serial, parallel = self.tmp_path('serial.zip'), self.tmp_path('parallel.zip')
+        # Forked workers connect anew, so they need the data committed to a database file:
+        with committed_db(self.tmp_path('db.sqlite')):
+            DBSession.add(Contribution(id='c2', name='Second contribution'))
+            transaction.commit()
+            CldfDownload(Dataset, 'clld').create(
+                self.env['request'], verbose=False, outfile=serial)
+            CldfDownload(Dataset, 'clld', jobs=2).create(
+                self.env['request'], verbose=False, outfile=parallel)
+        with ZipFile(serial.as_posix()) as s, ZipFile(parallel.as_posix()) as p:
+            self.assertEqual(s.namelist(), p.namelist())
+            self.assertTrue(any('-c2.' in name for name in p.namelist()))
+            for name in s.namelist():
+                self.assertEqual(s.read(name), p.read(name))
+
+    def test_CldfDataset(self):
+        from clld.web.adapters.cldf import CldfDownload, ArchiveMembers
+        from clld.db.models.common import Contribution
+
+        dl = CldfDownload(Dataset, 'clld')
+        dl._source_cache = {}
+        ds = dl.dataset(self.env['request'], Contribution.first())
+        ds.batch_size = 1
+        with ArchiveMembers() as archive:
+            ds.write(self.env['request'], archive)
+        members = archive.members
+        self.assertEqual(
+            [n.split('.', 1)[1] for n, _ in members], ['csv', 'csv-metadata.json', 'bib'])
+        self.assertEqual(members[0][1].decode('utf8').count('\n'), 4)
+        self.assertIs(ds.source_cache, dl._source_cache)
+        self.assertTrue(dl._source_cache)
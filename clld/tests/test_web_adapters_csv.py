@@ -1,12 +1,14 @@
 from __future__ import unicode_literals, division, absolute_import, print_function
 import json
 
+from clldutils.testing import WithTempDirMixin
+
 from clld.web import datatables
 from clld.db.models.common import Language, ValueSet
-from clld.tests.util import TestWithEnv, WithDbAndDataMixin
+from clld.tests.util import TestWithEnv, WithDbAndDataMixin, committed_db
 
 
-class Tests(WithDbAndDataMixin, TestWithEnv):
+class Tests(WithDbAndDataMixin, WithTempDirMixin, TestWithEnv):
     def test_CsvAdapter(self):
         from clld.web.adapters.csv import CsvAdapter
 
@@ -18,6 +20,49 @@ class Tests(WithDbAndDataMixin, TestWithEnv):
         self.assert_(adapter.render_to_response(
             datatables.Languages(self.env['request'], Language), self.env['request']))
 
+    def test_CsvAdapter_stream(self):
+        from mock import patch
+        from clld.web.adapters.csv import CsvAdapter
+
+        adapter = CsvAdapter(None)
+        settings = self.env['registry'].settings
+        settings['clld.csv_stream'] = 'true'
+        try:
+            # The streamed rows are queried on a connection of their own, thus must be
+            # committed:
+            with committed_db(self.tmp_path('db.sqlite')):
+                for dt, model in [
+                    (datatables.Languages, Language), (datatables.Valuesets, ValueSet)
+                ]:
+                    with patch('clld.web.adapters.csv.STREAM_BATCH_SIZE', 2):
+                        chunks = list(adapter.iter_chunks(
+                            dt(self.env['request'], model), self.env['request']))
+                        res = adapter.render_to_response(
+                            dt(self.env['request'], model), self.env['request'])
+                        self.assertIsNone(res.content_length)
+                        body = b''.join(res.app_iter)
+                    if model == Language:
+                        self.assertGreater(len(chunks), 2)
+                    self.assertEqual(body, b''.join(chunks))
+                    self.assertEqual(
+                        body,
+                        adapter.render(
+                            dt(self.env['request'], model), self.env['request']))
+
+            class Empty(datatables.Languages):
+                def base_query(self, query):
+                    return query.filter(Language.id == 'x')
+
+            for res in [
+                b''.join(adapter.iter_chunks(
+                    Empty(self.env['request'], Language), self.env['request'])),
+                adapter.render(Empty(self.env['request'], Language), self.env['request']),
+            ]:
+                self.assertEqual(
+                    res.decode('utf8').splitlines(), [','.join(Language.csv_head())])
+        finally:
+            del settings['clld.csv_stream']
+
     def test_CsvwJsonAdapter(self):
         from clld.web.adapters.csv import CsvmJsonAdapter
 
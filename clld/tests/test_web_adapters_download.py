@@ -1,13 +1,20 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
 import os
+import sqlite3
+import unittest
+import warnings
+from datetime import datetime
 from tempfile import mktemp
 import gzip
+from zipfile import ZipFile
 from contextlib import closing
 from xml.etree import cElementTree as et
 
 from mock import Mock, patch
+from rdflib import Graph
 from clldutils.testing import WithTempDirMixin
 
+from clld.db.meta import DBSession
 from clld.db.models.common import Language, Source
 from clld.tests.util import TestWithEnv, WithDbAndDataMixin
 
@@ -60,12 +67,101 @@ class Tests(WithDbAndDataMixin, WithTempDirMixin, TestWithEnv):
         dl = CsvDump(Language, 'clld')
         dl.create(self.env['request'], verbose=False, outfile=out)
         self.assertTrue(out.exists())
+        with ZipFile(out.as_posix()) as zipfile:
+            self.assertTrue(
+                zipfile.read('language.csv').decode('utf8').startswith('id,name\r\n'))
         dl.create(self.env['request'], filename=out, verbose=False, outfile=out)
         dl = N3Dump(Language, 'clld')
         self.assertEqual(dl.abspath(self.env['request']).name, 'dataset-language.n3.gz')
         dl.create(self.env['request'], verbose=False, outfile=out)
+        with closing(gzip.open(out.as_posix(), 'rb')) as fp:
+            assert len(Graph().parse(data=fp.read().decode('utf8'), format='n3'))
         dl = RdfXmlDump(Language, 'clld')
         dl.create(self.env['request'], verbose=False, outfile=out)
 
         with closing(gzip.open(out.as_posix(), 'rb')) as fp:
             assert et.fromstring(fp.read())
+
+    def test_Download_deprecated_stream(self):
+        from clld.web.adapters.download import CsvDump
+
+        class LegacyDump(CsvDump):
+            def get_stream(self):
+                return CsvDump.get_stream(self)
+
+        out = self.tmp_path('dl')
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            LegacyDump(Language, 'clld').create(
+                self.env['request'], verbose=False, outfile=out)
+            assert any(issubclass(i.category, DeprecationWarning) for i in w)
+        with ZipFile(out.as_posix()) as zipfile:
+            self.assertTrue(
+                zipfile.read('language.csv').decode('utf8').startswith('id,name\r\n'))
+
+    def test_Download_fingerprint(self):
+        from clld.db.models.common import Value, ValueSet, LanguageSource
+        from clld.web.adapters.download import CsvDump
+
+        dl = CsvDump(Value, 'clld')
+        models = dl.fingerprint_models()
+        self.assertEqual(models[0], Value)
+        self.assertIn(ValueSet, models)
+        self.assertIn(Language, models)
+        self.assertIn(LanguageSource.__table__, CsvDump(Source, 'clld').fingerprint_models())
+
+        # Changing only a related row changes the fingerprint:
+        fingerprint = dl.fingerprint(self.env['request'])
+        DBSession.query(Value).first().valueset.language.updated = datetime(2100, 1, 1)
+        DBSession.flush()
+        self.assertNotEqual(dl.fingerprint(self.env['request']), fingerprint)
+
+    def test_Sqlite(self):
+        from sqlalchemy import create_engine
+        from clld.db.meta import Base
+        from clld.db.models.common import Dataset
+        from clld.web.adapters.download import Sqlite
+
+        dl = Sqlite(Dataset, 'clld', batch_size=2)
+        out = self.tmp_path('dl.zip')
+        # The test database has uncommitted changes, thus the tables are copied:
+        dl.create(self.env['request'], outfile=out)
+        with ZipFile(out.as_posix()) as zipfile:
+            self.assertIn('README.txt', zipfile.namelist())
+            zipfile.extract('dataset.sqlite', self.tmp_path().as_posix())
+        engine = create_engine('sqlite:///%s' % self.tmp_path('dataset.sqlite').as_posix())
+        self.assertEqual(
+            engine.execute('select count(*) from language').fetchone()[0],
+            DBSession.query(Language).count())
+        self.assertEqual(engine.execute('select jsondata from source').fetchone()[0][0], '{')
+        # Indexes are created after copying the rows:
+        self.assertEqual(
+            set(r[0] for r in engine.execute(
+                "select name from sqlite_master where type = 'index' and sql is not null")),
+            set(i.name for t in Base.metadata.sorted_tables for i in t.indexes))
+        engine.dispose()
+
+        # The fingerprint covers all tables:
+        fingerprint = dl.fingerprint(self.env['request'])
+        DBSession.query(Source).first().updated = datetime(2100, 1, 1)
+        DBSession.flush()
+        self.assertNotEqual(dl.fingerprint(self.env['request']), fingerprint)
+
+    @unittest.skipIf(
+        not hasattr(sqlite3.Connection, 'backup'), 'requires sqlite3 backup API')
+    def test_Sqlite_backup(self):
+        from sqlalchemy import create_engine
+        from clld.db.meta import Base
+        from clld.db.models.common import Dataset
+        from clld.web.adapters.download import Sqlite
+
+        dl = Sqlite(Dataset, 'clld')
+        src = create_engine('sqlite:///%s' % self.tmp_path('src.sqlite').as_posix())
+        Base.metadata.create_all(src)
+        src.execute("insert into language (id, name, version) values ('l', 'L', 1)")
+        with src.connect() as conn:
+            dl.backup(conn, self.tmp_path('backup.sqlite').as_posix())
+        src.dispose()
+        engine = create_engine('sqlite:///%s' % self.tmp_path('backup.sqlite').as_posix())
+        self.assertEqual(engine.execute('select id from language').fetchone()[0], 'l')
+        engine.dispose()
@@ -4,7 +4,8 @@ import json
 
 from mock import Mock
 
-from clld.db.models.common import Parameter, Language
+from clld.db.meta import DBSession
+from clld.db.models.common import Parameter, Language, ValueSet, Value
 from clld.tests.util import TestWithEnv, WithDbAndDataMixin
 from clld.web.adapters import geojson
 from clld.web.datatables.base import DataTable
@@ -30,6 +31,170 @@ class Tests(WithDbAndDataMixin, TestWithEnv):
         self.assertTrue(len(res['features']) > 0)
         self.assertIn('label', res['features'][0]['properties'])
 
+    def test_GeoJsonParameter_layers(self):
+        adapter = geojson.GeoJsonParameter(None)
+        param = Parameter.get('parameter')
+        self.set_request_properties(params=dict(layers='1'))
+        res = json.loads(adapter.render(param, self.env['request']))
+        layers = {}
+        for f in res['features']:
+            layers.setdefault(f['properties']['layer'], []).append(f['id'])
+        self.assertIn('de', layers)
+
+        for de, ids in layers.items():
+            self.set_request_properties(params=dict(domainelement=de))
+            res = json.loads(adapter.render(param, self.env['request']))
+            self.assertEqual(sorted(f['id'] for f in res['features']), sorted(ids))
+            self.assertEqual(
+                sorted(vs.language.id for vs in param.valuesets
+                       if vs.values and vs.values[0].domainelement.id == de),
+                sorted(ids))
+
+    def test_GeoJsonParameter_projected(self):
+        class Projected(geojson.GeoJsonParameter):
+            __projected__ = True
+
+        class Overridden(Projected):
+            def feature_properties(self, ctx, req, valueset):
+                return {'label': 'x'}
+
+        self.assertTrue(Projected(None).projected())
+        self.assertFalse(Overridden(None).projected())
+        self.assertFalse(geojson.GeoJsonParameter(None).projected())
+
+        for params in [{}, dict(domainelement='de'), dict(layers='1')]:
+            self.set_request_properties(params=params)
+            req = self.env['request']
+            param = Parameter.get('parameter')
+            orm = json.loads(geojson.GeoJsonParameter(None).render(param, req))
+            res = json.loads(Projected(None).render(param, req))
+            self.assertEqual(res['properties'], orm['properties'])
+            self.assertEqual(len(res['features']), len(orm['features']))
+            for f1, f2 in zip(res['features'], orm['features']):
+                self.assertEqual(f1['id'], f2['id'])
+                self.assertEqual(f1['geometry'], f2['geometry'])
+                for key in ['icon', 'label', 'name', 'layer']:
+                    self.assertEqual(
+                        f1['properties'].get(key), f2['properties'].get(key))
+                self.assertEqual(
+                    f1['properties']['language']['name'],
+                    f2['properties']['language']['name'])
+                self.assertEqual(
+                    [v['id'] for v in f1['properties']['values']],
+                    [v['id'] for v in f2['properties']['values']])
+
+        res = Projected(None).render_to_response(param, req)
+        self.assertEqual(res.content_length, len(res.body))
+        self.assertEqual(
+            json.loads(res.body.decode('utf8')),
+            json.loads(Projected(None).render(param, req)))
+        self.assertEqual(
+            len(Projected(None).render(param, req, dump=False)['features']),
+            len(orm['features']))
+        self.assertTrue(
+            '{' in Projected(None).render(Parameter.get('no-domain'), req))
+
+    def test_cluster_query(self):
+        for i, (lat, lon) in enumerate(
+                [(0, 0), (0.1, 0.1), (-40, 100), (10, -100), (None, None)]):
+            DBSession.add(Language(id='cq%s' % i, name='cq', latitude=lat, longitude=lon))
+        DBSession.flush()
+        items = DBSession.query(
+            Language.pk.label('key'),
+            Language.pk.label('language_pk'),
+            Language.name.label('group'),
+            Language.latitude.label('latitude'),
+            Language.longitude.label('longitude'))\
+            .filter(Language.id.startswith('cq'))
+
+        for zoom in [0, 50]:
+            self.assertEqual(
+                sorted(c.n for c in geojson.cluster_query(items, zoom)), [1, 1, 2])
+        clusters = geojson.cluster_query(items, 0, bbox=(-1, -1, 1, 1)).all()
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(clusters[0].languages, 2)
+        self.assertAlmostEqual(clusters[0].latitude, 0.05)
+        # Rows of the grid span fewer degrees of latitude near the poles than near the
+        # equator:
+        boundaries = geojson.mercator_row_boundaries(8)
+        self.assertLess(boundaries[0] - boundaries[1], boundaries[2] - boundaries[3])
+        self.assertEqual(
+            len(geojson.cluster_query(items, 5, bbox=(-1, -1, 1, 1)).all()), 1)
+        # Longitudes of pacific centered maps are compared modulo 360 with bounding boxes:
+        for bbox in [(-110, 0, -90, 20), (250, 0, 270, 20)]:
+            clusters = geojson.cluster_query(items, 2, bbox=bbox).all()
+            self.assertEqual(len(clusters), 1)
+            self.assertAlmostEqual(clusters[0].longitude % 360, 260)
+        self.assertTrue(geojson.in_bbox((260, 10), (-110, 0, -90, 20)))
+        self.assertFalse(geojson.in_bbox((260, 10), (-110, 20, -90, 30)))
+        self.assertIsNone(geojson.parse_bbox('1,2,3'))
+        self.assertIsNone(geojson.parse_bbox('a,b,c,d'))
+
+    def test_clusters(self):
+        param = Parameter.get('parameter')
+        vs = param.valuesets[0]
+        for i in range(3):
+            lang = Language(id='cl%s' % i, name='cl', latitude=50.0, longitude=100 + i * 0.1)
+            DBSession.add(ValueSet(
+                id='clvs%s' % i, language=lang, parameter=param,
+                contribution=vs.contribution,
+                values=[Value(id='clv%s' % i, domainelement=vs.values[0].domainelement)]))
+        DBSession.flush()
+        de = vs.values[0].domainelement.id
+
+        class Languages(DataTable):
+            pass
+
+        adapter = geojson.GeoJsonLanguages(None)
+        ctx = Languages(self.env['request'], Language)
+        for params, clusters in [
+            (dict(zoom='0'), 1),
+            (dict(zoom='0', bbox='90,40,110,60'), 1),
+            (dict(zoom='0', bbox='-10,-10,10,20'), 0),
+            (dict(zoom='4', bbox='90,40,110,60'), 1),
+            (dict(zoom='7', bbox='90,40,110,60'), 0),
+        ]:
+            self.set_request_properties(params=params)
+            res = json.loads(adapter.render(ctx, self.env['request']))
+            self.assertEqual(
+                len([f for f in res['features'] if 'cluster' in f['properties']]),
+                clusters)
+            if clusters:
+                self.assertEqual(res['features'][0]['properties']['cluster'], 3)
+            if params.get('bbox'):
+                self.assertEqual(
+                    sum(f['properties'].get('cluster', 1) for f in res['features']),
+                    3 if params['bbox'].endswith('60') else 1)
+
+        class Projected(geojson.GeoJsonParameter):
+            __projected__ = True
+
+        for cls in [geojson.GeoJsonParameter, Projected]:
+            for params in [
+                dict(zoom='1'), dict(zoom='1', layers='1'), dict(zoom='1', domainelement=de)
+            ]:
+                self.set_request_properties(params=params)
+                res = json.loads(cls(None).render(param, self.env['request']))
+                clusters = [f for f in res['features'] if 'cluster' in f['properties']]
+                self.assertEqual(len(clusters), 1)
+                self.assertEqual(clusters[0]['properties']['cluster'], 3)
+                self.assertIn('icon', clusters[0]['properties'])
+                if 'layers' in params:
+                    self.assertEqual(clusters[0]['properties']['layer'], de)
+                    for f in res['features']:
+                        self.assertIn('layer', f['properties'])
+            self.set_request_properties(params=dict(zoom='1'))
+            res = Projected(None).render_to_response(param, self.env['request'])
+            self.assertIn('"cluster": 3', res.body.decode('utf8'))
+
+        # Overriding the hooks to select features disables clustering:
+        class Custom(geojson.GeoJsonParameter):
+            def get_query(self, ctx, req):
+                return geojson.GeoJsonParameter.get_query(self, ctx, req)
+
+        res = json.loads(Custom(None).render(param, self.env['request']))
+        self.assertFalse([f for f in res['features'] if 'cluster' in f['properties']])
+
     def test_GeoJsonParameterMultipleValueSets(self):
         adapter = geojson.GeoJsonParameterMultipleValueSets(None)
         self.assertTrue(
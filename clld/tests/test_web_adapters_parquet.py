@@ -0,0 +1,45 @@
+# coding: utf8
+from __future__ import unicode_literals, print_function, division, absolute_import
+import unittest
+
+from clldutils.testing import WithTempDirMixin
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+from clld.db.meta import DBSession
+from clld.db.models.common import Language, Value
+from clld.tests.util import TestWithEnv, WithDbAndDataMixin
+
+
+@unittest.skipIf(pyarrow is None, 'requires pyarrow')
+class Tests(WithDbAndDataMixin, WithTempDirMixin, TestWithEnv):
+    def test_ParquetDump(self):
+        from pyarrow import parquet, types
+        from clld.web.adapters.parquet import ParquetDump
+
+        dl = ParquetDump(Language, 'clld', row_group_size=2)
+        self.assertTrue(dl.asset_spec(self.env['request']).endswith('language.parquet'))
+        tmp = self.tmp_path('languages.parquet')
+        rows = dl.create(self.env['request'], verbose=False, outfile=tmp)
+        self.assertEqual(rows, DBSession.query(Language).count())
+        pf = parquet.ParquetFile(tmp.as_posix())
+        self.assertEqual(pf.metadata.num_rows, rows)
+        self.assertEqual(pf.metadata.num_row_groups, (rows + 1) // 2)
+        table = pf.read()
+        self.assertEqual(table.column_names, Language.csv_head())
+        self.assertTrue(types.is_floating(table.schema.field('latitude').type))
+        self.assertTrue(types.is_integer(table.schema.field('pk').type))
+        # Depending on the format version, pyarrow uses different dictionary encodings:
+        encodings = pf.metadata.row_group(0).column(
+            table.column_names.index('name')).encodings
+        self.assertTrue(set(encodings) & {'RLE_DICTIONARY', 'PLAIN_DICTIONARY'})
+
+        dl = ParquetDump(
+            Value, 'clld', fields=['id', ('valueset__id', 'valueset'), 'frequency'])
+        dl.create(self.env['request'], verbose=False, outfile=tmp)
+        table = parquet.read_table(tmp.as_posix())
+        self.assertEqual(table.column_names, ['id', 'valueset', 'frequency'])
+        self.assertTrue(types.is_string(table.schema.field('valueset').type))
+        self.assertEqual(table.num_rows, DBSession.query(Value).count())
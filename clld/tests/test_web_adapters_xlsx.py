@@ -0,0 +1,72 @@
+# coding: utf8
+from __future__ import unicode_literals, print_function, division, absolute_import
+import unittest
+
+from six import BytesIO
+from sqlalchemy import event
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover
+    openpyxl = None
+
+from clld.web import datatables
+from clld.db.meta import DBSession
+from clld.db.models.common import Language, Value, Sentence
+from clld.tests.util import TestWithEnv, WithDbAndDataMixin
+
+
+@unittest.skipIf(openpyxl is None, 'requires openpyxl')
+class Tests(WithDbAndDataMixin, TestWithEnv):
+    def _rows(self, adapter, dt, model):
+        from openpyxl import load_workbook
+
+        ctx = dt(self.env['request'], model)
+        res = adapter.render_to_response(ctx, self.env['request'])
+        self.assertEqual(res.content_length, len(res.body))
+        ws = load_workbook(BytesIO(res.body), read_only=True).active
+        rows = list(ws.rows)
+        self.assertEqual(len(rows) - 1, len(ctx.get_query().all()))
+        return rows
+
+    def test_Languages(self):
+        from clld.web.adapters.xlsx import Languages
+
+        rows = self._rows(Languages(None), datatables.Languages, Language)
+        self.assertEqual(rows[0][-1].value, 'Longitude')
+
+    def test_Values(self):
+        from clld.web.adapters.xlsx import Values
+
+        statements = []
+
+        def count(*args, **kw):
+            statements.append(1)
+
+        DBSession.expire_all()
+        event.listen(DBSession.bind, 'before_cursor_execute', count)
+        try:
+            adapter = Values(None)
+            adapter.render(
+                datatables.Values(self.env['request'], Value), self.env['request'])
+        finally:
+            event.remove(DBSession.bind, 'before_cursor_execute', count)
+        self.assertLessEqual(len(statements), 3)
+
+        value = DBSession.query(Value).first()
+        value.frequency = 0.0
+        DBSession.flush()
+        rows = self._rows(adapter, datatables.Values, Value)
+        frequency = [c.value for c in rows[0]].index('Frequency')
+        self.assertIn(0, [row[frequency].value for row in rows[1:]])
+
+    def test_Sentences(self):
+        from clld.web.adapters.xlsx import Sentences
+
+        DBSession.query(Sentence).first().name = '=1+1'
+        DBSession.flush()
+        rows = self._rows(Sentences(None), datatables.Sentences, Sentence)
+        self.assertTrue(rows[1][0].value.startswith('=HYPERLINK('))
+        self.assertEqual(rows[1][0].data_type, 'f')
+        names = [row[1] for row in rows[1:] if row[1].value == '=1+1']
+        self.assertEqual(len(names), 1)
+        self.assertEqual(names[0].data_type, 's')
@@ -24,6 +24,23 @@ class Tests(WithDbAndDataMixin, TestWithEnv):
         assert self.env['request'].get_datatable('valuesets', ValueSet)
         assert self.env['request'].blog is None
 
+    def test_CLLDRequest_resource_url(self):
+        from clld.db.models.common import Dataset
+
+        req = self.env['request']
+        for obj, kw in [
+            (Language.first(), {}),
+            (Language(id='a b/ä'), {}),
+            (Language(id='a%b'), {'ext': 'json'}),
+            (Dataset.first(), {}),
+            (Dataset.first(), {'ext': 'ttl'}),
+        ]:
+            route, _kw = req._route(obj, None, **kw)
+            self.assertEqual(req.resource_url(obj, **kw), req.route_url(route, **_kw))
+        self.assertEqual(
+            req.resource_url(Language.first(), _query={'a': 1}),
+            req.route_url('language', id=Language.first().id, _query={'a': 1}))
+
     def test_menu_item(self):
         from clld.web.app import menu_item
 
@@ -0,0 +1,114 @@
+from __future__ import unicode_literals, division, absolute_import, print_function
+import os
+
+from clldutils.testing import WithTempDirMixin
+
+from clld.tests.util import TestWithEnv, WithDbAndDataMixin
+
+
+class Tests(WithDbAndDataMixin, WithTempDirMixin, TestWithEnv):
+    def test_dump_response(self):
+        from clld.web.cache import dump_response, load_response
+
+        headers = [('Content-Type', 'text/plain'), ('X', 'a\nb')]
+        status, headerlist, body = load_response(
+            dump_response('200 OK', headers, b'a\nb'))
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headerlist, headers)
+        self.assertEqual(body, b'a\nb')
+
+    def test_cache_key(self):
+        from mock import Mock
+        from clld.web.cache import cache_key
+
+        adapter = Mock(send_mimetype='text/html', template='t')
+
+        def req(host_url, path, query=None):
+            return Mock(
+                host_url=host_url,
+                path=path,
+                GET=query or {},
+                matched_route=Mock(),
+                data_version='1')
+
+        key = cache_key(adapter, req('http://example.org', '/languages/a'))
+        for other in [
+            req('https://example.org', '/languages/a'),
+            req('http://example.com', '/languages/a'),
+            req('http://example.org', '/languages/b'),
+            req('http://example.org', '/languages/a', {'x': 'y'}),
+        ]:
+            self.assertNotEqual(cache_key(adapter, other), key)
+        self.assertEqual(
+            cache_key(adapter, req('http://example.org', '/languages/a', {'_': '1'})), key)
+        self.assertIsNone(cache_key(adapter, Mock(data_version=None)))
+
+    def test_MemoryCache(self):
+        from clld.web.cache import MemoryCache
+
+        cache = MemoryCache(maxsize=10)
+        self.assertFalse(cache.shared)
+        cache.set('a', b'12345')
+        cache.set('b', b'12345')
+        self.assertEqual(cache.get('a'), b'12345')
+        cache.set('c', b'1')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.size, 6)
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+
+    def test_FileCache(self):
+        from clld.web.cache import FileCache
+
+        cache = FileCache(self.tmp_path('cache'), maxsize=10)
+        self.assertTrue(cache.shared)
+        self.assertIsNone(cache.get('ab'))
+        cache.set('ab', b'12345')
+        self.assertEqual(os.stat(cache._path('ab').parent.as_posix()).st_mode & 0o777, 0o700)
+        self.assertEqual(os.stat(cache.directory.as_posix()).st_mode & 0o777, 0o700)
+        cache.set('ac', b'12345')
+        os.utime(cache._path('ab').as_posix(), (1, 1))
+        os.utime(cache._path('ac').as_posix(), (1, 1))
+        self.assertEqual(cache.get('ab'), b'12345')
+        cache.set('ad', b'1')
+        self.assertIsNone(cache.get('ac'))
+        self.assertEqual(cache.get('ab'), b'12345')
+        self.assertEqual(cache.get('ad'), b'1')
+        cache.clear()
+        self.assertIsNone(cache.get('ad'))
+
+    def test_MemcachedCache(self):
+        from clld.web.cache import MemcachedCache
+
+        class Client(dict):
+            def set(self, key, value):
+                self[key] = value
+
+            def add(self, key, value):
+                self.setdefault(key, value)
+
+            def incr(self, key, value):
+                if key in self:
+                    self[key] = ('%s' % (int(self[key]) + value)).encode('ascii')
+                    return int(self[key])
+
+        cache = MemcachedCache(None, client=Client())
+        cache.set('a', b'1')
+        self.assertEqual(cache.get('a'), b'1')
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+
+    def test_get_cache(self):
+        from clld.web.cache import get_cache, MemoryCache, FileCache
+
+        self.assertIsNone(get_cache({}))
+        self.assertIsInstance(get_cache({'clld.response_cache': 'memory'}), MemoryCache)
+        self.assertIsInstance(
+            get_cache({
+                'clld.response_cache': 'file',
+                'clld.response_cache_dir': self.tmp_path('cache').as_posix()}),
+            FileCache)
+        with self.assertRaises(ValueError):
+            get_cache({'clld.response_cache': 'file'})
+        with self.assertRaises(ValueError):
+            get_cache({'clld.response_cache': 'x'})
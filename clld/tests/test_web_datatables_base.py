@@ -98,3 +98,196 @@ class Tests(WithDbAndDataMixin, TestWithEnv):
         classImplements(A, ILanguage)
         dt = DataTable(self.env['request'], A)
         self.assertTrue('languages' in dt.options['sAjaxSource'])
+
+    def test_DataTable_count_cache(self):
+        from clld.web.datatables.base import DataTable, COUNT_CACHE, CountCache
+
+        cache = CountCache(maxsize=1)
+        self.assertEqual(cache.get('a', 1, lambda: 5), 5)
+        self.assertEqual(cache.get('a', 1, lambda: 6), 5)
+        self.assertEqual(cache.get('a', 2, lambda: 6), 6)
+        self.assertEqual(cache.get('b', 2, lambda: 7), 7)
+        self.assertEqual(len(cache), 1)
+
+        settings = self.env['registry'].settings
+        settings['clld.datatable_count_cache'] = 'true'
+        settings['clld.datatable_count_estimate'] = '1'
+        try:
+            COUNT_CACHE.bump()
+            dt = DataTable(self.env['request'], common.Language)
+            dt.get_query()
+            self.assertEqual(len(COUNT_CACHE), 1)
+            self.assertEqual(dt.count_all, dt.count_filtered)
+            self.set_request_properties(params={'sSearch_0': 'a'})
+            dt2 = DataTable(self.env['request'], common.Language)
+            dt2.get_query()
+            self.assertEqual(len(COUNT_CACHE), 2)
+            self.assertEqual(dt.count_all, dt2.count_all)
+            COUNT_CACHE.bump()
+            self.assertEqual(len(COUNT_CACHE), 0)
+        finally:
+            del settings['clld.datatable_count_cache']
+            del settings['clld.datatable_count_estimate']
+
+    def test_DataTable_count_estimable(self):
+        from clld.web.datatables.base import DataTable
+        from clld.web.datatables.value import Values
+
+        class Subclassed(DataTable):
+            pass
+
+        class Constrained(Subclassed):
+            def base_query(self, query):
+                return query.filter(common.Language.latitude != None)
+
+        self.assertTrue(DataTable(self.env['request'], common.Language).count_estimable())
+        self.assertTrue(Subclassed(self.env['request'], common.Language).count_estimable())
+        self.assertFalse(Constrained(self.env['request'], common.Language).count_estimable())
+        self.assertFalse(Values(self.env['request'], common.Value).count_estimable())
+
+    def test_DataTable_seek(self):
+        from clld.web.datatables.base import DataTable, Col, _after
+        from clld.web.datatables.value import Values
+
+        class TestTable(DataTable):
+            def col_defs(self):
+                return [Col(self, 'name'), Col(self, 'latitude')]
+
+        class SeekTable(TestTable):
+            __seek_index_step__ = 2
+
+        class SeekValues(Values):
+            __seek_index_step__ = 2
+
+        def ids(cls, model, start, **params):
+            params.update(iDisplayStart=str(start), iDisplayLength='2')
+            self.set_request_properties(params=params)
+            return [i.id for i in cls(self.env['request'], model).get_query()]
+
+        for params in [
+            {},
+            {'iSortingCols': '1', 'iSortCol_0': '0', 'sSortDir_0': 'desc'},
+            {'iSortingCols': '1', 'iSortCol_0': '1'},
+            {'iSortingCols': '1', 'iSortCol_0': '1', 'sSortDir_0': 'desc'},
+            {'sSearch_0': 'a', 'iSortingCols': '1', 'iSortCol_0': '0'},
+        ]:
+            for start in list(range(6)) + [51, 100, 150]:
+                self.assertEqual(
+                    ids(TestTable, common.Language, start, **params),
+                    ids(SeekTable, common.Language, start, **params))
+                self.assertEqual(
+                    ids(Values, common.Value, start, **params),
+                    ids(SeekValues, common.Value, start, **params))
+
+        for nulls_large in [True, False]:
+            self.assertIsNotNone(_after(
+                [(common.Language.latitude, True), (common.Language.pk, False)],
+                [None, 1],
+                nulls_large))
+
+    def test_DataTable_iter_query(self):
+        from clld.web.datatables.base import DataTable, Col
+        from clld.web.datatables.value import Values
+
+        class TestTable(DataTable):
+            def col_defs(self):
+                return [Col(self, 'name'), Col(self, 'latitude')]
+
+        for params in [
+            {},
+            {'iSortingCols': '1', 'iSortCol_0': '0', 'sSortDir_0': 'desc'},
+            {'iSortingCols': '1', 'iSortCol_0': '1'},
+            {'iSortingCols': '1', 'iSortCol_0': '1', 'sSortDir_0': 'desc'},
+            {'sSearch_0': 'a', 'iSortingCols': '1', 'iSortCol_0': '0'},
+        ]:
+            self.set_request_properties(params=params)
+            for cls, model in [(TestTable, common.Language), (Values, common.Value)]:
+                self.assertEqual(
+                    [i.id for i in cls(self.env['request'], model).get_query()],
+                    [i.id for i in cls(self.env['request'], model).iter_query(
+                        batch_size=2)])
+
+    def test_DataTable_loader_options(self):
+        from sqlalchemy import event
+        from clld.db.meta import DBSession
+        from clld.web.datatables.value import Values
+        from clld.web.datatables.contributor import Contributors
+
+        statements = []
+
+        def count(*args, **kw):
+            statements.append(1)
+
+        for cls, model, kw in [
+            (Values, common.Value, {'parameter': common.Parameter.first()}),
+            (Values, common.Value, {'language': common.Language.first()}),
+            (Contributors, common.Contributor, {}),
+        ]:
+            DBSession.expire_all()
+            dt = cls(self.env['request'], model, **kw)
+            self.assertTrue(dt.loader_options())
+            items = dt.get_query().all()
+            event.listen(DBSession.bind, 'before_cursor_execute', count)
+            try:
+                for item in items:
+                    for col in dt.cols:
+                        col.format(item)
+            finally:
+                event.remove(DBSession.bind, 'before_cursor_execute', count)
+            self.assertEqual(statements, [])
+
+    def test_DataTable_format_rows(self):
+        from clld.web.datatables.base import DataTable, Col, LinkCol
+
+        class TestTable(DataTable):
+            def col_defs(self):
+                return [
+                    Col(self, 'pk'),
+                    Col(self, 'active'),
+                    Col(self, 'latitude', precision=1),
+                    Col(self, 'name', get_object=lambda i: i),
+                    Col(self, 'description', format=lambda i: 'x'),
+                    Col(self, 'lang', model_col=common.Language.name,
+                        get_obj=lambda i: i),
+                    LinkCol(self, 'link')]
+
+        class RowClassTable(TestTable):
+            def row_class(self, item):
+                return 'c' if item.latitude else None
+
+        for cls in [TestTable, RowClassTable]:
+            dt = cls(self.env['request'], common.Language)
+            items = dt.get_query().all()
+            rows = dt.format_rows(items)
+            self.assertEqual(len(rows), len(items))
+            for item, row in zip(items, rows):
+                for i, col in enumerate(dt.cols):
+                    self.assertEqual(
+                        row[i] if isinstance(row, list) else row[str(i)],
+                        col.format(item))
+
+    def test_Col_compile_format(self):
+        from clld.web.datatables.base import DataTable, Col, LinkCol
+
+        class UpperCol(Col):
+            def format_value(self, value):
+                return value.upper()
+
+        class SubCol(UpperCol):
+            pass
+
+        dt = DataTable(self.env['request'], common.Language)
+        col = Col(dt, 'name')
+        self.assertNotEqual(col.compile_format(), col.format)
+        for col in [
+            LinkCol(dt, 'name'),
+            LinkCol(dt, 'name', format=lambda i: 'x'),
+            UpperCol(dt, 'name'),
+            SubCol(dt, 'name'),
+        ]:
+            self.assertEqual(col.compile_format(), col.format)
+        col = Col(dt, 'name', format=lambda i: 'x')
+        self.assertEqual(col.compile_format()(None), 'x')
+        self.assertEqual(
+            SubCol(dt, 'name').compile_format()(common.Language.first()),
+            common.Language.first().name.upper())
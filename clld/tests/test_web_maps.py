@@ -35,6 +35,16 @@ class Tests(WithDbAndDataMixin, TestWithEnv):
         dt = ParameterMap(common.Parameter.get('no-domain'), self.env['request'])
         dt.render()
 
+        class SingleRequestMap(ParameterMap):
+            single_request = True
+
+        dt = SingleRequestMap(common.Parameter.get('parameter'), self.env['request'])
+        self.assertIn('layers=1', dt.options['layers_url'])
+        dt.render()
+
+        dt = SingleRequestMap(common.Parameter.get('no-domain'), self.env['request'])
+        self.assertNotIn('layers_url', dt.options)
+
     def test_LanguageMap(self):
         from clld.web.maps import LanguageMap
 
@@ -3,6 +3,7 @@
 from __future__ import absolute_import, division, unicode_literals
 import threading
 from collections import namedtuple
+from contextlib import contextmanager
 import time
 from wsgiref.simple_server import make_server, WSGIRequestHandler
 import unittest
@@ -83,6 +84,37 @@ def init_db():
     return engine
 
 
+@contextmanager
+def committed_db(path):
+    """Bind the session to a database file holding the committed sample data.
+
+    Dedicated connections - or worker processes - only see committed data, whereas the
+    sample data of :py:class:`WithDbAndDataMixin` is never committed. Afterwards, the
+    session is bound to the previous engine, populated with the sample data again.
+
+    :param path: Path of the database file.
+    :return: The engine of the database file.
+    """
+    from clld.tests.fixtures import populate_test_db
+
+    previous = DBSession.bind
+    transaction.abort()
+    DBSession.remove()
+    engine = create_engine('sqlite:///' + path.as_posix())
+    try:
+        DBSession.configure(bind=engine)
+        Base.metadata.create_all(engine)
+        populate_test_db(engine)
+        transaction.commit()
+        yield engine
+    finally:
+        transaction.abort()
+        DBSession.remove()
+        engine.dispose()
+        DBSession.configure(bind=previous)
+        populate_test_db(previous)
+
+
 class WithDbMixin(object):
 
     """For tests in need of a session bound to an empty db."""
@@ -1,6 +1,8 @@
 """Adapter registry to be included by pyramid configurator."""
 import os
+from collections import OrderedDict
 
+from zope.interface import providedBy, implementedBy
 from pyramid.path import AssetResolver
 
 from clld import interfaces
@@ -9,6 +11,7 @@ from clld.web.adapters.geojson import (
     GeoJson, GeoJsonLanguages, GeoJsonParameter, GeoJsonParameterFlatProperties,
 )
 from clld.web.adapters import excel
+from clld.web.adapters import xlsx
 from clld.web.adapters import csv
 from clld.web.adapters.md import BibTex, TxtCitation, ReferenceManager
 from clld.web.adapters.rdf import Rdf, RdfIndex
@@ -16,13 +19,24 @@ from clld.web.adapters import biblio
 from clld.lib.rdf import FORMATS as RDF_NOTATIONS
 
 
-def template_exists(config, relpath):
+#: The mako directory of clld's own templates.
+CLLD_TEMPLATES = 'clld:web/templates'
+
+
+def template_dir(config, relpath):
+    """Determine the mako directory from which a template will be loaded.
+
+    :return: Asset spec of the directory or ``None``, if the template does not exist.
+    """
     asset_resolver = AssetResolver()
     for md in config.registry.settings['mako.directories']:
         asset_descriptor = asset_resolver.resolve('/'.join([md, relpath]))
         if os.path.exists(asset_descriptor.abspath()):
-            return True
-    return False
+            return md
+
+
+def template_exists(config, relpath):
+    return template_dir(config, relpath) is not None
 
 
 def register_resource_adapters(config, rsc):
@@ -30,6 +44,9 @@ def register_resource_adapters(config, rsc):
 
     config.register_adapter(
         getattr(excel, rsc.plural.capitalize(), excel.ExcelAdapter), interface)
+    if xlsx.openpyxl:
+        config.register_adapter(
+            getattr(xlsx, rsc.plural.capitalize(), xlsx.XlsxAdapter), interface)
     cls = type('Json%s' % rsc.model.__name__, (Json,), {})
     config.register_adapter(
         cls, interface, to_=interfaces.IRepresentation, name=Json.mimetype)
@@ -62,6 +79,12 @@ def register_resource_adapters(config, rsc):
     rdf_resource_template = name + '/rdf.mako'
     if not template_exists(config, rdf_resource_template):
         rdf_resource_template = 'resource_rdf.mako'
+    # The triples of resources mirror clld's own templates, thus they can only be used
+    # if the templates are not overridden by the app; the dataset is always described
+    # by its template.
+    triples = rsc.name != 'dataset' and all(
+        template_dir(config, tmpl) == CLLD_TEMPLATES
+        for tmpl in set([rdf_resource_template, 'resource_rdf.mako']))
 
     for notation in RDF_NOTATIONS.values():
         specs.append((
@@ -69,7 +92,10 @@ def register_resource_adapters(config, rsc):
             notation.mimetype,
             notation.extension,
             rdf_resource_template,
-            {'name': 'RDF serialized as %s' % notation.name, 'rdflibname': notation.name},
+            {
+                'name': 'RDF serialized as %s' % notation.name,
+                'rdflibname': notation.name,
+                'triples': triples},
         ))
 
     # ... as RDF collection index
@@ -148,20 +174,74 @@ def includeme(config):
     config.include(biblio)
 
 
-def get_adapters(interface, ctx, req):
-    # ctx can be a DataTable instance. In this case we create a resource by instantiating
-    # the model class associated with the DataTable
-    resource = ctx.model() if hasattr(ctx, 'model') else ctx
-    return req.registry.getAdapters([resource], interface)
+#: Maximal number of content negotiation results cached per registry.
+MAX_NEGOTIATIONS = 1000
 
 
-def get_adapter(interface, ctx, req, ext=None, name=None, getall=False):
-    """Retrieve matching adapter.
+class _AdapterCache(object):
 
-    :param interface: Interface class to lookup adapter for.
+    """Memoized adapter lookups and content negotiation results of a registry.
+
+    The cache is discarded by `clear_adapter_cache` whenever adapters are registered
+    via the ``register_adapter`` directive and once the application has been created.
     """
-    adapters = dict(get_adapters(interface, ctx, req))
 
+    def __init__(self):
+        self.factories = {}
+        self.negotiations = {}
+
+    @classmethod
+    def get(cls, registry):
+        res = getattr(registry, '_clld_adapter_cache', None)
+        if res is None:
+            res = registry._clld_adapter_cache = cls()
+        return res
+
+
+def clear_adapter_cache(registry):
+    """Discard the memoized adapter lookups of a registry.
+
+    Must be called after adapters have been registered with the registry directly,
+    i.e. not using the ``register_adapter`` configurator directive.
+    """
+    registry._clld_adapter_cache = None
+
+
+def _adapter_factories(interface, ctx, req):
+    """Lookup the names and factories of the adapters for ctx.
+
+    :return: ``OrderedDict`` mapping adapter names to factories.
+    """
+    # ctx can be a DataTable instance. In this case we look up the adapters for the
+    # model class associated with the DataTable.
+    spec = implementedBy(ctx.model) if hasattr(ctx, 'model') else providedBy(ctx)
+    cache = _AdapterCache.get(req.registry)
+    key = (interface, spec)
+    if key not in cache.factories:
+        cache.factories[key] = OrderedDict(
+            req.registry.adapters.lookupAll((spec,), interface))
+    return spec, cache.factories[key]
+
+
+def get_adapters(interface, ctx, req):
+    """Retrieve all adapters for ctx.
+
+    :return: List of pairs (name, adapter).
+    """
+    res = []
+    for name, factory in _adapter_factories(interface, ctx, req)[1].items():
+        adapter = factory(ctx)
+        if adapter is not None:
+            res.append((name, adapter))
+    return res
+
+
+def _negotiate(factories, ctx, req, ext, name):
+    """Determine the name of the adapter matching the request.
+
+    :return: pair (name, cacheable), where cacheable signals whether the result does \
+    not depend on ctx.
+    """
     if not ext and not name and (
         not req.accept or ('*/*' in str(req.accept) and 'q=' not in str(req.accept))
     ):
@@ -172,24 +252,49 @@ def get_adapter(interface, ctx, req, ext=None, name=None, getall=False):
 
     if ext:
         # find adapter by requested file extension
-        adapter = [r for r in adapters.values() if r.extension == ext]
+        for n, factory in factories.items():
+            if getattr(factory, 'extension', None) == ext:
+                return n, True
+        # adapter factories may be plain callables, so we have to inspect the adapters:
+        for n, factory in factories.items():
+            if not hasattr(factory, 'extension'):
+                if getattr(factory(ctx), 'extension', None) == ext:
+                    return n, False
+        return None, True
     elif name:
         # or by mime type
-        adapter = adapters.get(name)
-    else:
-        # or by content negotiation
-        #
-        # TODO: iterate over req.accept (i.e. over the accepted mimetypes in order of
-        # preference) and match them to what we have to offer (in order of preference).
-        #
-        adapter = adapters.get(req.accept.best_match(adapters.keys()))
-
-    res = None
-    if isinstance(adapter, list):
-        if adapter:
-            res = adapter[0]
-    else:
-        res = adapter
+        return (name if name in factories else None), True
+    # or by content negotiation
+    #
+    # TODO: iterate over req.accept (i.e. over the accepted mimetypes in order of
+    # preference) and match them to what we have to offer (in order of preference).
+    #
+    return req.accept.best_match(factories.keys()), True
+
+
+def get_adapter(interface, ctx, req, ext=None, name=None, getall=False):
+    """Retrieve matching adapter.
+
+    The adapters available for a type of context and the result of the content
+    negotiation for an ``Accept`` header are cached per registry.
+
+    :param interface: Interface class to lookup adapter for.
+    """
+    ext, name = ext or None, name or None
+    spec, factories = _adapter_factories(interface, ctx, req)
+    cache = _AdapterCache.get(req.registry)
+    key = (interface, spec, ext, name, None if ext or name else str(req.accept))
+    try:
+        chosen = cache.negotiations[key]
+    except KeyError:
+        chosen, cacheable = _negotiate(factories, ctx, req, ext, name)
+        if cacheable:
+            if len(cache.negotiations) >= MAX_NEGOTIATIONS:
+                cache.negotiations.clear()
+            cache.negotiations[key] = chosen
+
     if getall:
-        res = (res, adapters.values())
-    return res
+        adapters = OrderedDict(get_adapters(interface, ctx, req))
+        return adapters.get(chosen), list(adapters.values())
+    factory = factories.get(chosen)
+    return factory(ctx) if factory is not None else None
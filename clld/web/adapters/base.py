@@ -1,15 +1,21 @@
 """Base classes for adapters."""
 from __future__ import unicode_literals
 from uuid import uuid4
+from hashlib import md5
+from tempfile import SpooledTemporaryFile
 
 from zope.interface import implementer
-from pyramid.response import Response
+from pyramid.response import Response, FileIter
+from pyramid.httpexceptions import HTTPNotModified
 from pyramid.renderers import render as pyramid_render
 from six import text_type
 from clldutils.misc import to_binary, slug
 
 from clld import interfaces
 
+#: Size in bytes up to which spooled responses are kept in memory.
+SPOOL_SIZE = 1024 * 1024
+
 
 class Renderable(object):
 
@@ -27,6 +33,10 @@ class Renderable(object):
     rel = 'alternate'
     content_type_params = None
 
+    #: Whether responses carry ``ETag`` and ``Last-Modified`` headers, and conditional
+    #: requests are answered with ``304 Not Modified`` if the data did not change.
+    conditional = True
+
     def __init__(self, obj):
         self.obj = obj
 
@@ -42,8 +52,94 @@ class Renderable(object):
             or 'kml' in self.mimetype \
             else None
 
+    def last_modified(self, ctx, req):
+        """Determine the time of the last modification of the data rendered for ctx.
+
+        Since representations typically include related objects and dataset metadata,
+        this is the latest of ``ctx.updated`` - if ctx is a model instance - and the
+        ``updated`` timestamp of the dataset.
+
+        :return: ``datetime`` instance or ``None``.
+        """
+        res = [
+            d for d in [getattr(ctx, 'updated', None),
+                        req.dataset.updated if req.dataset else None] if d]
+        if res:
+            return max(res).replace(microsecond=0)
+
+    def etag(self, ctx, req):
+        """Compute an entity tag for the representation of ctx.
+
+        The tag changes whenever ``ctx.updated`` or the data version of the app changes;
+        for indexes it also depends on the query parameters of the request, i.e. on
+        filtering and sorting.
+        """
+        updated = getattr(ctx, 'updated', None)
+        if updated is None and not req.data_version:
+            return
+        return md5('|'.join([
+            req.path_qs,
+            self.send_mimetype or self.mimetype,
+            self.template or '',
+            updated.isoformat() if updated else '',
+            req.data_version or '']).encode('utf8')).hexdigest()
+
+    def validators(self, ctx, req):
+        """Compute the validators for conditional requests.
+
+        :return: Pair (etag, last_modified) - both may be ``None``.
+        """
+        if not self.conditional:
+            return None, None
+        return self.etag(ctx, req), self.last_modified(ctx, req)
+
+    def not_modified(self, req, etag, last_modified):
+        """Check whether a conditional request can be answered with 304 Not Modified.
+
+        :return: ``HTTPNotModified`` response or ``None``.
+        """
+        if req.if_none_match:
+            modified = etag is None or etag not in req.if_none_match
+        elif req.if_modified_since and last_modified:
+            if last_modified.tzinfo is None:
+                last_modified = last_modified.replace(tzinfo=req.if_modified_since.tzinfo)
+            modified = last_modified > req.if_modified_since
+        else:
+            modified = True
+        if not modified:
+            res = HTTPNotModified()
+            res.vary = to_binary('Accept')
+            self.set_validators(res, etag, last_modified)
+            return res
+
+    def set_validators(self, res, etag, last_modified):
+        if etag:
+            res.etag = etag
+        if last_modified:
+            res.last_modified = last_modified
+
     def render_to_response(self, ctx, req):
-        res = Response(self.render(ctx, req))
+        return self.response(self.render(ctx, req))
+
+    def conditional_response(self, ctx, req):
+        """Render ctx as response, or respond with 304 Not Modified.
+
+        Conditional requests - i.e. requests with ``If-None-Match`` or
+        ``If-Modified-Since`` header - are answered before anything is rendered.
+        """
+        etag, last_modified = self.validators(ctx, req)
+        res = self.not_modified(req, etag, last_modified)
+        if res is None:
+            res = self.render_to_response(ctx, req)
+            self.set_validators(res, etag, last_modified)
+        return res
+
+    def response(self, *args, **kw):
+        """Create a response with the content type of the adapter.
+
+        Arguments are passed into the ``pyramid.response.Response`` constructor.
+        """
+        res = Response(*args, **kw)
         res.vary = to_binary('Accept')
         res.content_type = str(self.send_mimetype or self.mimetype)
         if self.charset:
@@ -55,6 +151,29 @@ class Renderable(object):
             res.content_type_params = d
         return res
 
+    def spooled_response(self, chunks):
+        """Create a response sending chunks of bytes collected in a temporary file.
+
+        Iterating over ``chunks`` may query the database, so this must happen before the
+        view returns: Once pyramid_tm has finished the request's transaction, queries
+        would run in a new transaction, which is never ended. Spooling the chunks to a
+        temporary file - rather than joining them - keeps memory consumption bounded.
+
+        :param chunks: iterable of ``bytes``.
+        """
+        fp = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        try:
+            for chunk in chunks:
+                fp.write(chunk)
+            size = fp.tell()
+            fp.seek(0)
+        except Exception:
+            fp.close()
+            raise
+        res = self.response(app_iter=FileIter(fp))
+        res.content_length = size
+        return res
+
     def template_context(self, ctx, req):
         return {}
 
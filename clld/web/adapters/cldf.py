@@ -1,5 +1,8 @@
 from __future__ import unicode_literals
+import multiprocessing
 from collections import OrderedDict
+from io import BytesIO
+from zipfile import ZipFile, ZIP_STORED
 
 from sqlalchemy.orm import joinedload_all, joinedload
 from pycldf.dataset import Dataset
@@ -9,10 +12,12 @@ from pycldf.sources import Source
 from clld.util import safe_overwrite
 from clld.interfaces import ICldfDataset
 from clld.web.adapters.download import Download, format_readme
-from clld.db.meta import DBSession
+from clld.db.meta import DBSession, Base
+from clld.db.models import common
 from clld.db.models.common import (
     Contribution, ContributionContributor, ValueSet, Value, ValueSetReference,
 )
+from clld.db.util import page_query
 from clld.web.util.helpers import text_citation, get_url_template
 
 
@@ -33,14 +38,45 @@ def source2source(req, source):
         **fields)
 
 
+class ArchiveMembers(Archive):
+
+    """An in-memory archive, collecting the files of CLDF datasets.
+
+    Thus, datasets can be created in worker processes and merged into one archive. Since
+    the members are written to the final archive, they are stored uncompressed here.
+    """
+
+    def __init__(self):
+        self._buffer = BytesIO()
+        ZipFile.__init__(self, self._buffer, mode='w', compression=ZIP_STORED)
+
+    @property
+    def members(self):
+        """List of (name, content) pairs of the members of the closed archive."""
+        with ZipFile(self._buffer) as archive:
+            return [(name, archive.read(name)) for name in archive.namelist()]
+
+
 class CldfDataset(object):
-    def __init__(self, obj):
+
+    #: Number of values loaded from the database at a time.
+    batch_size = 1000
+
+    def __init__(self, obj, source_cache=None):
         self.obj = obj
+        #: Maps primary keys of clld sources to pycldf sources; may be shared between
+        #: datasets, because sources are typically cited in many contributions.
+        self.source_cache = {} if source_cache is None else source_cache
 
     def write(self, req, archive):
         ds = self.dataset(req)
         ds.write(archive=archive)
 
+    def source(self, req, source):
+        if source.pk not in self.source_cache:
+            self.source_cache[source.pk] = source2source(req, source)
+        return self.source_cache[source.pk]
+
     def columns(self, req):
         return [
             'ID',
@@ -87,7 +123,7 @@ class CldfDataset(object):
         for r in obj.references:
             if r.source:
                 refs.append('%s%s' % (r.source.id, _desc(r.description)))
-                sources.append(source2source(req, r.source))
+                sources.append(self.source(req, r.source))
         return ';'.join(refs), sources
 
     def value_query(self):
@@ -102,6 +138,14 @@ class CldfDataset(object):
                     Value.valueset, ValueSet.references, ValueSetReference.source))\
             .order_by(ValueSet.parameter_pk, ValueSet.language_pk, Value.pk)
 
+    def iter_values(self):
+        """Iterate over the values of the dataset in batches paged on primary key.
+
+        Note that paging replaces the ordering of `value_query`, i.e. values are ordered
+        by primary key.
+        """
+        return page_query(self.value_query(), n=self.batch_size, key=Value.pk)
+
     def dataset(self, req):
         ds = Dataset('%s-%s-%s' % (
             req.dataset.id, self.obj.__class__.__name__.lower(), self.obj.id))
@@ -126,7 +170,7 @@ class CldfDataset(object):
         ds.metadata['dc:isPartOf'] = req.resource_url(req.dataset)
         ds.metadata['dcat:accessURL'] = req.route_url('download')
 
-        for value in self.value_query():
+        for value in self.iter_values():
             refs, sources = self.refs_and_sources(req, value)
             row = self.row(req, value, refs)
             if row:
@@ -135,9 +179,33 @@ class CldfDataset(object):
         return ds
 
 
+_WORKER = {}
+
+
+def _dataset_members(pk):  # pragma: no cover
+    req, download = _WORKER['req'], _WORKER['download']
+    with ArchiveMembers() as archive:
+        download.dataset(req, Contribution.get(pk)).write(req, archive)
+    DBSession.remove()
+    return archive.members
+
+
 class CldfDownload(Download):
+
+    """Download of the contributions of a dataset in CLDF.
+
+    Contribution datasets can be created in ``jobs`` worker processes.
+    """
+
     ext = 'cldf'
     description = "Dataset in CLDF"
+    jobs = 1
+
+    def fingerprint_models(self):
+        return [
+            common.Dataset, Contribution, ContributionContributor, common.Contributor,
+            ValueSet, Value, ValueSetReference, common.Source, common.Language,
+            common.Parameter, common.DomainElement]
 
     def iterdatasets(self):
         for contrib in DBSession.query(Contribution) \
@@ -145,10 +213,42 @@ class CldfDownload(Download):
                 Contribution.contributor_assocs, ContributionContributor.contributor)):
             yield contrib
 
+    def dataset(self, req, contrib):
+        ds = req.registry.getAdapter(contrib, ICldfDataset, 'cldf')
+        ds.source_cache = self._source_cache
+        return ds
+
     def create(self, req, filename=None, verbose=True, outfile=None):
+        self._source_cache = {}
+        # Worker processes of a pool cannot start pools themselves:
+        jobs = 1 if multiprocessing.current_process().daemon else self.jobs
         with safe_overwrite(outfile or self.abspath(req)) as tmp:
             with Archive(tmp, 'w') as zipfile:
-                for contrib in self.iterdatasets():
-                    ds = req.registry.getAdapter(contrib, ICldfDataset, 'cldf')
-                    ds.write(req, zipfile)
+                if jobs > 1:
+                    for members in self.iter_members(req, jobs):
+                        for name, content in members:
+                            zipfile.writestr(name, content)
+                else:
+                    for contrib in self.iterdatasets():
+                        self.dataset(req, contrib).write(req, zipfile)
                 zipfile.write_text(format_readme(req), 'README.txt')
+
+    def iter_members(self, req, jobs):
+        """Create the contribution datasets in a pool of forked worker processes."""
+        pks = [c.pk for c in self.iterdatasets()]
+        # The workers must not share database connections with the parent process:
+        bind = DBSession.bind or Base.metadata.bind
+        DBSession.remove()
+        if bind is not None:
+            bind.dispose()
+        _WORKER.update(req=req, download=self)
+        ctx = multiprocessing.get_context('fork') \
+            if hasattr(multiprocessing, 'get_context') else multiprocessing
+        pool = ctx.Pool(jobs)
+        try:
+            for members in pool.imap(_dataset_members, pks):
+                yield members
+        finally:
+            pool.close()
+            pool.join()
+            _WORKER.clear()
@@ -9,21 +9,29 @@ We also provide metadata following the guidelines of
   http://www.w3.org/TR/2015/CR-tabular-metadata-20150716/
 """
 from __future__ import unicode_literals, print_function, division, absolute_import
-from itertools import chain
+from itertools import chain, islice
 
 from sqlalchemy import types, Column
 from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import Session
 from pyramid.renderers import render as pyramid_render
+from pyramid.settings import asbool
 from clldutils.dsv import UnicodeWriter
 
+from clld.db.meta import DBSession
 from clld.web.adapters.base import Index
 
 QUERY_LIMIT = 2000
+STREAM_BATCH_SIZE = 1000
 
 
 class CsvAdapter(Index):
 
-    """Represent tables as csv files (maximal %d rows)."""
+    """Represent tables as csv files (maximal %d rows).
+
+    If the setting ``clld.csv_stream`` is true, DataTables are exported without limit,
+    streaming batches of rows queried with a session of their own.
+    """
 
     __doc__ %= QUERY_LIMIT
 
@@ -35,15 +43,54 @@ class CsvAdapter(Index):
         with UnicodeWriter() as writer:
             rows = iter(ctx.get_query(limit=QUERY_LIMIT))
             first = next(rows, None)
+            cols = (ctx.db_model() if first is None else first).csv_head()
+            writer.writerow(cols)
             if first is not None:
-                cols = first.csv_head()
-                writer.writerow(cols)
                 for item in chain([first], rows):
                     writer.writerow(item.to_csv(ctx=ctx, req=req, cols=cols))
             return writer.read()
 
+    def iter_chunks(self, ctx, req, session=None):
+        """Iterate over all rows of a DataTable, encoded as csv in chunks of rows.
+
+        The header row is written even if no rows match.
+
+        :param session: Session to query the rows with, see\
+        :py:meth:`clld.web.datatables.base.DataTable.iter_query`.
+        :return: generator of ``bytes``.
+        """
+        items = ctx.iter_query(batch_size=STREAM_BATCH_SIZE, session=session)
+        batch = list(islice(items, STREAM_BATCH_SIZE))
+        cols = (batch[0] if batch else ctx.db_model()).csv_head()
+        with UnicodeWriter() as writer:
+            writer.writerow(cols)
+            yield writer.read()
+        while batch:
+            with UnicodeWriter() as writer:
+                writer.writerows(batch[0].csv_rows(batch, ctx=ctx, req=req, cols=cols))
+                yield writer.read()
+            batch = list(islice(items, STREAM_BATCH_SIZE))
+
+    def iter_stream(self, ctx, req):
+        """Iterate over the chunks of :py:meth:`iter_chunks` while the response is sent.
+
+        The response is sent after pyramid_tm has finished the request's transaction, so
+        rows are queried with a session on a connection of its own, which is closed when
+        the WSGI server closes the app_iter - or when iteration ends.
+        """
+        session = Session(bind=DBSession.get_bind(ctx.db_model()), autoflush=False)
+        try:
+            for chunk in self.iter_chunks(ctx, req, session=session):
+                yield chunk
+        finally:
+            session.close()
+
     def render_to_response(self, ctx, req):
-        res = super(CsvAdapter, self).render_to_response(ctx, req)
+        if asbool(req.registry.settings.get('clld.csv_stream')) \
+                and hasattr(ctx, 'iter_query'):
+            res = self.response(app_iter=self.iter_stream(ctx, req))
+        else:
+            res = super(CsvAdapter, self).render_to_response(ctx, req)
         res.content_disposition = 'attachment; filename="%s.csv"' % repr(ctx)
         return res
 
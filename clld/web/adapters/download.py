@@ -1,17 +1,27 @@
 # coding: utf8
 """Functionality to create downloads for the data of a clld app."""
 from __future__ import unicode_literals, division, absolute_import, print_function
+import os
+import sys
+import io
+import sqlite3
+import warnings
 from zipfile import ZipFile, ZIP_DEFLATED
 from gzip import GzipFile
-from contextlib import closing
+from contextlib import closing, contextmanager
+from tempfile import NamedTemporaryFile
 
-from six import string_types, BytesIO, text_type, StringIO, PY3
+from six import string_types, text_type, BytesIO, StringIO, PY3
 from zope.interface import implementer
 from pyramid.path import AssetResolver
+from sqlalchemy import create_engine
+from sqlalchemy.schema import CreateTable
 from sqlalchemy.orm import joinedload, joinedload_all, class_mapper
+from sqlalchemy.orm.interfaces import MANYTOONE
 from clldutils.path import Path
 from clldutils.dsv import UnicodeWriter
 from clldutils.misc import format_size, to_binary
+from clldutils import jsonlib
 
 from clld.util import safe_overwrite
 from clld.lib.rdf import FORMATS
@@ -19,10 +29,12 @@ from clld.web.adapters import get_adapter
 from clld.web.adapters.md import TxtCitation
 from clld.web.util.helpers import rdf_namespace_attrs
 from clld.interfaces import IRepresentation, IDownload
-from clld.db.meta import DBSession
+from clld.db.meta import DBSession, Base
 from clld.db.models.common import Language, Source, LanguageIdentifier
-from clld.db.util import page_query
+from clld.db.util import page_query, data_fingerprint
 
+# Members of zip archives can be written as streams since Python 3.6:
+ZIP_STREAMING = sys.version_info >= (3, 6)
 
 README = """
 {0} data download
@@ -68,6 +80,9 @@ class Download(object):
 
     ext = None
 
+    #: Names of downloads which must be created before this one.
+    depends_on = ()
+
     def __init__(self, model, pkg, **kw):
         if self.ext is None:
             self.ext = kw['ext']
@@ -99,7 +114,55 @@ class Download(object):
     def label(self, req):
         return "%s [%s]" % (getattr(self, 'description', self.name), self.size(req))
 
+    def fingerprint_models(self):
+        """The models - or association tables - whose data is written to the download.
+
+        These are :py:attr:`model`, the models related to it, and the models these refer
+        to via many-to-one relationships - e.g. for ``Value`` also ``ValueSet`` and its
+        ``Language``, ``Parameter`` and ``Contribution``. Subclasses writing data of
+        other models must override this method.
+        """
+        res, todo = [], [(class_mapper(self.model), True)]
+        while todo:
+            mapper, follow_all = todo.pop(0)
+            if mapper.class_ in res:
+                continue
+            res.append(mapper.class_)
+            for rel in mapper.relationships:
+                if follow_all or rel.direction is MANYTOONE:
+                    if rel.secondary is not None and rel.secondary not in res:
+                        res.append(rel.secondary)
+                    todo.append((rel.mapper, False))
+        return res
+
+    def fingerprint(self, req):
+        """Compute a fingerprint of the data written to the download.
+
+        .. seealso:: :py:func:`clld.db.util.data_fingerprint`
+        """
+        return data_fingerprint(*self.fingerprint_models())
+
+    def fingerprint_path(self, req):
+        """Path of the sidecar file storing the fingerprint of the download's data."""
+        path = self.abspath(req)
+        return path.parent.joinpath(path.name + '.fingerprint.json')
+
+    def is_current(self, req, fingerprint):
+        """Check whether the download has been created from data with this fingerprint."""
+        path = self.fingerprint_path(req)
+        if not self.abspath(req).exists() or not path.exists():
+            return False
+        return jsonlib.load(path) == fingerprint
+
+    def save_fingerprint(self, req, fingerprint):
+        jsonlib.dump(fingerprint, self.fingerprint_path(req), indent=4)
+
     def create(self, req, filename=None, verbose=True, outfile=None):
+        """Create the download file.
+
+        :return: Number of items written to the download or ``None``.
+        """
+        rows = None
         with safe_overwrite(outfile or self.abspath(req)) as tmp:
             if self.rdf:
                 # we do not create archives with a readme for rdf downloads, because each
@@ -108,31 +171,92 @@ class Download(object):
                 #
                 # TODO: write test for the file name things!?
                 #
-                with closing(GzipFile(
-                    filename=Path(tmp.stem).stem, fileobj=tmp.open('wb')
-                )) as fp:
-                    self.before(req, fp)
-                    for i, item in enumerate(page_query(self.query(req), verbose=verbose)):
-                        self.dump(req, fp, item, i)
-                    self.after(req, fp)
+                with tmp.open('wb') as raw:
+                    with closing(GzipFile(
+                        filename=Path(tmp.stem).stem, fileobj=raw
+                    )) as fp:
+                        rows = self.write(req, fp, verbose)
             else:
                 with ZipFile(tmp.as_posix(), 'w', ZIP_DEFLATED) as zipfile:
-                    if not filename:
+                    if not filename and self._legacy_stream():
+                        warnings.warn(
+                            'Download.get_stream and Download.read_stream are deprecated, '
+                            'override Download.open_stream instead.',
+                            DeprecationWarning)
                         fp = self.get_stream()
-                        self.before(req, fp)
-                        for i, item in enumerate(
-                                page_query(self.query(req), verbose=verbose)):
-                            self.dump(req, fp, item, i)
-                        self.after(req, fp)
+                        rows = self.write(req, fp, verbose)
                         zipfile.writestr(self.name, self.read_stream(fp))
-                    else:  # pragma: no cover
+                    elif not filename:
+                        with self.zip_member(zipfile) as raw:
+                            fp = self.open_stream(raw)
+                            rows = self.write(req, fp, verbose)
+                            fp.flush()
+                    else:
                         zipfile.write(Path(filename).as_posix(), self.name)
                     zipfile.writestr('README.txt', format_readme(req).encode('utf8'))
+        return rows
+
+    def write(self, req, fp, verbose=True):
+        """Write the items of the download to a stream.
+
+        :return: Number of items written.
+        """
+        rows = 0
+        self.before(req, fp)
+        for i, item in enumerate(self.iter_query(req, verbose=verbose)):
+            self.dump(req, fp, item, i)
+            rows += 1
+        self.after(req, fp)
+        return rows
+
+    @contextmanager
+    def zip_member(self, zipfile):
+        """Open a binary stream writing the download into a member of a zip archive.
+
+        Thus, the content of the download is compressed while it is written, and never
+        held in memory as a whole.
+        """
+        if ZIP_STREAMING:
+            with zipfile.open(self.name, 'w', force_zip64=True) as fp:
+                yield fp
+        else:  # pragma: no cover
+            # Older Pythons can only add files or strings to zip archives, so we resort to
+            # a temporary file.
+            fp = NamedTemporaryFile(delete=False)
+            try:
+                with fp:
+                    yield fp
+                zipfile.write(fp.name, self.name)
+            finally:
+                os.remove(fp.name)
+
+    def open_stream(self, fp):
+        """Wrap the binary stream to which the download is written.
+
+        :param fp: Binary stream.
+        :return: File-like object, passed into :py:meth:`before`, :py:meth:`dump` and\
+        :py:meth:`after`.
+        """
+        return fp
+
+    def _legacy_stream(self):
+        """Whether a subclass still customizes the deprecated stream methods."""
+        for cls in type(self).__mro__:
+            if cls in (Download, CsvDump):
+                return False
+            if 'get_stream' in vars(cls) or 'read_stream' in vars(cls):
+                return True
+        return False  # pragma: no cover
 
     def get_stream(self):
+        """Deprecated: Downloads are written to :py:meth:`zip_member` streams."""
+        warnings.warn(
+            'Download.get_stream is deprecated, use Download.open_stream', DeprecationWarning)
         return BytesIO()
 
     def read_stream(self, fp):
+        """Deprecated: Downloads are written to :py:meth:`zip_member` streams."""
+        warnings.warn('Download.read_stream is deprecated', DeprecationWarning)
         fp.seek(0)
         return fp.read()
 
@@ -147,6 +271,10 @@ class Download(object):
             q = q.options(joinedload(Source.languages))
         return q.order_by(self.model.pk)
 
+    def iter_query(self, req, verbose=True):
+        """Iterate over the items of the download in batches paged on primary key."""
+        return page_query(self.query(req), verbose=verbose, key=self.model.pk)
+
     def before(self, req, fp):
         pass
 
@@ -179,10 +307,16 @@ class CsvDump(Download):
         self.fields = fields
         self.writer = None
 
+    def open_stream(self, fp):
+        return io.TextIOWrapper(fp, encoding='utf8', newline='') if PY3 else fp
+
     def get_stream(self):
+        """Deprecated: Downloads are written to :py:meth:`zip_member` streams."""
+        Download.get_stream(self)
         return StringIO(newline='') if PY3 else BytesIO()
 
     def read_stream(self, fp):
+        """Deprecated: Downloads are written to :py:meth:`zip_member` streams."""
         res = Download.read_stream(self, fp)
         if PY3:  # pragma: no cover
             res = res.encode('utf8')
@@ -213,6 +347,14 @@ class N3Dump(Download):
 
     ext = 'n3'
 
+    def dump(self, req, fp, item, index):
+        adapter = get_adapter(IRepresentation, item, req, ext=self.ext)
+        if getattr(adapter, 'use_triples', None) and adapter.use_triples(item):
+            for chunk in adapter.serialize(item, req, header=index == 0):
+                fp.write(chunk.encode('utf8'))
+        else:
+            self.dump_rendered(req, fp, item, index, adapter.render(item, req))
+
     def dump_rendered(self, req, fp, item, index, rendered):
         header, body = rendered.split(to_binary('\n\n'), 1)
         if index == 0:
@@ -234,6 +376,14 @@ class RdfXmlDump(Download):
     def after(self, req, fp):
         fp.write(to_binary('</rdf:RDF>'))
 
+    def dump(self, req, fp, item, index):
+        adapter = get_adapter(IRepresentation, item, req, ext=self.ext)
+        if getattr(adapter, 'use_triples', None) and adapter.use_triples(item):
+            for chunk in adapter.serialize(item, req, header=False):
+                fp.write(chunk.encode('utf8'))
+        else:
+            self.dump_rendered(req, fp, item, index, adapter.render(item, req))
+
     def dump_rendered(self, req, fp, item, index, rendered):
         body = rendered.split(to_binary('rdf:Description'))[1]
         fp.write(to_binary('<rdf:Description') + body + to_binary('rdf:Description>\n'))
@@ -241,15 +391,72 @@ class RdfXmlDump(Download):
 
 class Sqlite(Download):
 
-    """Generic download - no support for file creation."""
+    """Download of the full database as SQLite file.
+
+    If the app runs on SQLite, the database is copied with SQLite's online backup API;
+    otherwise the rows of all tables are bulk-copied into a fresh SQLite database.
+    """
 
     ext = 'sqlite'
+    #: Number of rows inserted with one ``executemany`` call when bulk-copying tables.
+    batch_size = 5000
 
-    def create(self, req):  # pragma: no cover
-        print('+---------------------------------------------+')
-        print('| This download must be created "by hand".')
-        print('| Make sure a suitable file is available at')
-        print('|', self.abspath(req))
-        print('| when the app is started.')
-        print('+---------------------------------------------+')
-        return
+    def fingerprint_models(self):
+        return Base.metadata.sorted_tables
+
+    def create(self, req, filename=None, verbose=True, outfile=None):
+        if filename:
+            return super(Sqlite, self).create(
+                req, filename=filename, verbose=verbose, outfile=outfile)
+        with NamedTemporaryFile(suffix='.sqlite', delete=False) as fp:
+            pass
+        try:
+            DBSession.flush()
+            conn = DBSession.connection()
+            # A connection cannot be backed up while it is used to write to the database.
+            if conn.dialect.name == 'sqlite' and hasattr(sqlite3.Connection, 'backup') \
+                    and not conn.connection.connection.in_transaction:
+                self.backup(conn, fp.name)
+            else:
+                self.copy(conn, fp.name)
+            super(Sqlite, self).create(
+                req, filename=fp.name, verbose=verbose, outfile=outfile)
+        finally:
+            os.remove(fp.name)
+
+    def backup(self, conn, path):
+        """Copy a SQLite database using the online backup API."""
+        dst = sqlite3.connect(path)
+        try:
+            conn.connection.connection.backup(dst)
+        finally:
+            dst.close()
+
+    def copy(self, conn, path):
+        """Copy the rows of all tables of the database to a new SQLite database.
+
+        Indexes are created after the rows have been copied, because building an index
+        at once is much faster than updating it with each inserted row.
+        """
+        engine = create_engine('sqlite:///%s' % path)
+        try:
+            with engine.connect() as dst:
+                # We write to a new file, which is discarded if anything goes wrong, so
+                # we don't need journaling or syncing:
+                dst.execute('PRAGMA journal_mode = OFF')
+                dst.execute('PRAGMA synchronous = OFF')
+                with dst.begin():
+                    for table in Base.metadata.sorted_tables:
+                        dst.execute(CreateTable(table))
+                        rows = conn.execution_options(stream_results=True).execute(
+                            table.select().order_by(*table.primary_key.columns))
+                        while True:
+                            batch = rows.fetchmany(self.batch_size)
+                            if not batch:
+                                break
+                            dst.execute(table.insert(), [dict(row) for row in batch])
+                    for table in Base.metadata.sorted_tables:
+                        for index in table.indexes:
+                            index.create(dst)
+        finally:
+            engine.dispose()
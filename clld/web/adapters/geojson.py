@@ -3,22 +3,36 @@ Functionality to serialize clld objects as GeoJSON.
 
 .. seealso:: http://geojson.org/
 """
-from json import loads
+import math
+from json import loads, dumps
 from itertools import groupby
 
 from zope.interface import implementer
 from pyramid.renderers import render as pyramid_render
+from sqlalchemy import case, func, distinct, select, literal, literal_column, or_, and_
 from sqlalchemy.orm import joinedload
-from clldutils.misc import nfilter
+from clldutils.misc import nfilter, to_binary
 
 from clld.web.adapters.base import Renderable
 from clld import interfaces
 from clld.db.meta import DBSession
-from clld.db.models.common import ValueSet, Value, Language
+from clld.db.models.common import ValueSet, Value, Language, DomainElement
+from clld.db.util import int_floor
 
 
 _PACIFIC_CENTERED = False
 
+#: Features are clustered for requests specifying a zoom level up to this level.
+CLUSTER_MAX_ZOOM = 5
+
+#: Number of grid cells per axis of a map tile of 256 pixels, in which features are
+#: clustered, i.e. clusters cover about 64 x 64 pixels of a map in Web Mercator
+#: projection.
+CLUSTER_GRID_CELLS = 4
+
+#: Objects for unclustered features are retrieved in chunks of this size.
+CLUSTER_CHUNK_SIZE = 500
+
 
 def pacific_centered():
     global _PACIFIC_CENTERED
@@ -74,6 +88,100 @@ def get_lonlat(obj):
     return longitude, latitude
 
 
+def parse_bbox(s):
+    """Parse a bounding box passed as "west,south,east,north".
+
+    >>> parse_bbox('-10,-5.5,10,5.5')
+    (-10.0, -5.5, 10.0, 5.5)
+    """
+    try:
+        bbox = tuple(float(n) for n in (s or '').split(','))
+    except ValueError:
+        return
+    if len(bbox) == 4:
+        return bbox
+
+
+#: Longitudes are compared with bounding boxes modulo 360, because the longitudes of
+#: pacific centered maps - and the bounding boxes of tiles - may exceed -180..180.
+LONGITUDE_SHIFTS = (-360, 0, 360)
+
+
+def in_bbox(lonlat, bbox):
+    """
+    >>> in_bbox((300, 0), (-70, -10, -50, 10))
+    True
+    """
+    return bbox is None or (
+        bbox[1] <= lonlat[1] <= bbox[3]
+        and any(bbox[0] <= lonlat[0] + s <= bbox[2] for s in LONGITUDE_SHIFTS))
+
+
+def mercator_row_boundaries(n):
+    """Latitudes of the boundaries between n rows of equal height in Web Mercator.
+
+    >>> [round(lat, 2) for lat in mercator_row_boundaries(4)]
+    [66.51, 0.0, -66.51]
+    """
+    return [
+        math.degrees(math.atan(math.sinh(math.pi * (1 - 2.0 * k / n))))
+        for k in range(1, n)]
+
+
+def cluster_query(items, zoom, bbox=None):
+    """Aggregate items in the cells of a grid on a map in Web Mercator projection.
+
+    The grid has ``CLUSTER_GRID_CELLS`` cells per axis of a map tile at the zoom level.
+
+    :param items: Query with columns ``key``, ``language_pk``, ``group``, ``latitude`` \
+    and ``longitude``; items of different groups are never put in the same cluster.
+    :param bbox: Only items with coordinates in this bounding box are aggregated.
+    :return: Query of clusters, with columns ``group``, ``n`` (the number of items), \
+    ``languages`` (the number of distinct languages), ``latitude`` and ``longitude`` \
+    (the mean of the coordinates) and ``key`` (the smallest key).
+    """
+    n = 2 ** min(zoom, CLUSTER_MAX_ZOOM) * CLUSTER_GRID_CELLS
+    items = items.subquery()
+    lat, lon = items.c.latitude, items.c.longitude
+    clauses = [lat != None, lon != None]
+    if _PACIFIC_CENTERED:
+        lon = case([(lon <= -26, lon + 360)], else_=lon)
+    west, south, east, north = bbox or (None, -90, None, 90)
+    if bbox:
+        clauses.extend([
+            or_(*[and_(lon + s >= west, lon + s <= east) for s in LONGITUDE_SHIFTS]),
+            lat >= south,
+            lat <= north])
+
+    # Columns are linear in longitude, for rows we compare latitudes with the row
+    # boundaries within the bounding box:
+    boundaries = mercator_row_boundaries(n)
+    rows = [(lat >= b, i) for i, b in enumerate(boundaries) if south < b <= north]
+    below = len([b for b in boundaries if b > south])
+    row = case(rows, else_=below) if rows else literal(below)
+    col = int_floor((lon + 180) * (n / 360.0))
+
+    return DBSession.query(
+        col.label('cell_x'),
+        row.label('cell_y'),
+        items.c.group,
+        func.count().label('n'),
+        func.count(distinct(items.c.language_pk)).label('languages'),
+        func.avg(lat).label('latitude'),
+        func.avg(lon).label('longitude'),
+        func.min(items.c.key).label('key'))\
+        .filter(*clauses)\
+        .group_by(literal_column('cell_x'), literal_column('cell_y'), items.c.group)
+
+
+def _defined_by(obj, name, cls):
+    """Check whether the attribute ``name`` of ``obj`` is the one defined by ``cls``."""
+    for c in type(obj).__mro__:
+        if name in c.__dict__:
+            return c is cls
+    return False  # pragma: no cover
+
+
 def get_feature(obj, lonlat=None, **properties):
     res = {
         'type': 'Feature',
@@ -102,6 +210,17 @@ class GeoJson(Renderable):
     mimetype = 'application/geojson'
     send_mimetype = 'application/json'  # application/vnd.geo+json
 
+    #: ``dict`` of parameters - e.g. ``zoom`` and ``bbox`` - taking precedence over the
+    #: request parameters of the same name; thus, callers like the tile view can specify
+    #: them without modifying the request.
+    params = None
+
+    def param(self, req, name):
+        """Look up a parameter, passed in :py:attr:`params` or with the request."""
+        if self.params and name in self.params:
+            return self.params[name]
+        return req.params.get(name)
+
     def _featurecollection_properties(self, ctx, req):
         """Get properties object for the FeatureCollection.
 
@@ -140,13 +259,95 @@ class GeoJson(Renderable):
         """override to fetch language object from non-default location."""
         return feature
 
+    def zoom(self, req):
+        """The zoom level requested with a ``zoom`` parameter, if features are clustered.
+        """
+        try:
+            zoom = int(self.param(req, 'zoom'))
+        except (ValueError, TypeError):
+            return
+        if 0 <= zoom <= CLUSTER_MAX_ZOOM:
+            return zoom
+
+    def bbox(self, req):
+        """The bounding box (west, south, east, north) requested with a ``bbox`` parameter.
+        """
+        bbox = self.param(req, 'bbox')
+        return bbox if isinstance(bbox, tuple) else parse_bbox(bbox)
+
+    def cluster_items(self, ctx, req):
+        """override to support clustering of features.
+
+        :return: Query with columns ``key``, ``language_pk``, ``group``, ``latitude`` \
+        and ``longitude``, or ``None`` if features cannot be clustered; ``key`` \
+        identifies the object of a feature and only features with the same ``group`` \
+        are clustered (see :py:func:`cluster_query`).
+        """
+        return None
+
+    def cluster_objects(self, ctx, req, keys):
+        """Retrieve the objects for features by the keys used in ``cluster_items``."""
+        return []
+
+    def cluster_properties(self, ctx, req, groups):
+        """override to add properties to clusters.
+
+        :return: ``dict`` mapping groups to property dicts.
+        """
+        return {}
+
+    def get_clusters(self, ctx, req, items, zoom):
+        """Yield clusters of the features within the requested bounding box.
+
+        Features are aggregated in SQL, thus the cost depends on the number of clusters
+        rather than the number of features. Clusters are features with a ``cluster``
+        property giving the number of features they contain; clusters of single features
+        are yielded as regular features.
+        """
+        clusters = cluster_query(items, zoom, self.bbox(req)).all()
+        properties = self.cluster_properties(
+            ctx, req, set(cluster.group for cluster in clusters))
+        singles = []
+
+        for cluster in clusters:
+            if cluster.n == 1:
+                singles.append(cluster.key)
+                continue
+            props = {
+                'cluster': cluster.n,
+                'label': req.translate(
+                    '${languages} languages', mapping={'languages': cluster.languages})}
+            props.update(properties.get(cluster.group, {}))
+            yield get_feature(
+                None, lonlat=(cluster.longitude, cluster.latitude), **props)
+
+        for i in range(0, len(singles), CLUSTER_CHUNK_SIZE):
+            for feature in self.iter_features(
+                    ctx, req,
+                    self.cluster_objects(ctx, req, singles[i:i + CLUSTER_CHUNK_SIZE])):
+                yield feature
+
     def get_features(self, ctx, req):
+        """Retrieve the features, clustered if a zoom level is requested.
+
+        With a ``bbox`` request parameter, only features within this bounding box are
+        returned.
+        """
+        zoom = self.zoom(req)
+        if zoom is not None:
+            items = self.cluster_items(ctx, req)
+            if items is not None:
+                return self.get_clusters(ctx, req, items, zoom)
+        return self.iter_features(ctx, req, self.feature_iterator(ctx, req))
+
+    def iter_features(self, ctx, req, objects):
         map_marker = req.registry.getUtility(interfaces.IMapMarker)
+        bbox = self.bbox(req)
 
-        for feature in self.feature_iterator(ctx, req):
+        for feature in objects:
             language = self.get_language(ctx, req, feature)
             lonlat = get_lonlat(language)
-            if lonlat:
+            if lonlat and in_bbox(lonlat, bbox):
                 properties = self.feature_properties(ctx, req, feature) or {}
                 properties.setdefault('icon', map_marker(feature, req))
                 properties.setdefault('language', language)
@@ -162,7 +363,23 @@ class GeoJson(Renderable):
 
 class GeoJsonParameter(GeoJson):
 
-    """Render a parameter's values as geojson feature collection."""
+    """Render a parameter's values as geojson feature collection.
+
+    The features can be restricted to the layer of one domain element with the request
+    parameter ``domainelement``; with the request parameter ``layers``, all layers are
+    served at once, each feature having a ``layer`` property with the id of its domain
+    element (see :py:class:`clld.web.maps.ParameterMap`).
+
+    With ``__projected__ = True`` features are created from the required columns only,
+    selected as tuples, and the feature collection is streamed. This requires that the
+    map marker of a valueset depends only on the domain element of its first value (see
+    :py:meth:`icon_map`), and is only used if the hooks to select and describe features
+    (``feature_iterator``, ``get_query``, ``get_language`` and ``feature_properties``)
+    are not overridden. Note that the ``language`` and ``values`` properties of features
+    are then reduced to ids and names.
+    """
+
+    __projected__ = False
 
     def featurecollection_properties(self, ctx, req):
         marker = req.registry.getUtility(interfaces.IMapMarker)
@@ -178,21 +395,183 @@ class GeoJsonParameter(GeoJson):
             .filter(ValueSet.parameter_pk == ctx.pk)\
             .options(joinedload(ValueSet.values), joinedload(ValueSet.language))
 
+    def domainelement_filter(self, de):
+        """SQL criterion selecting valuesets with a value for the domain element ``de``.
+
+        :param de: ``id`` of a domain element.
+        """
+        return ValueSet.pk.in_(
+            DBSession.query(Value.valueset_pk)
+            .join(DomainElement, Value.domainelement_pk == DomainElement.pk)
+            .filter(DomainElement.id == de))
+
     def feature_iterator(self, ctx, req):
+        query = self.get_query(ctx, req)
         de = req.params.get('domainelement')
+        if de or req.params.get('layers'):
+            query = query.options(
+                joinedload(ValueSet.values).joinedload(Value.domainelement))
         if de:
-            return [vs for vs in ctx.valuesets
-                    if vs.values and vs.values[0].domainelement.id == de]
-        return self.get_query(ctx, req)
+            # Valuesets belong to the layer of the domain element of their first value,
+            # which we check for the valuesets selected in SQL.
+            return [vs for vs in query.filter(self.domainelement_filter(de))
+                    if vs.values and vs.values[0].domainelement
+                    and vs.values[0].domainelement.id == de]
+        return query
 
     def get_language(self, ctx, req, valueset):
         return valueset.language
 
     def feature_properties(self, ctx, req, valueset):
-        return {
+        res = {
             'values': list(valueset.values),
             'label': ', '.join(nfilter(v.name for v in valueset.values))
             or self.get_language(ctx, req, valueset).name}
+        if req.params.get('layers'):
+            de = valueset.values[0].domainelement
+            res['layer'] = de.id if de else None
+        return res
+
+    def projected(self):
+        """Whether features are created from column tuples."""
+        return self.__projected__ and all(
+            _defined_by(self, name, GeoJsonParameter) for name in [
+                'feature_iterator', 'get_query', 'get_language', 'feature_properties'])
+
+    def icon_map(self, ctx, req):
+        """Map primary keys of domain elements to icons.
+
+        The icon for valuesets without domain element is stored under key ``None``.
+        """
+        marker = req.registry.getUtility(interfaces.IMapMarker)
+        res = {de.pk: marker(de, req) for de in getattr(ctx, 'domain', [])}
+        res[None] = marker(ctx, req)
+        return res
+
+    def projected_query(self, ctx, req):
+        """Query the columns needed to create features, ordered by valueset.
+
+        Within a valueset, values are ordered like ``ValueSet.values``.
+        """
+        query = DBSession.query(
+            ValueSet.pk.label('valueset_pk'),
+            ValueSet.language_pk,
+            Language.id.label('language_id'),
+            Language.name.label('language_name'),
+            Language.latitude,
+            Language.longitude,
+            Value.id.label('value_id'),
+            Value.name.label('value_name'),
+            Value.domainelement_pk,
+            DomainElement.id.label('domainelement_id'))\
+            .select_from(ValueSet)\
+            .join(Language, ValueSet.language_pk == Language.pk)\
+            .join(Value, Value.valueset_pk == ValueSet.pk)\
+            .outerjoin(DomainElement, Value.domainelement_pk == DomainElement.pk)\
+            .filter(ValueSet.parameter_pk == ctx.pk)\
+            .order_by(ValueSet.pk, Value.frequency.desc(), Value.confidence, Value.pk)
+        de = req.params.get('domainelement')
+        if de:
+            query = query.filter(self.domainelement_filter(de))
+        return query
+
+    def get_projected_features(self, ctx, req):
+        icons = self.icon_map(ctx, req)
+        de = req.params.get('domainelement')
+        layers = req.params.get('layers')
+        bbox = self.bbox(req)
+
+        for _, rows in groupby(self.projected_query(ctx, req), lambda r: r.valueset_pk):
+            rows = list(rows)
+            first = rows[0]
+            if de and first.domainelement_id != de:
+                continue
+            lonlat = get_lonlat((first.longitude, first.latitude))
+            if lonlat and in_bbox(lonlat, bbox):
+                res = get_feature(
+                    None,
+                    lonlat=lonlat,
+                    name=first.language_name,
+                    icon=icons.get(first.domainelement_pk, icons[None]),
+                    language={'id': first.language_id, 'name': first.language_name},
+                    values=[
+                        {'id': r.value_id, 'name': r.value_name,
+                         'domainelement': r.domainelement_id} for r in rows],
+                    label=', '.join(nfilter(r.value_name for r in rows))
+                    or first.language_name)
+                res['id'] = first.language_id
+                if layers:
+                    res['properties']['layer'] = first.domainelement_id
+                yield res
+
+    def cluster_items(self, ctx, req):
+        if not all(_defined_by(self, name, GeoJsonParameter)
+                   for name in ['feature_iterator', 'get_query']):
+            return None
+        # Valuesets are grouped by the domain element of their first value:
+        group = select([Value.domainelement_pk])\
+            .where(Value.valueset_pk == ValueSet.pk)\
+            .order_by(Value.frequency.desc(), Value.confidence, Value.pk)\
+            .limit(1)\
+            .as_scalar()
+        query = DBSession.query(
+            ValueSet.pk.label('key'),
+            ValueSet.language_pk.label('language_pk'),
+            group.label('group'),
+            Language.latitude.label('latitude'),
+            Language.longitude.label('longitude'))\
+            .join(Language, ValueSet.language_pk == Language.pk)\
+            .filter(ValueSet.parameter_pk == ctx.pk)\
+            .filter(ValueSet.pk.in_(DBSession.query(Value.valueset_pk)))
+        de = req.params.get('domainelement')
+        if de:
+            query = query.filter(group == select([DomainElement.pk])
+                                 .where(DomainElement.id == de).as_scalar())
+        return query
+
+    def cluster_objects(self, ctx, req, keys):
+        return self.get_query(ctx, req)\
+            .filter(ValueSet.pk.in_(keys))\
+            .options(joinedload(ValueSet.values).joinedload(Value.domainelement))
+
+    def cluster_properties(self, ctx, req, groups):
+        icons = self.icon_map(ctx, req)
+        ids = {de.pk: de.id for de in getattr(ctx, 'domain', [])}
+        res = {}
+        for group in groups:
+            res[group] = {'icon': icons.get(group, icons[None])}
+            if req.params.get('layers'):
+                res[group]['layer'] = ids.get(group)
+        return res
+
+    def get_features(self, ctx, req):
+        if self.projected() and self.zoom(req) is None:
+            return self.get_projected_features(ctx, req)
+        return GeoJson.get_features(self, ctx, req)
+
+    def iter_json(self, ctx, req):
+        """Serialize the feature collection in chunks, one per feature."""
+        yield '{"type": "FeatureCollection", "properties": %s, "features": [' \
+            % pyramid_render('json', self._featurecollection_properties(ctx, req),
+                             request=req)
+        # Unclustered features of clustered collections are created from ORM objects:
+        projected = self.zoom(req) is None
+        for i, feature in enumerate(self.get_features(ctx, req)):
+            yield (', ' if i else '') + (
+                dumps(feature) if projected
+                else pyramid_render('json', feature, request=req))
+        yield ']}'
+
+    def render(self, ctx, req, dump=True):
+        if dump and self.projected():
+            return ''.join(self.iter_json(ctx, req))
+        return GeoJson.render(self, ctx, req, dump=dump)
+
+    def render_to_response(self, ctx, req):
+        if self.projected() and _defined_by(self, 'render', GeoJsonParameter):
+            return self.spooled_response(
+                to_binary(chunk) for chunk in self.iter_json(ctx, req))
+        return GeoJson.render_to_response(self, ctx, req)
 
 
 class GeoJsonParameterMultipleValueSets(GeoJsonParameter):
@@ -241,3 +620,19 @@ class GeoJsonParameterFlatProperties(GeoJsonParameter):
 @implementer(interfaces.IIndex)
 class GeoJsonLanguages(GeoJson):
     """Render a collection of languages as geojson feature collection."""
+
+    def cluster_items(self, ctx, req):
+        if not (interfaces.IDataTable.providedBy(ctx) and ctx.model == Language) \
+                or not all(_defined_by(self, name, GeoJson)
+                           for name in ['feature_iterator', 'get_language']):
+            return None
+        model = ctx.db_model()
+        return ctx.sorted_query(count=False)[0].order_by(None).with_entities(
+            model.pk.label('key'),
+            model.pk.label('language_pk'),
+            literal(None).label('group'),
+            model.latitude.label('latitude'),
+            model.longitude.label('longitude'))
+
+    def cluster_objects(self, ctx, req, keys):
+        return DBSession.query(ctx.db_model()).filter(ctx.db_model().pk.in_(keys))
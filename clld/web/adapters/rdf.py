@@ -3,16 +3,37 @@ from sqlalchemy.orm import load_only
 from clldutils.misc import xmlchars
 
 from clld.web.adapters.base import Representation, Index
-from clld.lib.rdf import convert
+from clld.lib.rdf import convert, serialize
 
 
 class Rdf(Representation):
 
-    """Virtual base class."""
+    """Virtual base class.
+
+    If :py:attr:`triples` is set, the RDF description of resources implementing
+    ``__triples__`` is serialized directly from the triples, rather than by parsing the
+    RDF/XML rendered from the template into an rdflib Graph and serializing the graph.
+    """
 
     rdflibname = None
 
+    #: Whether to serialize the triples of ``ctx.__triples__``, see \
+    #: :py:meth:`clld.db.meta.Base.__triples__`.
+    triples = False
+
+    def use_triples(self, ctx):
+        return self.triples and callable(getattr(ctx, '__triples__', None))
+
+    def serialize(self, ctx, req, header=True):
+        """Serialize the triples describing ctx incrementally.
+
+        :return: Generator of text chunks, see :py:func:`clld.lib.rdf.serialize`.
+        """
+        return serialize(ctx.__triples__(req), self.rdflibname, header=header)
+
     def render(self, ctx, req):
+        if self.use_triples(ctx):
+            return ''.join(self.serialize(ctx, req)).encode('utf8')
         return convert(
             xmlchars(super(Rdf, self).render(ctx, req)), 'xml', self.rdflibname)
 
@@ -0,0 +1,169 @@
+"""Represent clld objects as Excel 2007+ (xlsx) spreadsheets.
+
+Requires `openpyxl <https://openpyxl.readthedocs.io>`_; the adapters are only
+registered if it is installed.
+"""
+from __future__ import unicode_literals, print_function, division, absolute_import
+import re
+from itertools import islice
+from tempfile import TemporaryFile
+
+from six import string_types, text_type
+from sqlalchemy.orm import joinedload
+from pyramid.response import FileIter
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+except ImportError:  # pragma: no cover
+    openpyxl = None
+
+from clld.web.adapters.base import Index
+from clld.db.models import common
+
+#: xlsx sheets are limited to 1048576 rows, one of which we need for the header.
+MAX_ROWS = 1048575
+
+SHEET_TITLE_PATTERN = re.compile(r'[\\*?:/\[\]]')
+
+#: Spreadsheet applications may evaluate strings starting with these characters.
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
+class Formula(text_type):
+
+    """A string to be written as formula."""
+
+
+def hyperlink(url, label=None):
+    label = label.replace('"', "'") if label else url
+    return Formula('=HYPERLINK("%s","%s")' % (url, label[:255]))
+
+
+def cell(ws, value):
+    """Prepare a value for writing to a cell of a write-only worksheet.
+
+    Strings - except :py:class:`Formula` instances - which could be mistaken for formulas
+    are written as explicit string cells.
+    """
+    if isinstance(value, string_types) and not isinstance(value, Formula) \
+            and value.startswith(FORMULA_PREFIXES):
+        res = WriteOnlyCell(ws, value=value)
+        res.data_type = 's'
+        return res
+    return value
+
+
+def or_empty(value):
+    return '' if value is None else value
+
+
+class XlsxAdapter(Index):
+
+    """Represent tables as xlsx spreadsheets.
+
+    Rows are written to a write-only workbook, which keeps them in temporary files,
+    and the spreadsheet is sent from a temporary file; thus memory consumption does not
+    depend on the number of rows.
+    """
+
+    extension = 'xlsx'
+    mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    def header(self, ctx, req):
+        return ['ID', 'Name']
+
+    def row(self, ctx, req, item):
+        return [item.id, hyperlink(req.resource_url(item), item.__unicode__())]
+
+    def query_options(self):
+        """Query options to load the relations accessed in ``row`` in bulk."""
+        return []
+
+    def write(self, ctx, req, fp):
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(title=SHEET_TITLE_PATTERN.sub('', ctx.__unicode__())[:31])
+        ws.append(self.header(ctx, req))
+        for item in islice(ctx.iter_query(options=self.query_options()), MAX_ROWS):
+            ws.append([cell(ws, value) for value in self.row(ctx, req, item)])
+        wb.save(fp)
+
+    def render(self, ctx, req):
+        with TemporaryFile() as fp:
+            self.write(ctx, req, fp)
+            fp.seek(0)
+            return fp.read()
+
+    def render_to_response(self, ctx, req):
+        fp = TemporaryFile()
+        try:
+            self.write(ctx, req, fp)
+            size = fp.tell()
+            fp.seek(0)
+        except Exception:
+            fp.close()
+            raise
+        res = self.response(app_iter=FileIter(fp))
+        res.content_length = size
+        res.content_disposition = 'attachment; filename="%s.xlsx"' % repr(ctx)
+        return res
+
+
+class Languages(XlsxAdapter):
+
+    """Represent DataTable of Language instances as xlsx spreadsheet."""
+
+    def header(self, ctx, req):
+        return super(Languages, self).header(ctx, req) + ['Latitude', 'Longitude']
+
+    def row(self, ctx, req, item):
+        res = super(Languages, self).row(ctx, req, item)
+        res.extend([item.latitude, item.longitude])
+        return res
+
+
+class Values(XlsxAdapter):
+
+    """Represent table of Value instances as xlsx spreadsheet."""
+
+    def header(self, ctx, req):
+        return super(Values, self).header(ctx, req) + [
+            'Parameter', 'Language', 'Frequency', 'Confidence', 'References']
+
+    def query_options(self):
+        valueset = joinedload(common.Value.valueset)
+        return [
+            valueset.joinedload(common.ValueSet.parameter),
+            valueset.joinedload(common.ValueSet.language),
+            valueset.subqueryload(common.ValueSet.references)
+            .joinedload(common.ValueSetReference.source),
+        ]
+
+    def row(self, ctx, req, item):
+        res = super(Values, self).row(ctx, req, item)
+        for obj in [item.valueset.parameter, item.valueset.language]:
+            res.append(hyperlink(req.resource_url(obj), obj.__unicode__()))
+        res.extend([or_empty(item.frequency), or_empty(item.confidence)])
+        res.append(';'.join(filter(
+            None, [r.source.name for r in item.valueset.references if r.source])))
+        return res
+
+
+class Sentences(XlsxAdapter):
+
+    """Represent table of Sentence instances as xlsx spreadsheet."""
+
+    def header(self, ctx, req):
+        return ['ID', 'Text', 'Analyzed', 'Gloss', 'Translation', 'Language']
+
+    def query_options(self):
+        return [joinedload(common.Sentence.language)]
+
+    def row(self, ctx, req, item):
+        return [
+            hyperlink(req.resource_url(item), item.id),
+            item.name,
+            item.analyzed,
+            item.gloss,
+            item.description,
+            hyperlink(req.resource_url(item.language), item.language.name),
+        ]
@@ -18,6 +18,7 @@ from pyramid import events
 from pyramid.request import Request, reify
 from pyramid.interfaces import IRoutesMapper
 from pyramid.asset import abspath_from_asset_spec
+from pyramid.traversal import quote_path_segment, PATH_SAFE
 from pyramid.renderers import JSON, JSONP
 from pyramid.settings import asbool
 from purl import URL
@@ -29,9 +30,9 @@ assert clld
 from clld.config import get_config
 from clld.db.meta import DBSession, Base
 from clld.db.models import common
-from clld import Resource, RESOURCES
+from clld import Resource, RESOURCES, resource_for
 from clld import interfaces
-from clld.web.adapters import get_adapters
+from clld.web.adapters import get_adapters, clear_adapter_cache
 from clld.web.adapters import geojson, register_resource_adapters
 from clld.web.adapters.base import adapter_factory
 from clld.web.adapters.cldf import CldfDownload
@@ -40,16 +41,26 @@ from clld.web.views import (
     select_combination,
 )
 from clld.web.views.olac import olac, OlacConfig
+from clld.web.views.tiles import tile_view
 from clld.web.views.sitemap import robots, sitemapindex, sitemap, resourcemap
 from clld.web.subscribers import add_renderer_globals, add_localizer, init_map
 from clld.web.datatables.base import DataTable
 from clld.web import datatables
 from clld.web.maps import Map, ParameterMap, LanguageMap, CombinationMap
 from clld.web.icon import ICONS, ORDERED_ICONS, MapMarker
+from clld.web.cache import get_cache
 from clld.web import assets
 assert assets
 
 
+#: Variables of resource routes which can be filled into compiled URL templates, mapped
+#: to the placeholders used when compiling the template.
+URL_TEMPLATE_VARIABLES = {'id': 'CLLDPLACEHOLDERID', 'ext': 'CLLDPLACEHOLDEREXT'}
+
+#: Pattern appended to resource and index routes to address vector tiles.
+TILE_PATTERN = r'/tiles/{z:\d+}/{x:\d+}/{y:\d+}.mvt'
+
+
 class ClldRequest(Request):
 
     """Custom Request class."""
@@ -98,6 +109,17 @@ class ClldRequest(Request):
         """
         return self.db.query(common.Dataset).options(undefer('updated')).first()
 
+    @reify
+    def data_version(self):
+        """A token identifying the version of the data served by the app.
+
+        The token is derived from the ``updated`` timestamp of the Dataset object, so
+        updating this object (e.g. when loading new data) invalidates everything cached
+        for an older data version.
+        """
+        if self.dataset and self.dataset.updated:
+            return self.dataset.updated.isoformat()
+
     def get_datatable(self, name, model, **kw):
         """Convenient lookup and retrieval of initialized DataTable object.
 
@@ -136,10 +158,7 @@ class ClldRequest(Request):
             pair (route_name, kw) suitable as arguments for the Request.route_url method.
         """
         if rsc is None:
-            for _rsc in RESOURCES:
-                if _rsc.interface.providedBy(obj):
-                    rsc = _rsc
-                    break
+            rsc = resource_for(obj)
             assert rsc
 
         route = rsc.name
@@ -185,8 +204,38 @@ class ClldRequest(Request):
         :return: URL
         """
         route, kw = self._route(obj, rsc, **kw)
+        if not self.admin and set(kw.keys()).issubset(URL_TEMPLATE_VARIABLES):
+            template = self.url_template(route)
+            if template:
+                return self.application_url + template % {
+                    k: quote_path_segment(
+                        v if isinstance(v, string_types) else str(v), safe=PATH_SAFE)
+                    for k, v in kw.items()}
         return self.route_url(route, **kw)
 
+    def url_template(self, route_name):
+        """Get a template for the path of URLs generated for a route.
+
+        To speed up bulk generation of resource URLs, routes are compiled once per
+        registry into templates suitable for %-formatting with a mapping of quoted values
+        for the names in ``URL_TEMPLATE_VARIABLES``.
+
+        :return: template string or ``None`` if the route cannot be compiled.
+        """
+        templates = getattr(self.registry, '_clld_url_templates', None)
+        if templates is None:
+            templates = {}
+            setattr(self.registry, '_clld_url_templates', templates)
+        if route_name not in templates:
+            template = None
+            route = self.registry.getUtility(IRoutesMapper).get_route(route_name)
+            if route and not route.pregenerator:
+                template = route.generate(URL_TEMPLATE_VARIABLES).replace('%', '%%')
+                for name, placeholder in URL_TEMPLATE_VARIABLES.items():
+                    template = template.replace(placeholder, '%%(%s)s' % name)
+            templates[route_name] = template
+        return templates[route_name]
+
     def route_url(self, route, *args, **kw):
         if self.admin:
             if '_query' not in kw:
@@ -271,12 +320,14 @@ class CtxFactoryQuery(object):
         return query.one()
 
 
-def ctx_factory(model, type_, req):
+def ctx_factory(model, type_, req, name=None):
     """Factory function for request contexts.
 
     The context of a request is either a single model instance or an instance of
     DataTable incorporating all information to retrieve an appropriately filtered list
     of model instances.
+
+    :param name: Name of the DataTable of an index; defaults to the matched route name.
     """
     def replacement(id_):
         raise HTTPMovedPermanently(
@@ -284,7 +335,7 @@ def ctx_factory(model, type_, req):
 
     if type_ == 'index':
         datatable = req.registry.getUtility(
-            interfaces.IDataTable, name=req.matched_route.name)
+            interfaces.IDataTable, name=name or req.matched_route.name)
         return datatable(req, model)
 
     try:
@@ -330,6 +381,7 @@ def register_adapter(config, cls, from_, to_=None, name=None):
     to_ = to_ or list(implementedBy(cls))[0]
     name = name or cls.mimetype
     config.registry.registerAdapter(cls, (from_,), to_, name=name)
+    clear_adapter_cache(config.registry)
 
 
 def register_adapters(config, specs):
@@ -392,6 +444,18 @@ def register_resource_routes_and_views(config, rsc):
             index_view,
             factory=partial(ctx_factory, rsc.model, 'index'))
 
+    # vector tiles of the features of GeoJSON representations:
+    if rsc.model != common.Dataset:
+        config.add_route(
+            rsc.name + '_tiles', pattern + TILE_PATTERN, factory=kw['factory'])
+        config.add_view(tile_view, route_name=rsc.name + '_tiles')
+        if rsc.with_index:
+            config.add_route(
+                rsc.plural + '_tiles',
+                '/%s%s' % (rsc.plural, TILE_PATTERN),
+                factory=partial(ctx_factory, rsc.model, 'index', name=rsc.plural))
+            config.add_view(tile_view, route_name=rsc.plural + '_tiles')
+
 
 def register_resource(config, name, model, interface, with_index=False, **kw):
     """Directive to register custom resources.
@@ -508,6 +572,8 @@ def includeme(config):
 
     # event subscribers:
     config.add_subscriber(add_localizer, events.NewRequest)
+    config.add_subscriber(
+        lambda event: clear_adapter_cache(event.app.registry), events.ApplicationCreated)
     config.add_subscriber(init_map, events.ContextFound)
     config.add_subscriber(
         partial(add_renderer_globals, maybe_import('%s.util' % root_package)),
@@ -562,6 +628,10 @@ def includeme(config):
     if not config.registry.settings.get('mako.directories'):
         config.add_settings({'mako.directories': ['clld:web/templates']})
 
+    response_cache = get_cache(config.registry.settings)
+    if response_cache:
+        config.registry.registerUtility(response_cache, interfaces.IResponseCache)
+
     for rsc in RESOURCES:
         config.register_resource_routes_and_views(rsc)
         config.register_datatable(
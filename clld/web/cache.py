@@ -0,0 +1,328 @@
+"""
+A cache for the rendered representations of resources and indexes.
+
+Since the data served by a clld app typically only changes on deploys, the responses
+rendered by the adapters can be cached and served without hitting the database (except
+for looking up the context object) or rendering templates again.
+
+The cache is configured with the setting ``clld.response_cache``, naming one of the
+backends
+
+- ``memory``: an LRU cache in the memory of each process,
+- ``file``: files in the directory specified by the - required - setting
+  ``clld.response_cache_dir``, shared by all processes; the directory is created with
+  permissions restricted to the user running the app,
+- ``memcached``: a memcached server - or any server speaking the memcached protocol -
+  at the address specified by the setting ``clld.response_cache_servers``, defaulting to
+  ``127.0.0.1:11211``; requires `pymemcache <https://pymemcache.readthedocs.io>`_.
+
+The maximal size of the cached responses in bytes can be specified with the setting
+``clld.response_cache_size``; least recently used responses are evicted first.
+
+Responses are keyed by host URL, path, adapter, query parameters and the data version
+of the app - i.e. the ``updated`` timestamp of the Dataset object. The host URL - i.e.
+scheme, host and port - is part of the key, because representations contain absolute
+URLs. So updating the
+dataset invalidates all cached responses. Alternatively, the cache can be cleared running
+``clld-clear-cache``.
+
+Responses are stored as a line of JSON - holding status and headers - followed by the
+body, so reading a cached response never executes code.
+"""
+from __future__ import unicode_literals, division, absolute_import, print_function
+import os
+import json
+import threading
+from collections import OrderedDict
+from hashlib import md5
+from tempfile import NamedTemporaryFile
+
+from six.moves.urllib.parse import urlencode
+from zope.interface import implementer
+from pyramid.response import Response
+from clldutils.path import Path
+try:
+    from pymemcache.client.base import Client
+except ImportError:  # pragma: no cover
+    Client = None
+
+from clld.interfaces import IResponseCache
+
+#: Default maximal size of the cache in bytes.
+MAX_SIZE = 64 * 1024 * 1024
+
+#: Responses larger than this fraction of the cache size are not cached.
+MAX_ITEM_FRACTION = 1 / 8
+
+#: Query parameters which do not change the rendered representation.
+IGNORED_PARAMS = ['_']
+
+#: Response headers which are added by the views, thus need not be cached.
+IGNORED_HEADERS = ['link', 'set-cookie']
+
+
+def cache_key(adapter, req):
+    """Compute the key of the response rendered by an adapter.
+
+    :return: Hex digest or ``None``, if the response cannot be cached, because the data\
+    version is unknown.
+    """
+    if not req.data_version or not req.matched_route:
+        return
+    params = sorted(
+        (k, v) for k, v in req.GET.items() if k not in IGNORED_PARAMS)
+    return md5('|'.join([
+        req.host_url,
+        req.path,
+        adapter.send_mimetype or adapter.mimetype,
+        adapter.template or '',
+        urlencode(params),
+        req.data_version]).encode('utf8')).hexdigest()
+
+
+def dump_response(status, headerlist, body):
+    """Serialize a response as line of JSON for status and headers, followed by the body.
+
+    :return: ``bytes``
+    """
+    return json.dumps([status, headerlist]).encode('utf8') + b'\n' + body
+
+
+def load_response(value):
+    """Deserialize a response serialized with :py:func:`dump_response`.
+
+    :return: triple (status, headerlist, body)
+    """
+    head, _, body = value.partition(b'\n')
+    status, headerlist = json.loads(head.decode('utf8'))
+    return str(status), [(str(k), str(v)) for k, v in headerlist], body
+
+
+@implementer(IResponseCache)
+class ResponseCache(object):
+
+    """Virtual base class for cache backends.
+
+    Backends implement ``get``, ``set`` and ``clear`` as specified by
+    :py:class:`clld.interfaces.IResponseCache`.
+    """
+
+    #: Whether the cache is shared by all processes serving the app - and thus can be
+    #: cleared from another process, e.g. by ``clld-clear-cache``.
+    shared = True
+
+    def __init__(self, maxsize=MAX_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def response(self, adapter, ctx, req):
+        """Serve the response rendered by an adapter from the cache.
+
+        Conditional requests are answered before the cache is consulted, see
+        :py:meth:`clld.web.adapters.base.Renderable.conditional_response`.
+        """
+        etag, last_modified = adapter.validators(ctx, req)
+        res = adapter.not_modified(req, etag, last_modified)
+        if res:
+            return res
+
+        key = cache_key(adapter, req)
+        value = self.get(key) if key else None
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            status, headerlist, body = load_response(value)
+            return Response(body=body, status=status, headerlist=headerlist)
+
+        with self._lock:
+            self.misses += 1
+        res = adapter.render_to_response(ctx, req)
+        adapter.set_validators(res, etag, last_modified)
+        # Streamed responses - i.e. responses without content length - are not cached,
+        # because this would mean reading the full response into memory.
+        if key and res.status_int == 200 and res.content_length is not None \
+                and res.content_length <= self.maxsize * MAX_ITEM_FRACTION:
+            self.set(key, dump_response(
+                res.status,
+                [(k, v) for k, v in res.headerlist if k.lower() not in IGNORED_HEADERS],
+                res.body))
+        return res
+
+
+class MemoryCache(ResponseCache):
+
+    """LRU cache in process memory."""
+
+    shared = False
+
+    def __init__(self, maxsize=MAX_SIZE):
+        ResponseCache.__init__(self, maxsize=maxsize)
+        self.size = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.pop(key, None)
+            if value is not None:
+                # re-insert, to mark the item as most recently used:
+                self._items[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.maxsize:
+                _, value = self._items.popitem(last=False)
+                self.size -= len(value)
+
+    def clear(self):
+        with self._lock:
+            self._items = OrderedDict()
+            self.size = 0
+
+
+class FileCache(ResponseCache):
+
+    """Cache storing responses in files.
+
+    Files are touched when read, thus the modification time is the time of last use.
+    The cache directory - and its subdirectories - are only accessible for the user
+    running the app.
+    """
+
+    def __init__(self, directory, maxsize=MAX_SIZE):
+        ResponseCache.__init__(self, maxsize=maxsize)
+        self.directory = Path(directory)
+        if not self.directory.exists():
+            os.makedirs(self.directory.as_posix(), 0o700)
+        self.size = None
+
+    def _path(self, key):
+        return self.directory.joinpath(key[:2], key)
+
+    def _files(self):
+        if self.directory.exists():
+            for d in self.directory.iterdir():
+                if d.is_dir():
+                    for p in d.iterdir():
+                        yield p
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path.as_posix(), 'rb') as fp:
+                value = fp.read()
+            os.utime(path.as_posix(), None)
+            return value
+        except (IOError, OSError):
+            return None
+
+    def set(self, key, value):
+        path = self._path(key)
+        if not path.parent.exists():
+            try:
+                os.mkdir(path.parent.as_posix(), 0o700)
+            except OSError:  # pragma: no cover
+                # created by a concurrent request.
+                pass
+        # write to a temporary file first, so that concurrent requests never read
+        # incomplete responses:
+        with NamedTemporaryFile(dir=path.parent.as_posix(), delete=False) as fp:
+            fp.write(value)
+        os.rename(fp.name, path.as_posix())
+
+        if self.size is None:
+            self.size = sum(p.stat().st_size for p in self._files())
+        else:
+            self.size += len(value)
+        if self.size > self.maxsize:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used files until the cache is shrunk to 3/4 its size."""
+        files = sorted(
+            ((p.stat().st_mtime, p.stat().st_size, p) for p in self._files()),
+            key=lambda i: i[0])
+        self.size = sum(f[1] for f in files)
+        for _, size, path in files:
+            if self.size <= self.maxsize * 3 / 4:
+                break
+            try:
+                path.unlink()
+            except OSError:  # pragma: no cover
+                # removed by a concurrent process.
+                pass
+            self.size -= size
+
+    def clear(self):
+        for p in list(self._files()):
+            p.unlink()
+        self.size = 0
+
+
+class MemcachedCache(ResponseCache):
+
+    """Cache backed by memcached.
+
+    Eviction is left to the memcached server; to be able to clear only our items, keys
+    are prefixed with a generation number stored on the server.
+    """
+
+    prefix = 'clld-response-cache'
+
+    def __init__(self, servers, maxsize=MAX_SIZE, client=None):
+        ResponseCache.__init__(self, maxsize=maxsize)
+        if client is None:  # pragma: no cover
+            if Client is None:
+                raise ValueError('the memcached backend requires pymemcache')
+            host, _, port = servers.partition(':')
+            client = Client((host, int(port or 11211)))
+        self.client = client
+
+    def _key(self, key):
+        generation = self.client.get(self.prefix)
+        if generation is None:
+            self.client.add(self.prefix, b'0')
+            generation = self.client.get(self.prefix) or b'0'
+        return '%s-%s-%s' % (self.prefix, generation.decode('ascii'), key)
+
+    def get(self, key):
+        return self.client.get(self._key(key))
+
+    def set(self, key, value):
+        self.client.set(self._key(key), value)
+
+    def clear(self):
+        if self.client.incr(self.prefix, 1) is None:
+            self.client.set(self.prefix, b'1')
+
+
+def get_cache(settings):
+    """Create the response cache specified in app settings.
+
+    :return: :py:class:`ResponseCache` instance or ``None``.
+    """
+    backend = settings.get('clld.response_cache')
+    if not backend:
+        return
+    maxsize = int(settings.get('clld.response_cache_size', MAX_SIZE))
+    if backend == 'memory':
+        return MemoryCache(maxsize)
+    if backend == 'file':
+        if not settings.get('clld.response_cache_dir'):
+            raise ValueError('the file backend requires clld.response_cache_dir')
+        return FileCache(settings['clld.response_cache_dir'], maxsize)
+    if backend == 'memcached':  # pragma: no cover
+        return MemcachedCache(
+            settings.get('clld.response_cache_servers', '127.0.0.1:11211'), maxsize)
+    raise ValueError('unknown response cache backend: %s' % backend)
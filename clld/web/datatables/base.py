@@ -6,14 +6,20 @@ nature: On the client they provide the information to instantiate a jquery DataT
 object. Server side they know how to provide the data to the client-side table.
 """
 import re
+import sqlite3
+import threading
+from collections import OrderedDict
 
-from sqlalchemy.orm import undefer
+from sqlalchemy import and_, or_, false, func
+from sqlalchemy.orm import undefer, joinedload, subqueryload, class_mapper
+from sqlalchemy.sql.elements import UnaryExpression
 from sqlalchemy.types import String, Unicode, Float, Integer, Boolean
 from zope.interface import implementer, implementedBy
+from pyramid.settings import asbool
 from clldutils.misc import cached_property, nfilter
 
 from clld.db.meta import DBSession
-from clld.db.util import icontains, as_int
+from clld.db.util import icontains, as_int, estimated_count, page_query
 from clld.web.util.htmllib import HTML
 from clld.web.util.helpers import (
     link, button, icon, JS_CLLD, external_link, linked_references, JSDataTable,
@@ -64,6 +70,87 @@ def filter_number(col, qs, type_=None, qs_weight=1):
         return
 
 
+class CountCache(object):
+
+    """In-process cache for the row counts computed in DataTable.get_query.
+
+    Counts are stored for one version of the data, i.e. one value of
+    :py:attr:`clld.web.app.ClldRequest.data_version`, so updating the dataset record
+    invalidates all cached counts. Calling :py:meth:`bump` invalidates them explicitly.
+
+    The cache is shared by the threads serving requests, thus access is guarded by a
+    lock - which is not held while counts are computed, though.
+    """
+
+    def __init__(self, maxsize=5000):
+        self.maxsize = maxsize
+        self.version = None
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._counts)
+
+    def bump(self):
+        with self._lock:
+            self._counts = OrderedDict()
+
+    def get(self, key, version, func):
+        """Retrieve a count from the cache, computing it via `func` if necessary.
+
+        :param key: Hashable cache key.
+        :param version: Data version the count is computed for.
+        :param func: Callable returning the count.
+        """
+        with self._lock:
+            if version != self.version:
+                self._counts = OrderedDict()
+                self.version = version
+            if key in self._counts:
+                return self._counts[key]
+        value = func()
+        with self._lock:
+            if version == self.version and key not in self._counts:
+                if len(self._counts) >= self.maxsize:
+                    self._counts.popitem(last=False)
+                self._counts[key] = value
+        return value
+
+
+#: Row counts of all datatables of the app are cached in this object - if enabled via
+#: the setting ``clld.datatable_count_cache``.
+COUNT_CACHE = CountCache()
+
+#: Seek indexes of datatables with seek-based paging are cached per data version, too.
+SEEK_INDEX_CACHE = CountCache(maxsize=200)
+
+
+def _after(orders, values, nulls_large):
+    """Build a filter condition selecting the rows sorted after a given row.
+
+    :param orders: list of pairs (expression, descending) specifying the sort order.
+    :param values: the values of the sort expressions for the boundary row.
+    :param nulls_large: flag signaling whether the database sorts NULL after all values.
+    :return: sqlalchemy filter expression.
+    """
+    def eq(expr, value):
+        return expr.is_(None) if value is None else expr == value
+
+    def gt(expr, value, desc):
+        if value is None:
+            # NULL is either the smallest or the largest value:
+            return expr.isnot(None) if desc == nulls_large else false()
+        res = expr < value if desc else expr > value
+        if desc != nulls_large:
+            res = or_(res, expr.is_(None))
+        return res
+
+    return or_(*[
+        and_(*[eq(e, v) for (e, _), v in zip(orders[:i], values[:i])]
+             + [gt(orders[i][0], values[i], orders[i][1])])
+        for i in range(len(orders))])
+
+
 class Col(object):
 
     """DataTables are basically a list of column specifications.
@@ -78,6 +165,12 @@ class Col(object):
     # convenient way to provide defaults for some kw arguments of __init__:
     __kw__ = {}
 
+    #: Relationship paths traversed when formatting the column, specified as a sequence
+    #: of relationship attributes - e.g. ``(Value.valueset, ValueSet.language)`` - or a
+    #: list of such sequences. Related objects along these paths are eager loaded in
+    #: :py:meth:`clld.web.datatables.base.DataTable.get_query`.
+    load = ()
+
     def __init__(self, dt, name, get_object=None, model_col=None, format=None, **kw):
         self.dt = dt
         self.name = name
@@ -150,6 +243,16 @@ class Col(object):
     #
     # external API called by DataTable objects:
     #
+    def loader_paths(self):
+        """Called when collecting the eager loading options of a datatable's query.
+
+        :return: list of tuples of relationship attributes.
+        """
+        paths = self.load or []
+        if paths and not isinstance(paths[0], (list, tuple)):
+            paths = [paths]
+        return [tuple(path) for path in paths]
+
     def order(self):
         """Called when collecting the order by clauses of a datatable's search query."""
         return self.model_col
@@ -173,6 +276,61 @@ class Col(object):
             return self._format(item)
         return self.format_value(self.get_value(item))
 
+    def _overrides(self, name):
+        """Whether the method ``name`` of :py:class:`Col` is overridden for this column.
+
+        Note: We inspect the class dictionaries, because unbound methods retrieved from a
+        class are different objects on each access in Python 2.
+        """
+        if name in self.__dict__:
+            return True
+        for cls in self.__class__.__mro__:
+            if cls is Col:
+                return False
+            if name in vars(cls):
+                return True
+        return False  # pragma: no cover
+
+    def compile_format(self):
+        """Called when a datatable's columns are initialized.
+
+        :return: a callable, accepting an item as sole argument, which returns the same\
+        as :py:meth:`format`. For columns relying on the default implementations of\
+        ``format``, ``get_obj``, ``get_value`` and ``format_value``, the checks done in\
+        these methods are resolved once, thus the returned function is faster.
+        """
+        if self._overrides('format'):
+            return self.format
+        if getattr(self, '_format'):
+            return self._format
+        if any(self._overrides(name) for name in ['get_value', 'format_value']):
+            return self.format
+
+        get_obj = None
+        if self._overrides('get_obj'):
+            get_obj = self.get_obj
+        elif getattr(self, '_get_object'):
+            get_obj = self._get_object
+        attr = self.model_col.name if self.model_col else self.name
+
+        format_value = None
+        if isinstance(self.model_col_type, Boolean):
+            def format_value(value):
+                return '%s' % value
+        elif isinstance(self.model_col_type, Float):
+            template = '%.' + str(getattr(self, 'precision', 2)) + 'f'
+
+            def format_value(value):
+                return template % value if isinstance(value, float) else value
+
+        def format(item):
+            value = getattr(get_obj(item) if get_obj else item, attr, None)
+            if value is None:
+                value = ''
+            return format_value(value) if format_value else value
+
+        return format
+
 
 class ExternalLinkCol(Col):
 
@@ -340,6 +498,12 @@ class DataTable(Component):
     __template__ = 'clld:web/templates/datatable.mako'
     __constraints__ = []
 
+    #: Set to a positive integer N to enable seek-based paging. The sort keys of every
+    #: N-th row of the filtered and sorted table are then computed once per data version
+    #: using a window function, and pages are selected with a range condition on the
+    #: closest of these boundaries, thus large offsets are avoided.
+    __seek_index_step__ = None
+
     def __init__(self, req, model, eid=None, **kw):
         """Initialize.
 
@@ -354,7 +518,7 @@ class DataTable(Component):
         self.count_filtered = None
         self.filters = []
         self._toolbar = Toolbar(
-            req, self, model(), JSDataTable.current_url(self.eid, '%s'), IIndex)
+            req, self, self, JSDataTable.current_url(self.eid, '%s'), IIndex)
 
         for _model in self.__constraints__:
             attr = self.attr_from_constraint(_model)
@@ -384,7 +548,33 @@ class DataTable(Component):
 
     @cached_property()
     def cols(self):
-        return self.col_defs()
+        cols = self.col_defs()
+        for col in cols:
+            col.formatter = col.compile_format()
+        return cols
+
+    def format_rows(self, items):
+        """Format a page of items in one pass.
+
+        :param items: iterable of items as returned by :py:meth:`get_query`.
+        :return: list of rows, i.e. lists of formatted cell values or - if the datatable\
+        has a ``row_class`` method - dicts suitable as DataTables row data.
+        """
+        formatters = [col.formatter for col in self.cols]
+        if not hasattr(self, 'row_class'):
+            return [[f(item) for f in formatters] for item in items]
+
+        keys = [str(i) for i in range(len(formatters))]
+        rows = []
+        for item in items:
+            row = {'DT_RowId': 'row_%s' % item.pk}
+            row_class = self.row_class(item)
+            if row_class:
+                row['DT_RowClass'] = row_class
+            for key, f in zip(keys, formatters):
+                row[key] = f(item)
+            rows.append(row)
+        return rows
 
     def xhr_query(self):
         """Get additional URL parameters for XHR.
@@ -439,10 +629,153 @@ class DataTable(Component):
     def default_order(self):
         return self.db_model().pk
 
-    def get_query(self, limit=1000, offset=0, undefer_cols=()):
+    def count_key(self):
+        """Get the part of the count cache key which identifies the datatable.
+
+        :return: a hashable object, identifying the datatable class and the constraints\
+        passed to it.
+        """
+        return (
+            self.__class__, self.model, tuple(sorted((self.xhr_query() or {}).items())))
+
+    def count(self, query, filters=None):
+        """Count the rows matched by query, possibly using estimated or cached values.
+
+        By default, rows are counted for each request. With the setting
+        ``clld.datatable_count_cache`` counts are cached in
+        :py:data:`clld.web.datatables.base.COUNT_CACHE`. With the setting
+        ``clld.datatable_count_estimate`` set to a number N, the total count of an
+        unconstrained datatable with more than N rows is estimated from the query planner
+        statistics of the database (if supported), see :py:meth:`count_estimable`.
+
+        :param query: The query to count.
+        :param filters: Sequence of the ``sSearch_*`` parameters applied to query or\
+        ``None`` when counting the unfiltered query.
+        """
+        settings = self.req.registry.settings or {}
+        if filters is None and settings.get('clld.datatable_count_estimate') \
+                and self.count_estimable():
+            model = self.db_model()
+            estimate = estimated_count(model)
+            if estimate is not None \
+                    and estimate > int(settings['clld.datatable_count_estimate']):
+                # The estimate includes the inactive rows, which are counted using the
+                # index on (active, pk):
+                return max(  # pragma: no cover
+                    estimate - DBSession.query(model).filter(model.active == False).count(),
+                    0)
+        if asbool(settings.get('clld.datatable_count_cache')):
+            return COUNT_CACHE.get(
+                (self.count_key(), tuple(filters or ())),
+                self.req.data_version,
+                query.count)
+        return query.count()
+
+    def count_estimable(self):
+        """Whether the total count may be estimated from the statistics of the table.
+
+        This is only the case if the rows of the datatable are the active rows of the
+        table of the model, i.e. if the datatable is not constrained by request parameters
+        or by a custom :py:meth:`base_query`, and the model is not mapped with single
+        table inheritance.
+        """
+        if self.xhr_query() or class_mapper(self.db_model()).single:
+            return False
+        for cls in self.__class__.__mro__:
+            if cls is DataTable:
+                return True
+            if 'base_query' in vars(cls):
+                return False
+        return False  # pragma: no cover
+
+    def seek_index(self, query, orders):
+        """Compute the sort keys of every N-th row of the sorted query.
+
+        :return: list of tuples of values of the sort expressions.
+        """
+        step = self.__seek_index_step__
+        rownum = func.row_number().over(
+            order_by=[o.desc() if desc else o for o, desc in orders]).label('rownum')
+        subquery = query.order_by(None).with_entities(
+            rownum, *[o.label('k%s' % i) for i, (o, _) in enumerate(orders)]).subquery()
+        return [
+            tuple(row[1:]) for row in DBSession.query(subquery)
+            .filter(subquery.c.rownum % step == 0)
+            .order_by(subquery.c.rownum)]
+
+    def seek(self, query, orders, offset, key):
+        """Restrict query to the rows following the page boundary closest to offset.
+
+        :param query: The sorted query.
+        :param orders: list of pairs (expression, descending) specifying the sort order.
+        :param offset: The offset requested.
+        :param key: Hashable object identifying filters and sorting of the query.
+        :return: pair (query, offset), where offset is relative to the returned query.
+        """
+        dialect = DBSession.bind.dialect.name
+        if any(isinstance(o, UnaryExpression) for o, _ in orders) or (
+                dialect == 'sqlite' and sqlite3.sqlite_version_info < (3, 25)):
+            # We cannot determine the sort direction of the expressions, or the
+            # database does not support window functions.
+            return query, offset  # pragma: no cover
+
+        # Seeking requires a total order:
+        orders = orders + [(self.db_model().pk, False)]
+        query = query.order_by(self.db_model().pk)
+        index = SEEK_INDEX_CACHE.get(
+            (self.count_key(), key),
+            self.req.data_version,
+            lambda: self.seek_index(query, orders))
+        i = min(offset // self.__seek_index_step__, len(index))
+        if i == 0:
+            return query, offset  # pragma: no cover
+        return (
+            query.filter(_after(orders, index[i - 1], dialect == 'postgresql')),
+            offset - i * self.__seek_index_step__)
+
+    def loader_options(self):
+        """Compile the relationship paths declared by the columns into loader options.
+
+        Many-to-one relations are loaded with a join, collections with one additional
+        query each; thus the number of SQL statements needed to retrieve and format a
+        page of the table does not depend on the number of rows.
+
+        :return: list of sqlalchemy loader options.
+        """
+        # Note: We identify relationship attributes by name, because comparing
+        # attributes creates SQL expressions.
+        paths = {
+            tuple((attr.class_.__name__, attr.key) for attr in path): path
+            for col in self.cols for path in col.loader_paths() if path}
+        res = []
+        for key, path in sorted(paths.items()):
+            if any(other[:len(key)] == key for other in paths if other != key):
+                # path is covered by a longer one.
+                continue
+            option = None
+            for attr in path:
+                if attr.property.uselist:
+                    option = subqueryload(attr) if option is None \
+                        else option.subqueryload(attr)
+                else:
+                    option = joinedload(attr) if option is None \
+                        else option.joinedload(attr)
+            res.append(option)
+        return res
+
+    def sorted_query(self, count=True):
+        """Build the query for all rows matching the filters, in the requested order.
+
+        :param count: Flag signaling whether to compute ``count_all`` and \
+        ``count_filtered``.
+        :return: triple (query, orders, key), where orders is the list of pairs \
+        (expression, descending) specifying the sort order and key is a hashable object \
+        identifying filters and sorting.
+        """
         query = self.base_query(
             DBSession.query(self.db_model()).filter(self.db_model().active == True))
-        self.count_all = query.count()
+        if count:
+            self.count_all = self.count(query)
 
         _filters = []
         for name, val in self.req.params.items():
@@ -460,19 +793,27 @@ class DataTable(Component):
                         if clause is not None:
                             query = query.filter(clause)
                             _filters.append((colindex, col.js_args['sTitle'], val))
-        for colindex, coltitle, qs in sorted(set(_filters)):
-            self.filters.append((coltitle, qs))
+        self.filters = [(coltitle, qs) for _, coltitle, qs in sorted(set(_filters))]
 
-        self.count_filtered = query.count()
+        filters = tuple(sorted(set((i, qs) for i, _, qs in _filters)))
+        if count:
+            if filters:
+                self.count_filtered = self.count(query, filters=filters)
+            else:
+                self.count_filtered = self.count_all
 
         try:
             iSortingCols = int(self.req.params.get('iSortingCols', 0))
         except ValueError:
             iSortingCols = 0
 
+        # We keep track of the sort order as list of (expression, descending) pairs, to be
+        # able to use it for seek-based paging.
+        sort, seek_orders = [], []
         for index in range(iSortingCols):
             try:
-                col = self.cols[int(self.req.params.get('iSortCol_%s' % index))]
+                colindex = int(self.req.params.get('iSortCol_%s' % index))
+                col = self.cols[colindex]
             except (TypeError, ValueError, IndexError):  # pragma: no cover
                 continue
             if col.js_args.get('bSortable', True):
@@ -480,8 +821,11 @@ class DataTable(Component):
                 if orders is not None:
                     if not isinstance(orders, (tuple, list)):
                         orders = [orders]
+                    desc = self.req.params.get('sSortDir_%s' % index) == 'desc'
+                    sort.append((colindex, desc))
                     for order in orders:
-                        if self.req.params.get('sSortDir_%s' % index) == 'desc':
+                        seek_orders.append((order, desc))
+                        if desc:
                             order = order.desc()
                         query = query.order_by(order)
 
@@ -489,19 +833,68 @@ class DataTable(Component):
         if not isinstance(clauses, (list, tuple)):
             clauses = (clauses,)
         query = query.order_by(*clauses)
+        seek_orders.extend((clause, False) for clause in clauses)
+
+        return query, seek_orders, (filters, tuple(sort))
 
+    def get_query(self, limit=1000, offset=0, undefer_cols=()):
+        query, seek_orders, key = self.sorted_query()
         if 'iDisplayLength' in self.req.params:
             # make sure no more than 1000 items can be selected
             limit = min([int(self.req.params['iDisplayLength']), 1000])
-        query = query\
-            .limit(limit if limit != -1 else 1000)\
-            .offset(int(self.req.params.get('iDisplayStart', offset)))
+        offset = int(self.req.params.get('iDisplayStart', offset))
+        if self.__seek_index_step__ and offset >= self.__seek_index_step__:
+            query, offset = self.seek(query, seek_orders, offset, key)
+        query = query.limit(limit if limit != -1 else 1000).offset(offset)
+        return self._with_options(query, undefer_cols)
+
+    def _with_options(self, query, undefer_cols):
+        options = self.loader_options()
+        if options:
+            query = query.options(*options)
 
         if undefer_cols:
             query = query.options(*(undefer(c) for c in undefer_cols))
 
         return query
 
+    def iter_query(self, batch_size=1000, undefer_cols=(), options=(), session=None):
+        """Iterate over all rows matching the filters, in the requested order.
+
+        Rows are retrieved in batches of ``batch_size`` rows, each batch selecting the
+        rows sorted after the last row of the previous batch.
+
+        :param options: Additional sqlalchemy query options, e.g. to load relations \
+        needed by the consumer of the rows.
+        :param session: Session to run the queries with, defaulting to ``DBSession``.
+        :return: generator of model instances.
+        """
+        query, orders, _ = self.sorted_query(count=False)
+        if session is not None:
+            query = query.with_session(session)
+        if any(isinstance(o, UnaryExpression) for o, _ in orders):
+            # We cannot determine the sort direction of the expressions.
+            for item in page_query(  # pragma: no cover
+                    self._with_options(query, undefer_cols).options(*options),
+                    n=batch_size):
+                yield item
+            return  # pragma: no cover
+
+        orders = orders + [(self.db_model().pk, False)]
+        query = query.order_by(self.db_model().pk)\
+            .add_columns(*[expr for expr, _ in orders])
+        nulls_large = DBSession.bind.dialect.name == 'postgresql'
+        last = None
+        while True:
+            q = query if last is None else query.filter(_after(orders, last, nulls_large))
+            rows = self._with_options(q.limit(batch_size), undefer_cols)\
+                .options(*options).all()
+            for row in rows:
+                yield row[0]
+            if len(rows) < batch_size:
+                break
+            last = rows[-1][1:]
+
     def render(self):
         return Component.render(self) + self._toolbar.js()
 
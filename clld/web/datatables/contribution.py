@@ -1,4 +1,5 @@
 """Default DataTable for Contribution objects."""
+from clld.db.models.common import Contribution, ContributionContributor
 from clld.web.datatables.base import DataTable, Col, LinkCol
 from clld.web.util.helpers import linked_contributors, cite_button
 
@@ -9,6 +10,8 @@ class ContributorsCol(Col):
 
     __kw__ = {'bSearchable': False, 'bSortable': False}
 
+    load = (Contribution.contributor_assocs, ContributionContributor.contributor)
+
     def format(self, item):
         return linked_contributors(self.dt.req, item)
 
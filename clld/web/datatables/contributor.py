@@ -2,7 +2,7 @@
 from clld.web.datatables.base import DataTable, Col, LinkCol, ExternalLinkCol
 from clld.web.util.htmllib import HTML
 from clld.web.util.helpers import link, text2html
-from clld.db.models.common import Contributor
+from clld.db.models.common import Contributor, ContributionContributor
 
 
 class ContributionsCol(Col):
@@ -11,6 +11,8 @@ class ContributionsCol(Col):
 
     __kw__ = {'bSearchable': False, 'bSortable': False}
 
+    load = (Contributor.contribution_assocs, ContributionContributor.contribution)
+
     def format(self, item):
         return HTML.ul(
             *[HTML.li(link(
@@ -97,6 +97,7 @@ class Sentences(DataTable):
                 'language',
                 model_col=Language.name,
                 get_obj=lambda i: i.language,
+                load=(Sentence.language,),
                 bSortable=not self.language,
                 bSearchable=not self.language),
             DetailsRowLinkCol(self, 'd'),
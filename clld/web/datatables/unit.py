@@ -31,5 +31,9 @@ class Units(DataTable):
             LinkCol(self, 'name'),
             DescriptionLinkCol(self, 'description'),
             LinkCol(
-                self, 'language', model_col=Language.name, get_obj=lambda i: i.language),
+                self,
+                'language',
+                model_col=Language.name,
+                get_obj=lambda i: i.language,
+                load=(Unit.language,)),
         ]
@@ -50,7 +50,12 @@ class Unitvalues(DataTable):
             name_col.choices = sorted([de.name for de in self.unitparameter.domain])
         return [
             name_col,
-            LinkCol(self, 'unit', get_obj=lambda i: i.unit, model_col=common.Unit.name),
+            LinkCol(
+                self,
+                'unit',
+                get_obj=lambda i: i.unit,
+                model_col=common.Unit.name,
+                load=(common.UnitValue.unit,)),
         ]
 
     def toolbar(self):
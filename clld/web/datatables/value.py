@@ -17,6 +17,8 @@ class ValueNameCol(LinkCol):
 
     """Render the label for a Value."""
 
+    load = [(Value.valueset,), (Value.domainelement,)]
+
     def get_obj(self, item):
         return item.valueset
 
@@ -42,6 +44,8 @@ class ValueSetCol(LinkCol):
 
     """Render a link to the corresponding ValueSet."""
 
+    load = (Value.valueset,)
+
     def get_obj(self, item):
         return item.valueset
 
@@ -53,6 +57,8 @@ class RefsCol(BaseRefsCol):
 
     """Listing sources for the corresponding ValueSet."""
 
+    load = (Value.valueset, ValueSet.references, ValueSetReference.source)
+
     def get_obj(self, item):
         return item.valueset
 
@@ -99,10 +105,14 @@ class Values(DataTable):
                 LinkCol(self,
                         'language',
                         model_col=Language.name,
-                        get_object=lambda i: i.valueset.language),
+                        get_object=lambda i: i.valueset.language,
+                        load=(Value.valueset, ValueSet.language)),
                 name_col,
                 RefsCol(self, 'source'),
-                LinkToMapCol(self, 'm', get_object=lambda i: i.valueset.language),
+                LinkToMapCol(self,
+                             'm',
+                             get_object=lambda i: i.valueset.language,
+                             load=(Value.valueset, ValueSet.language)),
             ]
 
         if self.language:
@@ -112,7 +122,8 @@ class Values(DataTable):
                         'parameter',
                         sTitle=self.req.translate('Parameter'),
                         model_col=Parameter.name,
-                        get_object=lambda i: i.valueset.parameter),
+                        get_object=lambda i: i.valueset.parameter,
+                        load=(Value.valueset, ValueSet.parameter)),
                 RefsCol(self, 'source'),
             ]
 
@@ -37,29 +37,29 @@ class Valuesets(DataTable):
         return query
 
     def col_defs(self):
-        refs_col = RefsCol(self, 'references')
+        refs_col = RefsCol(
+            self, 'references', load=(ValueSet.references, ValueSetReference.source))
         res = [DetailsRowLinkCol(self, 'd')]
         get = lambda what, i: getattr(i, {'p': 'parameter', 'l': 'language'}[what])
+        language_kw = dict(get_obj=partial(get, 'l'), load=(ValueSet.language,))
+        parameter_kw = dict(get_obj=partial(get, 'p'), load=(ValueSet.parameter,))
 
         if self.parameter:
             return res + [
-                LinkCol(self, 'language',
-                        model_col=Language.name, get_obj=partial(get, 'l')),
+                LinkCol(self, 'language', model_col=Language.name, **language_kw),
                 refs_col,
-                LinkToMapCol(self, 'm', get_obj=partial(get, 'l')),
+                LinkToMapCol(self, 'm', **language_kw),
             ]
 
         if self.language:
             return res + [
-                LinkCol(self, 'parameter',
-                        model_col=Parameter.name, get_obj=partial(get, 'p')),
+                LinkCol(self, 'parameter', model_col=Parameter.name, **parameter_kw),
                 refs_col,
             ]
 
         return res + [
-            LinkCol(self, 'language', model_col=Language.name, get_obj=partial(get, 'l')),
-            LinkCol(
-                self, 'parameter', model_col=Parameter.name, get_obj=partial(get, 'p')),
+            LinkCol(self, 'language', model_col=Language.name, **language_kw),
+            LinkCol(self, 'parameter', model_col=Parameter.name, **parameter_kw),
             refs_col,
         ]
 
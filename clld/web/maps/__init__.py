@@ -269,7 +269,16 @@ class Map(Component):
 
 class ParameterMap(Map):
 
-    """Map displaying markers for valuesets associated with a parameter instance."""
+    """Map displaying markers for valuesets associated with a parameter instance.
+
+    There is one layer per domain element of the parameter.
+    """
+
+    #: Set to ``True`` to load the features of all layers with one GeoJSON request,
+    #: rather than one request per layer. This requires a GeoJSON adapter for parameters
+    #: supporting the ``layers`` request parameter, like
+    #: :py:class:`clld.web.adapters.geojson.GeoJsonParameter`.
+    single_request = False
 
     def get_layers(self):
         if self.ctx.domain:
@@ -289,7 +298,11 @@ class ParameterMap(Map):
                 self.req.resource_url(self.ctx, ext='geojson'))
 
     def get_default_options(self):
-        return {'info_query': {'parameter': self.ctx.pk}, 'hash': True}
+        res = {'info_query': {'parameter': self.ctx.pk}, 'hash': True}
+        if self.single_request and self.ctx.domain:
+            res['layers_url'] = self.req.resource_url(
+                self.ctx, ext='geojson', _query=dict(self.req.query_params, layers='1'))
+        return res
 
 
 class GeoJsonMultiple(GeoJson):
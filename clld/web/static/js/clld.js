@@ -369,6 +369,23 @@ CLLD.MapIcons = {
     }
 };
 
+/**
+ * Icon for a cluster of features, i.e. a feature with a "cluster" property giving the
+ * number of features it represents.
+ */
+CLLD.MapClusterIcon = function(feature, size) {
+    var html = '';
+    size = size + 10;
+    if (feature.properties.icon) {
+        html = '<img src="' + feature.properties.icon + '" width="' + size + '" height="' + size + '"/>';
+    }
+    return L.divIcon({
+        html: html + '<span style="line-height: ' + size + 'px;">' + feature.properties.cluster + '</span>',
+        className: 'clld-cluster',
+        iconSize: [size, size]
+    });
+};
+
 
 /**
  * Manager for a leaflet map
@@ -493,6 +510,15 @@ CLLD.Map = function(eid, layers, options) {
         } else if (map.options.icon_size) {
             size = map.options.icon_size;
         }
+        if (feature.properties.cluster) {
+            // clusters are expanded by zooming in:
+            layer.setIcon(CLLD.MapClusterIcon(feature, size));
+            layer.bindTooltip(feature.properties.label);
+            layer.on('click', function() {
+                map.map.setView(layer.getLatLng(), map.map.getZoom() + 2);
+            });
+            return;
+        }
         layer.setIcon(map.icon(feature, size));
         if (feature.properties.zindex) {
             layer.setZIndexOffset(feature.properties.zindex);
@@ -564,6 +590,110 @@ CLLD.Map = function(eid, layers, options) {
         }
     };
 
+    /**
+     * Replace the features of a layer.
+     *
+     * @param name Name of the layer.
+     * @param features Array of GeoJSON features.
+     * @private
+     */
+    var _setFeatures = function(name, features) {
+        var map = CLLD.Maps[eid], layer = map.layer_map[name];
+        layer.eachLayer(function(marker) {
+            var language = marker.feature.properties.language;
+            map.oms.removeMarker(marker);
+            if (language && map.marker_map[language.id] === marker) {
+                delete map.marker_map[language.id];
+            }
+        });
+        layer.clearLayers();
+        layer.addData({type: 'FeatureCollection', features: features});
+    };
+
+    /**
+     * Request parameters selecting the features to load. With the "cluster" option,
+     * only features visible in the current view are requested, clustered according to
+     * the zoom level.
+     *
+     * @private
+     */
+    var _viewParams = function() {
+        var map = CLLD.Maps[eid];
+        if (!map.options.cluster) {
+            return {};
+        }
+        if (!map.map._loaded) {
+            return {zoom: map.options.zoom == undefined ? 2 : map.options.zoom};
+        }
+        return {
+            zoom: map.map.getZoom(),
+            bbox: map.map.getBounds().pad(0.5).toBBoxString()
+        };
+    };
+
+    /**
+     * Load the features of all layers with data specified as URL.
+     *
+     * @param initial Flag signaling whether this is the initial load of the map.
+     * @private
+     */
+    var _loadLayers = function(initial) {
+        var name, map = CLLD.Maps[eid], params = _viewParams(), request;
+
+        map.requests = map.requests == undefined ? 1 : map.requests + 1;
+        request = map.requests;
+
+        function _loaded() {
+            if (initial) {
+                _zoomToExtent();
+            }
+            if (map.options.show_labels) {
+                map.eachMarker(function(marker){marker.openTooltip()})
+            }
+        }
+
+        if (map.options.layers_url) {
+            // the features of all layers are loaded with one request.
+            $.getJSON(map.options.layers_url, params, function(data) {
+                var i, layer, features = {};
+
+                if (request != map.requests) {
+                    return;
+                }
+                for (layer in map.layer_map) {
+                    if (map.layer_map.hasOwnProperty(layer)) {
+                        features[layer] = [];
+                    }
+                }
+                for (i = 0; i < data.features.length; i++) {
+                    layer = data.features[i].properties.layer;
+                    if (features.hasOwnProperty(layer)) {
+                        features[layer].push(data.features[i]);
+                    }
+                }
+                for (layer in features) {
+                    if (features.hasOwnProperty(layer)) {
+                        _setFeatures(layer, features[layer]);
+                    }
+                }
+                _loaded();
+            });
+            return;
+        }
+
+        for (name in layers) {
+            if (layers.hasOwnProperty(name) && $.type(layers[name]) === 'string') {
+                $.getJSON(layers[name], $.extend({layer: name}, params), function(data) {
+                    if (request != map.requests) {
+                        return;
+                    }
+                    _setFeatures(data.properties.layer, data.features);
+                    _loaded();
+                });
+            }
+        }
+    };
+
     for (name in layers) {
         if (layers.hasOwnProperty(name)) {
             opts = {onEachFeature: _onEachFeature};
@@ -573,22 +703,18 @@ CLLD.Map = function(eid, layers, options) {
             this.layer_map[name] = L.geoJson(undefined, opts).addTo(this.map);
             this.layer_geojson[name] = layers[name];
 
-            if ($.type(layers[name]) === 'string') {
-                $.getJSON(layers[name], {layer: name}, function(data) {
-                    var map = CLLD.Maps[eid];
-                    map.layer_map[data.properties.layer].addData(data);
-                    _zoomToExtent();
-                    if (map.options.show_labels) {
-                        map.eachMarker(function(marker){marker.openTooltip()})
-                    }
-                });
-            } else {
+            if ($.type(layers[name]) !== 'string') {
                 local_data = true;
                 this.layer_map[name].addData(layers[name]);
             }
         }
     }
 
+    _loadLayers(true);
+    if (this.options.cluster) {
+        this.map.on('moveend', function() {_loadLayers(false)});
+    }
+
     if (local_data) {
         _zoomToExtent();
         if (this.options.show_labels) {
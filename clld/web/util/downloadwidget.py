@@ -4,6 +4,7 @@ from six import text_type
 from markupsafe import Markup
 
 from clld.interfaces import IDataTable
+from clld.web.adapters import get_adapters
 from clld.web.util.component import Component
 from clld.web.util.htmllib import HTML, literal
 
@@ -54,8 +55,7 @@ class DownloadWidget(Component):
                     % (self.dl_url_tmpl % adapter.extension))
 
     def render(self, no_js=False):
-        adapters = [a for n, a in
-                    self.req.registry.getAdapters([self.obj], self.interface)
+        adapters = [a for n, a in get_adapters(self.interface, self.obj, self.req)
                     if a.extension not in set(self.options['exclude'])]
         adoc = []
         for adapter in adapters:
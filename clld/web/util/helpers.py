@@ -33,7 +33,7 @@ from clldutils.misc import xmlchars
 
 import clld
 from clld import interfaces
-from clld import RESOURCES
+from clld import RESOURCES, resource_for
 from clld.web.util.htmllib import HTML, literal
 from clld.web.util.downloadwidget import DownloadWidget
 from clld.db.meta import DBSession
@@ -322,10 +322,13 @@ def link(req, obj, **kw):
 
     rsc = None
     rsc_name = kw.pop('rsc', None)
-    for _rsc in RESOURCES:
-        if _rsc.interface.providedBy(obj) or _rsc.name == rsc_name:
-            rsc = _rsc
-            break
+    if rsc_name:
+        for _rsc in RESOURCES:
+            if _rsc.interface.providedBy(obj) or _rsc.name == rsc_name:
+                rsc = _rsc
+                break
+    else:
+        rsc = resource_for(obj)
     assert rsc
     href = kw.pop('href', req.resource_url(obj, rsc=rsc, **kw.pop('url_kw', {})))
     kw['class'] = ' '.join(
@@ -14,7 +14,7 @@ from pyramid.interfaces import IRoutesMapper
 from pyramid.renderers import render, render_to_response
 
 from clld.util import summary
-from clld.interfaces import IRepresentation, IIndex, IMetadata
+from clld.interfaces import IRepresentation, IIndex, IMetadata, IResponseCache
 from clld.web.adapters import get_adapter, get_adapters
 from clld.web.adapters.csv import CsvAdapter, CsvmJsonAdapter
 from clld.web.util.multiselect import MultiSelect
@@ -66,7 +66,11 @@ def view(interface, ctx, req, getadapters=False):
         interface, ctx, req, ext=req.matchdict and req.matchdict.get('ext'), getall=True)
     if not adapter:
         raise pyramid.httpexceptions.HTTPNotAcceptable()
-    res = adapter.render_to_response(ctx, req)
+    cache = req.registry.queryUtility(IResponseCache)
+    if cache:
+        res = cache.response(adapter, ctx, req)
+    else:
+        res = adapter.conditional_response(ctx, req)
     if getadapters:
         return res, adapter, adapters
     return res  # pragma: no cover
@@ -123,19 +127,7 @@ def resource_view(ctx, req):
 
 def datatable_xhr_view(ctx, req):
     # call get_query, thereby - as side effect - making sure, the counts are set.
-    items = ctx.get_query()
-    if hasattr(ctx, 'row_class'):
-        data = []
-        for item in items:
-            _d = {'DT_RowId': 'row_%s' % item.pk}
-            row_class = ctx.row_class(item)
-            if row_class:
-                _d['DT_RowClass'] = row_class
-            for i, col in enumerate(ctx.cols):
-                _d[str(i)] = col.format(item)
-            data.append(_d)
-    else:
-        data = [[col.format(item) for col in ctx.cols] for item in items]
+    data = ctx.format_rows(ctx.get_query())
 
     # sEcho parameter.
     # Note that it strongly recommended for security reasons that you 'cast' this
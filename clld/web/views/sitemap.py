@@ -89,7 +89,7 @@ def sitemap(req):
                     .limit(LIMIT)
                 for id_, updated in query:
                     yield dict(
-                        loc=req.route_url(r.name, id=id_),
+                        loc=req.resource_url(id_, rsc=r),
                         lastmod=str(updated).split(' ')[0])
     return _response('urlset', _iter())
 
@@ -0,0 +1,150 @@
+"""
+View callable serving the features of GeoJSON adapters as Mapbox vector tiles.
+
+Tiles are requested at ``/{rsc}/{id}/tiles/{z}/{x}/{y}.mvt`` (for resources) or
+``/{rsc}/tiles/{z}/{x}/{y}.mvt`` (for indexes, e.g. the languages map), where ``z``,
+``x`` and ``y`` address a tile of the web mercator tiling scheme used by leaflet.
+Any other query parameters are passed on to the GeoJSON adapter, e.g. ``domainelement``
+or ``layers`` for parameters.
+
+Rendered tiles are cached on disk, in the directory specified by the setting
+``clld.tile_cache`` - or in a directory in the system's temp directory - and keyed by
+the ``updated`` timestamp of the resource and the data version of the app. The size of
+the cache in bytes is limited by the setting ``clld.tile_cache_size``; least recently
+used tiles are evicted first.
+"""
+from __future__ import unicode_literals, division, absolute_import, print_function
+from json import loads
+from hashlib import md5
+from tempfile import gettempdir
+
+from six.moves.urllib.parse import urlencode
+from pyramid.response import Response
+from pyramid.httpexceptions import HTTPNotFound
+from clldutils.path import Path
+
+from clld.interfaces import IIndex, IRepresentation, IDataTable
+from clld.lib import mvt
+from clld.web.adapters import get_adapter
+from clld.web.adapters.geojson import flatten
+from clld.web.cache import FileCache
+
+#: Tiles can be requested for zoom levels up to this level.
+MAX_ZOOM = 18
+
+#: Features within this fraction of the tile size beyond the tile borders are included,
+#: so that markers overlapping borders are rendered on both tiles.
+BUFFER = 1 / 16
+
+#: Browsers and proxies may cache tiles for this number of seconds.
+MAX_AGE = 3600
+
+#: Default maximal size of the tile cache in bytes.
+MAX_CACHE_SIZE = 256 * 1024 * 1024
+
+_CACHES = {}
+
+
+def tile_cache_dir(req):
+    """The directory in which tiles are cached."""
+    res = req.registry.settings.get('clld.tile_cache')
+    if res:
+        return Path(res)
+    return Path(gettempdir()).joinpath(
+        'clld-tiles', req.registry.settings.get('clld.pkg', 'clld'))
+
+
+def tile_cache(req):
+    """The cache for tiles, shared by the requests of a process.
+
+    :return: :py:class:`clld.web.cache.FileCache` instance.
+    """
+    key = (
+        tile_cache_dir(req).as_posix(),
+        int(req.registry.settings.get('clld.tile_cache_size', MAX_CACHE_SIZE)))
+    if key not in _CACHES:
+        _CACHES[key] = FileCache(*key)
+    return _CACHES[key]
+
+
+def tile_key(ctx, req, z, x, y):
+    """A hash identifying the content of a tile."""
+    updated = getattr(ctx, 'updated', None)
+    params = sorted((k, v) for k, v in req.GET.items() if k not in ['zoom', 'bbox'])
+    return md5('|'.join([
+        req.matched_route.name,
+        '%s' % getattr(ctx, 'id', ''),
+        updated.isoformat() if updated else '',
+        req.data_version or '',
+        urlencode(params),
+        '%s/%s/%s' % (z, x, y)]).encode('utf8')).hexdigest()
+
+
+def nearest_longitude(longitude, west, east):
+    """Shift a longitude by a multiple of 360 degrees to be closest to a tile.
+
+    Thus, features of pacific centered maps - with longitudes beyond 180 - and features
+    in the buffer beyond the antimeridian are projected to the correct position.
+
+    >>> nearest_longitude(300, -90, 0)
+    -60
+    """
+    center = (west + east) / 2
+    return min(
+        (longitude + shift for shift in (-360, 0, 360)), key=lambda l: abs(l - center))
+
+
+def encode_tile(ctx, req, adapter, z, x, y):
+    """Encode the features of a GeoJSON adapter located in a tile.
+
+    Features are clustered as specified by the ``zoom`` parameter for GeoJSON adapters,
+    and grouped into layers by their ``layer`` property.
+    """
+    west, south, east, north = mvt.tile_bounds(z, x, y)
+    dx, dy = (east - west) * BUFFER, (north - south) * BUFFER
+    adapter.params = dict(
+        zoom=z, bbox=(west - dx, south - dy, east + dx, north + dy))
+    collection = loads(adapter.render(ctx, req))
+
+    layers = {}
+    for feature in collection['features']:
+        properties = flatten(feature['properties'])
+        if 'id' in feature:
+            properties.setdefault('id', feature['id'])
+        name = properties.get('layer') \
+            or collection['properties'].get('layer') \
+            or getattr(ctx, 'id', None) \
+            or 'features'
+        if name not in layers:
+            layers[name] = mvt.Layer(name)
+        lon, lat = feature['geometry']['coordinates']
+        layers[name].add_point(
+            mvt.project((nearest_longitude(lon, west, east), lat), z, x, y), properties)
+    return mvt.encode(layers[name] for name in sorted(layers))
+
+
+def tile_view(ctx, req):
+    """Serve a vector tile of the features of a resource's or index's GeoJSON adapter."""
+    z, x, y = [int(req.matchdict[k]) for k in 'zxy']
+    if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        raise HTTPNotFound()
+    adapter = get_adapter(
+        IIndex if IDataTable.providedBy(ctx) else IRepresentation, ctx, req, ext='geojson')
+    if not adapter:
+        raise HTTPNotFound()
+
+    key = tile_key(ctx, req, z, x, y)
+    cache = tile_cache(req)
+    body = cache.get(key)
+    if body is None:
+        body = encode_tile(ctx, req, adapter, z, x, y)
+        cache.set(key, body)
+
+    res = Response(body=body, content_type=mvt.MIMETYPE)
+    res.etag = key
+    res.cache_control.public = True
+    res.cache_control.max_age = MAX_AGE
+    if getattr(ctx, 'updated', None):
+        res.last_modified = ctx.updated
+    res.conditional_response = True
+    return res
@@ -65,7 +65,19 @@ docs_extras = [
     'repoze.sphinx.autointerface',
 ]
 
-testing_extras = tests_require + [
+xlsx_extras = [
+    'openpyxl',
+]
+
+memcached_extras = [
+    'pymemcache',
+]
+
+parquet_extras = [
+    'pyarrow',
+]
+
+testing_extras = tests_require + xlsx_extras + parquet_extras + [
     'nose',
     'coverage',
     'virtualenv',  # for scaffolding tests
@@ -97,7 +109,12 @@ setup(
     include_package_data=True,
     zip_safe=False,
     install_requires=install_requires,
-    extras_require={'testing': testing_extras, 'docs': docs_extras},
+    extras_require={
+        'testing': testing_extras,
+        'docs': docs_extras,
+        'xlsx': xlsx_extras,
+        'memcached': memcached_extras,
+        'parquet': parquet_extras},
     tests_require=tests_require,
     test_suite="clld.tests",
     message_extractors={'clld': [
@@ -114,4 +131,5 @@ setup(
         clld-google-books = clld.scripts.cli:google_books
         clld-internetarchive = clld.scripts.cli:internetarchive
         clld-create-downloads = clld.scripts.cli:create_downloads
+        clld-clear-cache = clld.scripts.cli:clear_cache
     """)
@@ -0,0 +1,91 @@
+# coding: utf8
+"""Benchmark the peak memory used when creating the CSV download of values.
+
+Downloads are written to zip archive members as streams; this compares the peak memory
+of creating the download with the former implementation, which collected the full CSV in
+memory before adding it to the archive, for tables of growing size.
+
+Usage::
+
+    python tools/benchmark_download_memory.py [--values 10000 20000 40000]
+"""
+from __future__ import unicode_literals, print_function, division
+import argparse
+import tracemalloc
+from contextlib import contextmanager
+from io import BytesIO
+from tempfile import mkdtemp
+from shutil import rmtree
+
+from pyramid.paster import bootstrap
+import transaction
+from clldutils.path import Path
+
+from clld.db.meta import DBSession
+from clld.db.models import common
+from clld.tests.util import TESTS_DIR, init_db
+from clld.web.adapters.download import CsvDump
+
+
+class LegacyCsvDump(CsvDump):
+
+    @contextmanager
+    def zip_member(self, zipfile):
+        fp = BytesIO()
+        yield fp
+        zipfile.writestr(self.name, fp.getvalue())
+
+
+def populate(nvalues):
+    DBSession.add(common.Dataset(id='d', name='d', domain='clld.org', license='l'))
+    contribution = common.Contribution(id='c', name='c')
+    parameter = common.Parameter(id='p', name='p')
+    languages = [common.Language(id='l%s' % i, name='l%s' % i) for i in range(500)]
+    DBSession.add_all(languages + [contribution, parameter])
+    DBSession.flush()
+    for i in range(nvalues):
+        vs = common.ValueSet(
+            id='vs%s' % i,
+            language_pk=languages[i % len(languages)].pk,
+            parameter_pk=parameter.pk,
+            contribution_pk=contribution.pk)
+        DBSession.add(common.Value(
+            id='v%s' % i, name='value %s with a longer name' % i, valueset=vs))
+        if i % 1000 == 0:
+            DBSession.flush()
+    DBSession.flush()
+
+
+def peak(cls, req, outfile):
+    tracemalloc.start()
+    cls(common.Value, 'clld').create(req, verbose=False, outfile=outfile)
+    res = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--values', type=int, nargs='+', default=[10000, 20000, 40000])
+    args = parser.parse_args()
+
+    env = bootstrap(TESTS_DIR.joinpath('test.ini').as_posix())
+    tmp = Path(mkdtemp())
+    try:
+        for nvalues in args.values:
+            DBSession.remove()
+            init_db()
+            with transaction.manager:
+                populate(nvalues)
+            outfile = tmp.joinpath('values.zip')
+            legacy = peak(LegacyCsvDump, env['request'], outfile)
+            streaming = peak(CsvDump, env['request'], outfile)
+            print('{0:>8} values  legacy: {1:8.1f}KB  streaming: {2:8.1f}KB'.format(
+                nvalues, legacy / 1024, streaming / 1024))
+    finally:
+        rmtree(tmp.as_posix())
+        env['closer']()
+
+
+if __name__ == '__main__':
+    main()
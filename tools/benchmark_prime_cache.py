@@ -0,0 +1,118 @@
+# coding: utf8
+"""Benchmark the set-based implementations of the prime_cache helpers.
+
+Compares `clld.db.util.compute_language_sources` and `compute_number_of_values` with
+the former implementations, which load all objects into the session, and checks that
+both produce the same results.
+
+Usage::
+
+    python tools/benchmark_prime_cache.py [--valuesets N] [--db sqlite:///bench.sqlite]
+"""
+from __future__ import unicode_literals, print_function, division
+import argparse
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import joinedload
+import transaction
+
+from clld.db.meta import DBSession, Base
+from clld.db.models import common
+from clld.db.util import compute_language_sources, compute_number_of_values
+
+
+def legacy_compute_language_sources():
+    old_sl = {}
+    for pair in DBSession.query(common.LanguageSource):
+        old_sl[(pair.source_pk, pair.language_pk)] = True
+
+    sl = {}
+    for model, attr in [
+            (common.ValueSetReference, 'valueset'),
+            (common.SentenceReference, 'sentence')]:
+        for ref in DBSession.query(model):
+            sl[(ref.source_pk, getattr(ref, attr).language_pk)] = True
+
+    for s, l in sl:
+        if (s, l) not in old_sl:
+            DBSession.add(common.LanguageSource(language_pk=l, source_pk=s))
+    DBSession.flush()
+
+
+def legacy_compute_number_of_values():
+    for valueset in DBSession.query(common.ValueSet).options(
+        joinedload(common.ValueSet.values)
+    ):
+        valueset.update_jsondata(_number_of_values=len(valueset.values))
+    DBSession.flush()
+
+
+def populate(nvaluesets):
+    contribution = common.Contribution(id='c', name='c')
+    parameter = common.Parameter(id='p', name='p')
+    sources = [common.Source(id='s%s' % i, name='s%s' % i) for i in range(100)]
+    languages = [common.Language(id='l%s' % i, name='l%s' % i) for i in range(500)]
+    DBSession.add_all(sources + languages + [contribution, parameter])
+    DBSession.flush()
+    for i in range(nvaluesets):
+        vs = common.ValueSet(
+            id='vs%s' % i,
+            language_pk=languages[i % len(languages)].pk,
+            parameter_pk=parameter.pk,
+            contribution_pk=contribution.pk)
+        DBSession.add(vs)
+        for j in range(i % 4):
+            DBSession.add(common.Value(id='v%s-%s' % (i, j), valueset=vs))
+        DBSession.add(common.ValueSetReference(
+            valueset=vs, source_pk=sources[i % len(sources)].pk))
+        if i % 1000 == 0:
+            DBSession.flush()
+    DBSession.flush()
+
+
+def results():
+    return (
+        sorted((ls.source_pk, ls.language_pk)
+               for ls in DBSession.query(common.LanguageSource)),
+        sorted((vs.pk, vs.jsondata['_number_of_values'])
+               for vs in DBSession.query(common.ValueSet)))
+
+
+def run(funcs):
+    timings = []
+    for func in funcs:
+        start = time.time()
+        func()
+        timings.append(time.time() - start)
+    res = results()
+    transaction.abort()
+    return timings, res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--valuesets', type=int, default=20000)
+    parser.add_argument('--db', default='sqlite://')
+    args = parser.parse_args()
+
+    engine = create_engine(args.db)
+    DBSession.configure(bind=engine)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with transaction.manager:
+        populate(args.valuesets)
+
+    legacy, legacy_res = run(
+        [legacy_compute_language_sources, legacy_compute_number_of_values])
+    setbased, setbased_res = run([compute_language_sources, compute_number_of_values])
+    assert legacy_res == setbased_res, 'results differ'
+
+    print('%s valuesets' % args.valuesets)
+    for name, l, s in zip(
+            ['compute_language_sources', 'compute_number_of_values'], legacy, setbased):
+        print('{0:<28}legacy: {1:8.3f}s  set-based: {2:8.3f}s'.format(name, l, s))
+
+
+if __name__ == '__main__':
+    main()